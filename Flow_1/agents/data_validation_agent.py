@@ -1,9 +1,14 @@
 # agents/data_validation_agent.py
-from typing import Optional
-# agents/data_validation_agent.py
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
 from models import ProviderInput, DataValidationResult
-from npi_client import query_npi_by_number
-from website_scraper import scrape_practice_site
+from records import ValidationRecord
+from npi_sources import NPISource, RegistryAPISource
+from candidate_index import CandidateIndex
+from website_scraper import scrape_practice_site, ascrape_practice_site
+from request_coalescer import RequestCoalescer, AsyncRequestCoalescer
+from resilience import SourceUnavailable
 
 # TEMP: map real NPIs to their known practice website URLs for demo
 PRACTICE_WEBSITES = {
@@ -16,25 +21,192 @@ PRACTICE_WEBSITES = {
 class DataValidationAgent:
     """
     Now:
-    - Calls NPI Registry API
+    - Looks up the NPI (Registry API by default, or any NPISource such
+      as the local NPPES index)
     - Optionally scrapes provider practice website (if we know the URL)
+
+    When a RequestCoalescer is passed, identical NPI lookups / scrapes
+    inside the same batch are made only once.
+
+    npi_lookup_status on the result tells a real miss ("not_found") from
+    a registry that could not be reached ("unavailable").
+
+    `practice_websites` maps NPI -> practice URL (default: PRACTICE_WEBSITES).
+
+    With a `candidate_index`, rows whose NPI is empty or not in the
+    registry get the likeliest registry records as npi_candidates.
     """
 
-    def validate_provider(self, provider: ProviderInput) -> DataValidationResult:
-        npi_data = None
+    def __init__(
+        self,
+        npi_source: Optional[NPISource] = None,
+        practice_websites: Optional[Dict[str, str]] = None,
+        candidate_index: Optional[CandidateIndex] = None,
+        candidate_k: int = 3,
+    ) -> None:
+        self.npi_source = npi_source or RegistryAPISource()
+        self.practice_websites = (
+            practice_websites if practice_websites is not None else PRACTICE_WEBSITES
+        )
+        self.candidate_index = candidate_index
+        self.candidate_k = candidate_k
+
+    def npi_candidates(
+        self, provider: ProviderInput, npi_status: Optional[str]
+    ) -> Optional[List[Dict]]:
+        """
+        Local candidate records when the roster NPI is missing or unknown
+        (not when the registry was merely unavailable).
+        """
+        if self.candidate_index is None or npi_status not in (None, "not_found"):
+            return None
+        try:
+            found = self.candidate_index.candidates(
+                provider.name, provider.address, k=self.candidate_k
+            )
+        except Exception as e:
+            print(f"[DataValidationAgent] Candidate search failed for {provider.name}: {e}")
+            return None
+        return [c._asdict() for c in found]
+
+    def lookup_npi(
+        self,
+        npi: str,
+        coalescer: Optional[RequestCoalescer] = None,
+    ) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        (record, npi_lookup_status) for a roster NPI.
+        """
+        if not npi:
+            return None, None
+        npi = npi.strip()
+        try:
+            if coalescer is not None:
+                record = coalescer.do("npi", npi, lambda: self.npi_source.lookup(npi))
+            else:
+                record = self.npi_source.lookup(npi)
+        except SourceUnavailable:
+            return None, "unavailable"
+        return record, "found" if record else "not_found"
+
+    def validate_provider(
+        self,
+        provider: ProviderInput,
+        coalescer: Optional[RequestCoalescer] = None,
+    ) -> DataValidationResult:
+        return self.validate_record(provider, coalescer=coalescer).to_model()
+
+    def validate_record(
+        self,
+        provider: ProviderInput,
+        coalescer: Optional[RequestCoalescer] = None,
+    ) -> ValidationRecord:
+        """
+        validate_provider as a ValidationRecord (no model validation;
+        used by the orchestrator's hot path).
+        """
         website_data = None
 
-        if provider.npi:
-            npi_data = query_npi_by_number(provider.npi)
+        npi_data, npi_status = self.lookup_npi(provider.npi, coalescer=coalescer)
 
         # Look up practice website by NPI (for demo)
-        practice_url = PRACTICE_WEBSITES.get(provider.npi)
+        practice_url = self.practice_websites.get(provider.npi)
         if practice_url:
-            website_data = scrape_practice_site(practice_url)
+            if coalescer is not None:
+                website_data = coalescer.do(
+                    "website", practice_url, lambda: scrape_practice_site(practice_url)
+                )
+            else:
+                website_data = scrape_practice_site(practice_url)
 
-        return DataValidationResult(
+        return ValidationRecord(
             provider_input=provider,
             npi_raw=npi_data,
             website_data=website_data,
+            npi_lookup_status=npi_status,
+            npi_candidates=self.npi_candidates(provider, npi_status),
         )
 
+    async def avalidate_provider(
+        self,
+        provider: ProviderInput,
+        client=None,
+        coalescer: Optional[AsyncRequestCoalescer] = None,
+        npi_limit: Optional[asyncio.Semaphore] = None,
+        scrape_limit: Optional[asyncio.Semaphore] = None,
+    ) -> DataValidationResult:
+        """
+        Async version of validate_provider.
+        NPI lookup and website scrape run concurrently.
+        """
+        record = await self.avalidate_record(
+            provider,
+            client=client,
+            coalescer=coalescer,
+            npi_limit=npi_limit,
+            scrape_limit=scrape_limit,
+        )
+        return record.to_model()
+
+    async def avalidate_record(
+        self,
+        provider: ProviderInput,
+        client=None,
+        coalescer: Optional[AsyncRequestCoalescer] = None,
+        npi_limit: Optional[asyncio.Semaphore] = None,
+        scrape_limit: Optional[asyncio.Semaphore] = None,
+    ) -> ValidationRecord:
+        """
+        Async version of validate_record.
+        """
+
+        async def no_data():
+            return None
+
+        async def lookup_npi():
+            try:
+                if coalescer is not None:
+                    record = await coalescer.do("npi", npi, fetch_npi)
+                else:
+                    record = await fetch_npi()
+            except SourceUnavailable:
+                return None, "unavailable"
+            return record, "found" if record else "not_found"
+
+        npi = provider.npi.strip() if provider.npi else ""
+        practice_url = self.practice_websites.get(provider.npi)
+
+        def fetch_npi():
+            return self.npi_source.alookup(npi, client=client, limit=npi_limit)
+
+        def fetch_site():
+            return ascrape_practice_site(practice_url, client=client, limit=scrape_limit)
+
+        if not npi:
+            npi_call = no_data()
+        else:
+            npi_call = lookup_npi()
+
+        # Look up practice website by NPI (for demo)
+        if not practice_url:
+            website_call = no_data()
+        elif coalescer is not None:
+            website_call = coalescer.do("website", practice_url, fetch_site)
+        else:
+            website_call = fetch_site()
+
+        npi_lookup, website_data = await asyncio.gather(npi_call, website_call)
+        npi_data, npi_status = npi_lookup or (None, None)
+
+        npi_candidates = None
+        if self.candidate_index is not None and npi_status in (None, "not_found"):
+            # SQLite block reads + rapidfuzz scoring: tens of ms per row
+            npi_candidates = await asyncio.to_thread(self.npi_candidates, provider, npi_status)
+
+        return ValidationRecord(
+            provider_input=provider,
+            npi_raw=npi_data,
+            website_data=website_data,
+            npi_lookup_status=npi_status,
+            npi_candidates=npi_candidates,
+        )
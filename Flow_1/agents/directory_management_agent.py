@@ -1,7 +1,9 @@
 # agents/directory_management_agent.py
-from typing import List
+from typing import List, Union
 
 from models import ProviderInput, ProviderOutput, ProviderReport
+from records import OutputRecord, ReportRecord
+from agents.quality_assurance_agent import NPI_UNAVAILABLE_NOTE
 
 
 class DirectoryManagementAgent:
@@ -18,8 +20,38 @@ class DirectoryManagementAgent:
     def summarize_provider(
         self, provider: ProviderInput, output: ProviderOutput
     ) -> ProviderReport:
+        record = self.summarize_record(provider, output)
+        return ProviderReport(
+            provider_input=provider,
+            provider_output=output,
+            status=record.status,
+            reasons=record.reasons,
+            priority_score=record.priority_score,
+            priority_level=record.priority_level,
+        )
+
+    def summarize_record(
+        self, provider: ProviderInput, output: Union[ProviderOutput, OutputRecord]
+    ) -> ReportRecord:
+        """
+        summarize_provider as a ReportRecord (no model validation;
+        used by the orchestrator's hot path).
+        """
         reasons: List[str] = []
 
+        # --- Registry could not be reached: nothing was validated ---
+        # Not a data problem, so it stays out of the manual review queue;
+        # the row is simply re-run once the registry answers again.
+        if (output.npi.note or "").startswith(NPI_UNAVAILABLE_NOTE):
+            return ReportRecord(
+                provider_input=provider,
+                provider_output=output,
+                status="source_unavailable",
+                reasons=["NPI registry unavailable (throttled or down); re-validate later"],
+                priority_score=0.0,
+                priority_level="NONE",
+            )
+
         # --- NPI status ---
         npi_missing = "not found" in (output.npi.note or "").lower()
         if npi_missing:
@@ -92,7 +124,7 @@ class DirectoryManagementAgent:
             else:
                 priority_level = "LOW"
 
-        return ProviderReport(
+        return ReportRecord(
             provider_input=provider,
             provider_output=output,
             status=status,
@@ -112,5 +144,14 @@ class DirectoryManagementAgent:
     def prioritized_review_queue(
         self, reports: List[ProviderReport]
     ) -> List[ProviderReport]:
-        review = [r for r in reports if r.status == "needs_review"]
-        return sorted(review, key=lambda r: r.priority_score, reverse=True)
+        return [reports[i] for i in self.prioritized_review_indices(reports)]
+
+    def prioritized_review_indices(
+        self, reports: List[ProviderReport]
+    ) -> List[int]:
+        """
+        Positions of needs_review reports, highest priority first
+        (ties keep input order).
+        """
+        review = [i for i, r in enumerate(reports) if r.status == "needs_review"]
+        return sorted(review, key=lambda i: reports[i].priority_score, reverse=True)
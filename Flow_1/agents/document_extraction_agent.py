@@ -1,46 +1,39 @@
 # agents/document_extraction_agent.py
+import hashlib
+import io
 import os
 import json
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
 from models import ProviderInput
+from resilience import AdaptiveLimiter, RetryPolicy, call_with_retries
 
 try:
     import google.generativeai as genai
 except ImportError:
     genai = None
 
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:
+    PdfReader = PdfWriter = None
 
-class DocumentExtractionAgent:
-    """
-    Uses Gemini Pro Vision to extract structured provider records from a PDF.
+DEFAULT_MODEL_NAME = "gemini-2.5-flash"
 
-    PDF (unstructured) → Gemini Vision → JSON → ProviderInput[]
-    Then fed into the normal Flow-1 pipeline (same as CSV).
-    """
+# Bump when the prompt or the parsing below changes: cached extractions
+# made by the old version are then ignored.
+PROMPT_VERSION = 1
 
-    def __init__(self) -> None:
-        self._llm_ready = False
-        self._model = None
+# PDFs longer than this are split into page ranges extracted in parallel
+# (needs pypdf; without it the whole PDF goes in one call)
+PAGES_PER_CHUNK = int(os.getenv("FLOW1_PDF_PAGES_PER_CHUNK", "10"))
+CHUNK_WORKERS = int(os.getenv("FLOW1_PDF_CHUNK_WORKERS", "4"))
 
-        api_key = os.getenv("GEMINI_API_KEY")
-        if api_key and genai is not None:
-            try:
-                genai.configure(api_key=api_key)
-                # Using Flash model for better free tier support, still supports vision/PDFs
-                self._model = genai.GenerativeModel("gemini-2.5-flash")
-                self._llm_ready = True
-                print("[DocumentExtractionAgent] Gemini Flash configured.")
-            except Exception as e:
-                print(f"[DocumentExtractionAgent] Failed to configure Gemini: {e}")
-        else:
-            print("[DocumentExtractionAgent] Gemini not available or API key missing.")
+# Safety cap on records taken from one model answer (one page range)
+MAX_PROVIDERS_PER_CALL = 200
 
-    def extract_providers_from_pdf(self, pdf_bytes: bytes) -> List[ProviderInput]:
-        if not self._llm_ready or not self._model:
-            return []
-
-        prompt = """
+EXTRACTION_PROMPT = """
 You are assisting a healthcare payer with provider directory cleanup.
 
 You will receive a PDF that may contain provider rosters, credentialing forms,
@@ -65,49 +58,61 @@ Each object MUST have:
 Return ONLY the JSON array. No markdown. No explanation.
 """.strip()
 
-        try:
-            response = self._model.generate_content(
-                [
-                    {"mime_type": "application/pdf", "data": pdf_bytes},
-                    prompt,
-                ]
-            )
 
-            text = getattr(response, "text", None)
-            if not text:
-                return []
-
-            json_str = self._extract_json(text)
-            if not json_str:
-                return []
-
-            raw = json.loads(json_str)
-            if not isinstance(raw, list):
-                return []
-
-            providers: List[ProviderInput] = []
-
-            for item in raw[:200]:  # safety cap
-                if not isinstance(item, dict):
-                    continue
-
-                name = (item.get("name") or "").strip()
-                if not name:
-                    continue
-
-                providers.append(
-                    ProviderInput(
-                        name=name,
-                        npi=(item.get("npi") or "").strip(),
-                        mobile_no=(item.get("mobile_no") or "").strip(),
-                        address=(item.get("address") or "").strip(),
-                        speciality=(item.get("speciality") or "").strip(),
-                        member_impact=int(item.get("member_impact", 3)),
-                    )
-                )
+class DocumentExtractionAgent:
+    """
+    Uses Gemini Pro Vision to extract structured provider records from a PDF.
 
-            return providers
+    PDF (unstructured) → Gemini Vision → JSON → ProviderInput[]
+    Then fed into the normal Flow-1 pipeline (same as CSV).
+
+    Extractions are cached by content (see ExtractionCache) when a cache
+    is given; empty answers (blocked, unparseable) are not cached, so the
+    next upload asks again. Pass `model` (anything with
+    generate_content(parts) -> .text) to use a local stub instead of Gemini.
+    """
+
+    def __init__(
+        self,
+        model=None,
+        model_name: Optional[str] = None,
+        cache=None,
+        pages_per_chunk: int = PAGES_PER_CHUNK,
+        chunk_workers: int = CHUNK_WORKERS,
+    ) -> None:
+        self._llm_ready = False
+        self._model = None
+        self.model_name = model_name or os.getenv("GEMINI_MODEL", DEFAULT_MODEL_NAME)
+        self.cache = cache
+        self.pages_per_chunk = pages_per_chunk
+        self._chunk_pool = ThreadPoolExecutor(
+            max_workers=max(1, chunk_workers), thread_name_prefix="pdf-chunk"
+        )
+        self._version = hashlib.sha256(
+            f"{PROMPT_VERSION}:{self.model_name}:{EXTRACTION_PROMPT}".encode("utf-8")
+        ).hexdigest()[:16]
+
+        if model is not None:
+            self._model = model
+            self._llm_ready = True
+            return
+
+        api_key = os.getenv("GEMINI_API_KEY")
+        if api_key and genai is not None:
+            try:
+                genai.configure(api_key=api_key)
+                # Using Flash model for better free tier support, still supports vision/PDFs
+                self._model = genai.GenerativeModel(self.model_name)
+                self._llm_ready = True
+                print("[DocumentExtractionAgent] Gemini Flash configured.")
+            except Exception as e:
+                print(f"[DocumentExtractionAgent] Failed to configure Gemini: {e}")
+        else:
+            print("[DocumentExtractionAgent] Gemini not available or API key missing.")
 
+    def extract_providers_from_pdf(self, pdf_bytes: bytes) -> List[ProviderInput]:
+        try:
+            return self.extract_providers_or_raise(pdf_bytes)
         except Exception as e:
             error_msg = str(e)
             if "429" in error_msg or "quota" in error_msg.lower() or "rate limit" in error_msg.lower():
@@ -119,6 +124,159 @@ Return ONLY the JSON array. No markdown. No explanation.
                 print(f"[DocumentExtractionAgent] PDF extraction error: {e}")
             return []
 
+    def extract_providers_or_raise(
+        self,
+        pdf_bytes: bytes,
+        limiter: Optional[AdaptiveLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ) -> List[ProviderInput]:
+        """
+        Same as extract_providers_from_pdf, but Gemini errors (429 quota,
+        5xx, timeouts) are raised so callers can back off and retry.
+
+        With `limiter` / `retry_policy`, every model call (one per page
+        range) takes its own limiter slot and is retried on its own.
+        """
+        if not self._llm_ready or not self._model:
+            return []
+
+        doc_key = f"{hashlib.sha256(pdf_bytes).hexdigest()}:{self._version}"
+        if self.cache is not None:
+            cached = self.cache.get(doc_key)
+            if cached is not None:
+                return cached
+
+        chunks = self._split_pages(pdf_bytes)
+        if len(chunks) == 1:
+            per_chunk = [self._call_model(chunks[0][1], limiter, retry_policy)]
+        else:
+            # completed page ranges are cached on their own, so a retry
+            # after a 429 only re-sends the ranges that failed
+            futures = [
+                self._chunk_pool.submit(
+                    self._extract_chunk, f"{doc_key}:{pages}", data, limiter, retry_policy
+                )
+                for pages, data in chunks
+            ]
+            per_chunk = [f.result() for f in futures]
+        providers = self._merge(per_chunk)
+
+        # a range with no records may be a blocked or unparseable answer
+        if self.cache is not None and all(per_chunk):
+            self.cache.put(doc_key, providers)
+        return providers
+
+    def _split_pages(self, pdf_bytes: bytes) -> List[Tuple[str, bytes]]:
+        """
+        [("start-end", pdf bytes)] page ranges of at most pages_per_chunk
+        pages, or [("all", pdf_bytes)] when the PDF is short, unreadable
+        or pypdf is missing.
+        """
+        whole = [("all", pdf_bytes)]
+        if PdfReader is None or self.pages_per_chunk <= 0:
+            return whole
+        try:
+            reader = PdfReader(io.BytesIO(pdf_bytes))
+            page_count = len(reader.pages)
+            if page_count <= self.pages_per_chunk:
+                return whole
+
+            chunks = []
+            for start in range(0, page_count, self.pages_per_chunk):
+                end = min(page_count, start + self.pages_per_chunk)
+                writer = PdfWriter()
+                for page in range(start, end):
+                    writer.add_page(reader.pages[page])
+                out = io.BytesIO()
+                writer.write(out)
+                chunks.append((f"{start + 1}-{end}", out.getvalue()))
+            return chunks
+        except Exception as e:
+            print(f"[DocumentExtractionAgent] Could not split PDF into pages, sending it whole: {e}")
+            return whole
+
+    def _extract_chunk(
+        self,
+        key: str,
+        pdf_bytes: bytes,
+        limiter: Optional[AdaptiveLimiter],
+        retry_policy: Optional[RetryPolicy],
+    ) -> List[ProviderInput]:
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        providers = self._call_model(pdf_bytes, limiter, retry_policy)
+
+        if self.cache is not None and providers:
+            self.cache.put(key, providers)
+        return providers
+
+    def _call_model(
+        self,
+        pdf_bytes: bytes,
+        limiter: Optional[AdaptiveLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ) -> List[ProviderInput]:
+        def generate():
+            return self._model.generate_content(
+                [
+                    {"mime_type": "application/pdf", "data": pdf_bytes},
+                    EXTRACTION_PROMPT,
+                ]
+            )
+
+        if limiter is None and retry_policy is None:
+            response = generate()
+        else:
+            response = call_with_retries(
+                generate, "gemini", retry_policy or RetryPolicy(attempts=1), limiter
+            )
+        return self._parse_response(getattr(response, "text", None))
+
+    def _merge(self, per_chunk: List[List[ProviderInput]]) -> List[ProviderInput]:
+        """
+        Page ranges in order. Ranges don't overlap, so every record is
+        kept: repeated rows are the document's own and stay as they are.
+        """
+        return [p for providers in per_chunk for p in providers]
+
+    def _parse_response(self, text: Optional[str]) -> List[ProviderInput]:
+        if not text:
+            return []
+
+        json_str = self._extract_json(text)
+        if not json_str:
+            return []
+
+        raw = json.loads(json_str)
+        if not isinstance(raw, list):
+            return []
+
+        providers: List[ProviderInput] = []
+
+        for item in raw[:MAX_PROVIDERS_PER_CALL]:  # safety cap
+            if not isinstance(item, dict):
+                continue
+
+            name = (item.get("name") or "").strip()
+            if not name:
+                continue
+
+            providers.append(
+                ProviderInput(
+                    name=name,
+                    npi=(item.get("npi") or "").strip(),
+                    mobile_no=(item.get("mobile_no") or "").strip(),
+                    address=(item.get("address") or "").strip(),
+                    speciality=(item.get("speciality") or "").strip(),
+                    member_impact=int(item.get("member_impact", 3)),
+                )
+            )
+
+        return providers
+
     def _extract_json(self, text: str) -> Optional[str]:
         text = text.strip()
 
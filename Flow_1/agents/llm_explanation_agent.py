@@ -1,5 +1,8 @@
 # agents/llm_explanation_agent.py
+from typing import Union
+
 from models import ProviderReport
+from records import ReportRecord
 
 
 class LLMExplanationAgent:
@@ -13,7 +16,13 @@ class LLMExplanationAgent:
     - LLMs are reserved for unstructured document extraction only.
     """
 
-    def explain(self, report: ProviderReport) -> str:
+    def explain(self, report: Union[ProviderReport, ReportRecord]) -> str:
+        if report.status == "source_unavailable":
+            return (
+                "The NPI registry could not be reached, so this provider was "
+                "not validated. It will be re-checked on the next run."
+            )
+
         if report.status != "needs_review":
             return (
                 "No manual review required. Provider information met "
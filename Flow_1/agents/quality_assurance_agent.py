@@ -1,8 +1,65 @@
 # agents/quality_assurance_agent.py
-from typing import Optional, Dict
-from rapidfuzz import fuzz
+from typing import Optional, Dict, List, Sequence, Tuple, Union
+from rapidfuzz import fuzz, process
 
-from models import ProviderInput, DataValidationResult, ProviderOutput, FieldWithConfidence
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from pydantic import TypeAdapter
+
+from models import ProviderInput, DataValidationResult, ProviderOutput
+from records import FieldRecord, OutputRecord, ValidationRecord
+
+# Bulk pairwise scoring needs rapidfuzz >= 3.6 (process.cpdist) and numpy,
+# both in requirements.txt; generate_outputs() falls back to one fuzz.ratio
+# call per pair without them.
+_cpdist = getattr(process, "cpdist", None) if np is not None else None
+
+# (similarity >= 85, >= 60, below) confidence tiers used by _multi_source_field
+_NPI_ONLY_TIERS = (0.95, 0.75, 0.4)
+_WEB_ONLY_TIERS = (0.9, 0.7, 0.45)
+
+_PROVIDER_OUTPUTS = TypeAdapter(List[ProviderOutput])
+
+# NPI field note when the registry could not be reached (see resilience.py);
+# DirectoryManagementAgent keys "source_unavailable" off this prefix.
+NPI_UNAVAILABLE_NOTE = "NPI registry unavailable; lookup not completed"
+
+
+def _npi_not_found_note(result: Union[DataValidationResult, ValidationRecord]) -> str:
+    """
+    NPI field note for a missing / unknown NPI, naming the closest local
+    registry match when the candidate index found one.
+    """
+    note = "NPI not found in registry"
+    if result.npi_candidates:
+        best = result.npi_candidates[0]
+        note += f"; closest registry match NPI {best['npi']} (score {best['score']:.2f})"
+    return note
+
+
+def _pairwise_ratio(left: Sequence[str], right: Sequence[str]) -> List[float]:
+    """
+    fuzz.ratio(left[i], right[i]) for every i, in one bulk call when possible.
+    """
+    if not left:
+        return []
+    if _cpdist is not None:
+        return _cpdist(left, right, scorer=fuzz.ratio, dtype=np.float64).tolist()
+    return [fuzz.ratio(a, b) for a, b in zip(left, right)]
+
+
+def _tiered(similarities: List[float], tiers: Tuple[float, float, float]) -> List[float]:
+    """
+    Map similarities to confidences: >= 85 -> tiers[0], >= 60 -> tiers[1], else tiers[2].
+    """
+    high, mid, low = tiers
+    if np is not None and similarities:
+        sims = np.asarray(similarities, dtype=np.float64)
+        return np.select([sims >= 85, sims >= 60], [high, mid], low).tolist()
+    return [high if s >= 85 else mid if s >= 60 else low for s in similarities]
 
 
 class QualityAssuranceAgent:
@@ -74,7 +131,7 @@ class QualityAssuranceAgent:
         npi_value: Optional[str],
         web_value: Optional[str],
         source_label: str,
-    ) -> FieldWithConfidence:
+    ) -> FieldRecord:
         """
         Combine input, NPI, and website values:
 
@@ -91,7 +148,7 @@ class QualityAssuranceAgent:
 
         # No external sources at all
         if not npi_value and not web_value:
-            return FieldWithConfidence(
+            return FieldRecord(
                 value=input_value,
                 confidence=0.0,
                 note=f"No NPI/website {source_label} available",
@@ -106,7 +163,7 @@ class QualityAssuranceAgent:
                 conf = 0.75
             else:
                 conf = 0.4
-            return FieldWithConfidence(
+            return FieldRecord(
                 value=npi_value,
                 confidence=conf,
                 note=f"{source_label} validated via NPI only",
@@ -121,7 +178,7 @@ class QualityAssuranceAgent:
                 conf = 0.7
             else:
                 conf = 0.45
-            return FieldWithConfidence(
+            return FieldRecord(
                 value=web_value,
                 confidence=conf,
                 note=f"{source_label} validated via website only (NPI not found)",
@@ -153,32 +210,122 @@ class QualityAssuranceAgent:
             conf = base_conf - 0.2
             note = f"{source_label} disagreement between NPI and website; leaning towards {src}"
 
-        return FieldWithConfidence(
+        return FieldRecord(
             value=chosen_val,
             confidence=conf,
             note=note,
         )
 
+    def _multi_source_fields(
+        self,
+        input_values: List[str],
+        npi_values: List[Optional[str]],
+        web_values: List[Optional[str]],
+        source_label: str,
+    ) -> List[Dict]:
+        """
+        _multi_source_field for many rows at once: every similarity the rows
+        need is computed in one bulk call per comparison kind, and the
+        confidence thresholds are applied over whole arrays.
+        Returns the FieldWithConfidence data _multi_source_field would build
+        for each row, as plain dicts (validated in bulk by generate_outputs).
+        """
+        n = len(input_values)
+        inputs = [(v or "").strip() for v in input_values]
+        npis = [v.strip() if v else None for v in npi_values]
+        webs = [v.strip() if v else None for v in web_values]
+
+        npi_only: List[int] = []
+        web_only: List[int] = []
+        both: List[int] = []
+        for i in range(n):
+            if npis[i] and webs[i]:
+                both.append(i)
+            elif npis[i]:
+                npi_only.append(i)
+            elif webs[i]:
+                web_only.append(i)
+
+        def input_similarity(rows: List[int], others: List[Optional[str]]) -> List[float]:
+            # similarity is 0 when the input value is empty
+            scored = [i for i in rows if inputs[i]]
+            ratios = _pairwise_ratio(
+                [inputs[i].lower() for i in scored],
+                [others[i].lower() for i in scored],
+            )
+            by_row = dict(zip(scored, ratios))
+            return [by_row.get(i, 0) for i in rows]
+
+        fields: List[Optional[Dict]] = [None] * n
+
+        # Case 1: NPI only
+        confs = _tiered(input_similarity(npi_only, npis), _NPI_ONLY_TIERS)
+        note = f"{source_label} validated via NPI only"
+        for i, conf in zip(npi_only, confs):
+            fields[i] = {"value": npis[i], "confidence": conf, "note": note}
+
+        # Case 2: Website only
+        confs = _tiered(input_similarity(web_only, webs), _WEB_ONLY_TIERS)
+        note = f"{source_label} validated via website only (NPI not found)"
+        for i, conf in zip(web_only, confs):
+            fields[i] = {"value": webs[i], "confidence": conf, "note": note}
+
+        # Case 3: Both NPI and Website exist
+        if both:
+            agreement = _pairwise_ratio([npis[i].lower() for i in both], [webs[i].lower() for i in both])
+            sim_input_npi = input_similarity(both, npis)
+            sim_input_web = input_similarity(both, webs)
+            if np is not None:
+                agree = (np.asarray(agreement) >= 85).tolist()
+                lean_npi = (np.asarray(sim_input_npi) >= np.asarray(sim_input_web)).tolist()
+            else:
+                agree = [a >= 85 for a in agreement]
+                lean_npi = [a >= b for a, b in zip(sim_input_npi, sim_input_web)]
+
+            disagree_conf = 0.7 - 0.2
+            for k, i in enumerate(both):
+                if agree[k]:
+                    value, conf = npis[i], 0.97
+                    note = f"{source_label} confirmed by NPI + website"
+                elif lean_npi[k]:
+                    value, conf = npis[i], disagree_conf
+                    note = f"{source_label} disagreement between NPI and website; leaning towards NPI"
+                else:
+                    value, conf = webs[i], disagree_conf
+                    note = f"{source_label} disagreement between NPI and website; leaning towards website"
+                fields[i] = {"value": value, "confidence": conf, "note": note}
+
+        # No external sources at all
+        note = f"No NPI/website {source_label} available"
+        for i in range(n):
+            if fields[i] is None:
+                fields[i] = {"value": inputs[i], "confidence": 0.0, "note": note}
+
+        return fields
+
     # ---------- main entry ----------
 
     def generate_output(self, result: DataValidationResult) -> ProviderOutput:
+        return self.generate_output_record(result).to_model()
+
+    def generate_output_record(
+        self, result: Union[DataValidationResult, ValidationRecord]
+    ) -> OutputRecord:
+        """
+        generate_output as an OutputRecord of FieldRecords (no model
+        validation; used by the orchestrator's hot path).
+        """
         provider: ProviderInput = result.provider_input
         npi_raw: Optional[Dict] = result.npi_raw
         website_data: Optional[Dict[str, str]] = result.website_data
 
         # NPI itself
         if npi_raw:
-            npi_field = FieldWithConfidence(
-                value=provider.npi,
-                confidence=0.98,
-                note="NPI found in registry",
-            )
+            npi_field = FieldRecord(provider.npi, 0.98, "NPI found in registry")
+        elif result.npi_lookup_status == "unavailable":
+            npi_field = FieldRecord(provider.npi, 0.0, NPI_UNAVAILABLE_NOTE)
         else:
-            npi_field = FieldWithConfidence(
-                value=provider.npi,
-                confidence=0.0,
-                note="NPI not found in registry",
-            )
+            npi_field = FieldRecord(provider.npi, 0.0, _npi_not_found_note(result))
 
         # Extract external values
         npi_name = self._build_name_from_npi(npi_raw) if npi_raw else None
@@ -222,10 +369,69 @@ class QualityAssuranceAgent:
             source_label="Speciality",
         )
 
-        return ProviderOutput(
+        return OutputRecord(
             name=name_field,
             npi=npi_field,
             mobile_no=mobile_field,
             address=address_field,
             speciality=speciality_field,
         )
+
+    def generate_outputs(
+        self, results: Sequence[Union[DataValidationResult, ValidationRecord]]
+    ) -> List[ProviderOutput]:
+        """
+        Batch version of generate_output: same ProviderOutputs, in order,
+        but each field's similarities are scored in bulk (rapidfuzz cpdist)
+        instead of one Python-level fuzz.ratio call at a time, and all
+        outputs are validated in one call.
+        """
+        names, phones, addresses, specs = [], [], [], []
+        npi_names, npi_phones, npi_addresses, npi_specs = [], [], [], []
+        web_phones, web_addresses, web_specs = [], [], []
+
+        for result in results:
+            provider = result.provider_input
+            npi_raw = result.npi_raw
+            website_data = result.website_data
+
+            names.append(provider.name)
+            phones.append(provider.mobile_no)
+            addresses.append(provider.address)
+            specs.append(provider.speciality)
+
+            npi_names.append(self._build_name_from_npi(npi_raw) if npi_raw else None)
+            npi_phones.append(self._build_phone_from_npi(npi_raw) if npi_raw else None)
+            npi_addresses.append(self._build_address_from_npi(npi_raw) if npi_raw else None)
+            npi_specs.append(self._build_speciality_from_npi(npi_raw) if npi_raw else None)
+
+            web_phones.append(website_data.get("phone") if website_data else None)
+            web_addresses.append(website_data.get("address") if website_data else None)
+            web_specs.append(website_data.get("speciality") if website_data else None)
+
+        no_web = [None] * len(results)  # website is ignored for name
+        name_fields = self._multi_source_fields(names, npi_names, no_web, "Name")
+        mobile_fields = self._multi_source_fields(phones, npi_phones, web_phones, "Phone")
+        address_fields = self._multi_source_fields(addresses, npi_addresses, web_addresses, "Address")
+        speciality_fields = self._multi_source_fields(specs, npi_specs, web_specs, "Speciality")
+
+        rows: List[Dict] = []
+        for k, result in enumerate(results):
+            npi = result.provider_input.npi
+            if result.npi_raw:
+                npi_field = {"value": npi, "confidence": 0.98, "note": "NPI found in registry"}
+            elif result.npi_lookup_status == "unavailable":
+                npi_field = {"value": npi, "confidence": 0.0, "note": NPI_UNAVAILABLE_NOTE}
+            else:
+                npi_field = {"value": npi, "confidence": 0.0, "note": _npi_not_found_note(result)}
+
+            rows.append({
+                "name": name_fields[k],
+                "npi": npi_field,
+                "mobile_no": mobile_fields[k],
+                "address": address_fields[k],
+                "speciality": speciality_fields[k],
+            })
+
+        # one validator call builds every ProviderOutput and its fields
+        return _PROVIDER_OUTPUTS.validate_python(rows)
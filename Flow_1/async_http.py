@@ -0,0 +1,25 @@
+# async_http.py
+from typing import Optional
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+def new_async_client(max_connections: int = 200) -> Optional["httpx.AsyncClient"]:
+    """
+    Pooled async HTTP client shared by the NPI and website lookups of one batch.
+    Returns None when httpx is not installed (callers then fall back to
+    the blocking clients on worker threads).
+    """
+    if httpx is None:
+        return None
+
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+        follow_redirects=True,  # match requests' default behaviour
+    )
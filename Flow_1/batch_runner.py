@@ -0,0 +1,310 @@
+# batch_runner.py
+"""
+Resumable command-line batch run: stream a roster CSV through
+Flow1Orchestrator and append one NDJSON line per report to an output
+file, checkpointing as it goes.
+
+    cd Flow_1
+    python batch_runner.py roster.csv reports.jsonl --workers 16
+    # interrupted / crashed? run the same command again to resume
+    python batch_runner.py roster.csv reports.jsonl --restart   # start over
+
+Output lines (completion order, so sort by "index" if order matters):
+    {"index": 17, "report": {...}}
+    {"index": 18, "error": "..."}
+
+Checkpoint (<output>.checkpoint.json, replaced atomically):
+- committed_offset: every row below it has its line in the output
+- done_above: finished rows at or past committed_offset
+- in_flight: rows started but not finished (re-run on resume)
+- output_bytes: output size matching this state; on resume the output
+  is truncated back to it, so each row ends up in the file exactly once.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Set
+
+from data_loader import RowError, iter_providers_from_csv
+from models import ProviderInput
+from orchestrator import Flow1Orchestrator
+from records import report_json
+
+CHECKPOINT_EVERY_ROWS = 1000
+CHECKPOINT_EVERY_SECONDS = 10.0
+PROGRESS_EVERY_SECONDS = 5.0
+
+
+def count_csv_rows(path: str) -> int:
+    """
+    Data rows in a CSV (newlines minus the header), for the ETA.
+    Quoted fields with embedded newlines make this an overestimate.
+    """
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(1 << 20)
+            if not block:
+                break
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(0, lines - 1)
+
+
+def _input_identity(path: str) -> Dict:
+    stat = os.stat(path)
+    return {"input": os.path.abspath(path), "input_size": stat.st_size, "input_mtime": stat.st_mtime}
+
+
+def _format_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+class Checkpoint:
+    """
+    Which input rows are finished, compactly: a committed offset plus
+    the (few) rows finished out of order past it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.committed_offset = 0
+        self.done_above: Set[int] = set()
+        self.in_flight: Set[int] = set()
+        self.output_bytes = 0
+        self.rows_done = 0
+        self.rows_failed = 0
+        self.elapsed = 0.0
+        self.identity: Dict = {}
+
+    def is_done(self, idx: int) -> bool:
+        return idx < self.committed_offset or idx in self.done_above
+
+    def mark_done(self, idx: int, failed: bool = False) -> None:
+        self.in_flight.discard(idx)
+        self.done_above.add(idx)
+        while self.committed_offset in self.done_above:
+            self.done_above.remove(self.committed_offset)
+            self.committed_offset += 1
+        self.rows_done += 1
+        if failed:
+            self.rows_failed += 1
+
+    def save(self) -> None:
+        data = {
+            **self.identity,
+            "committed_offset": self.committed_offset,
+            "done_above": sorted(self.done_above),
+            "in_flight": sorted(self.in_flight),
+            "output_bytes": self.output_bytes,
+            "rows_done": self.rows_done,
+            "rows_failed": self.rows_failed,
+            "elapsed": round(self.elapsed, 3),
+            "saved_at": time.time(),
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Checkpoint"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        cp = cls(path)
+        cp.committed_offset = data["committed_offset"]
+        cp.done_above = set(data["done_above"])
+        cp.in_flight = set(data.get("in_flight", []))
+        cp.output_bytes = data["output_bytes"]
+        cp.rows_done = data.get("rows_done", 0)
+        cp.rows_failed = data.get("rows_failed", 0)
+        cp.elapsed = data.get("elapsed", 0.0)
+        cp.identity = {k: data.get(k) for k in ("input", "input_size", "input_mtime")}
+        return cp
+
+
+class _Progress:
+    def __init__(self, total: int, already_done: int, every: float) -> None:
+        self.total = total
+        self.every = every
+        self.started = time.monotonic()
+        self.start_done = already_done
+        self.last_print = 0.0
+
+    def maybe_print(self, done: int, failed: int, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self.last_print < self.every:
+            return
+        self.last_print = now
+        elapsed = max(now - self.started, 1e-9)
+        rate = (done - self.start_done) / elapsed
+        remaining = max(0, self.total - done)
+        eta = _format_eta(remaining / rate) if rate > 0 else "?"
+        pct = 100.0 * done / self.total if self.total else 100.0
+        print(
+            f"[BATCH] {done:,}/{self.total:,} rows ({pct:.1f}%), {failed:,} failed, "
+            f"{rate:,.1f} rows/s, ETA {eta}",
+            file=sys.stderr,
+            flush=True,
+        )
+
+
+def run_file(
+    input_path: str,
+    output_path: str,
+    orchestrator: Optional[Flow1Orchestrator] = None,
+    workers: int = 8,
+    restart: bool = False,
+    checkpoint_every_rows: int = CHECKPOINT_EVERY_ROWS,
+    checkpoint_every_seconds: float = CHECKPOINT_EVERY_SECONDS,
+    progress_every_seconds: float = PROGRESS_EVERY_SECONDS,
+) -> Checkpoint:
+    """
+    Run (or resume) one file. Returns the final checkpoint; the
+    checkpoint file is kept so a finished run is not repeated.
+    """
+    orchestrator = orchestrator or Flow1Orchestrator()
+    checkpoint_path = output_path + ".checkpoint.json"
+    identity = _input_identity(input_path)
+
+    cp = None if restart else Checkpoint.load(checkpoint_path)
+    if cp is not None and cp.identity != identity:
+        raise SystemExit(
+            f"{checkpoint_path} belongs to a different or modified input "
+            f"({cp.identity.get('input')}); use --restart to start over."
+        )
+    if cp is None:
+        cp = Checkpoint(checkpoint_path)
+        cp.identity = identity
+        open(output_path, "wb").close()
+    else:
+        # drop lines written after the last checkpoint: those rows are re-run
+        with open(output_path, "ab") as f:
+            f.truncate(cp.output_bytes)
+        print(
+            f"[BATCH] Resuming: {cp.rows_done:,} rows done, "
+            f"{len(cp.in_flight):,} in flight at the last checkpoint will be re-run",
+            file=sys.stderr,
+        )
+        cp.in_flight.clear()
+
+    total = count_csv_rows(input_path)
+    progress = _Progress(total, cp.rows_done, progress_every_seconds)
+    out = open(output_path, "ab")
+    pos_to_idx: Dict[int, int] = {}
+    errors: List[tuple] = []
+
+    def skip_row(err: RowError) -> None:
+        # malformed rows never reach the output; keep them out of the ETA
+        print(f"[BATCH] Skipping line {err.line_number}: {err.error}", file=sys.stderr)
+        progress.total -= 1
+
+    def pending_rows() -> Iterator[ProviderInput]:
+        pos = 0
+        for idx, provider in enumerate(iter_providers_from_csv(input_path, on_error=skip_row)):
+            if cp.is_done(idx):
+                continue
+            pos_to_idx[pos] = idx
+            cp.in_flight.add(idx)
+            pos += 1
+            yield provider
+
+    def on_error(pos: int, provider: ProviderInput, e: Exception) -> None:
+        errors.append((pos_to_idx.pop(pos), str(e)))
+
+    def write_errors() -> None:
+        while errors:
+            idx, message = errors.pop()
+            out.write((json.dumps({"index": idx, "error": message}) + "\n").encode("utf-8"))
+            cp.mark_done(idx, failed=True)
+
+    def save_checkpoint() -> None:
+        out.flush()
+        os.fsync(out.fileno())
+        cp.output_bytes = out.tell()
+        cp.elapsed += time.monotonic() - segment_started[0]
+        segment_started[0] = time.monotonic()
+        cp.save()
+
+    segment_started = [time.monotonic()]
+    since_checkpoint = 0
+    last_checkpoint = time.monotonic()
+    batch = orchestrator.iter_batch(pending_rows(), max_workers=workers, on_error=on_error, as_records=True)
+    try:
+        for pos, report in batch:
+            idx = pos_to_idx.pop(pos)
+            out.write(b'{"index":%d,"report":%s}\n' % (idx, report_json(report).encode("utf-8")))
+            cp.mark_done(idx)
+            write_errors()
+            since_checkpoint += 1
+
+            if (
+                since_checkpoint >= checkpoint_every_rows
+                or time.monotonic() - last_checkpoint >= checkpoint_every_seconds
+            ):
+                save_checkpoint()
+                since_checkpoint = 0
+                last_checkpoint = time.monotonic()
+            progress.maybe_print(cp.rows_done, cp.rows_failed)
+    except KeyboardInterrupt:
+        print("[BATCH] Interrupted; saving checkpoint", file=sys.stderr)
+        raise
+    finally:
+        batch.close()
+        write_errors()
+        save_checkpoint()
+        out.close()
+        progress.maybe_print(cp.rows_done, cp.rows_failed, force=True)
+
+    return cp
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Resumable Flow-1 batch run over a roster CSV.")
+    parser.add_argument("input_csv")
+    parser.add_argument("output_jsonl")
+    parser.add_argument("--workers", type=int, default=8, help="pipeline threads")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--checkpoint-rows", type=int, default=CHECKPOINT_EVERY_ROWS)
+    parser.add_argument("--checkpoint-seconds", type=float, default=CHECKPOINT_EVERY_SECONDS)
+    parser.add_argument("--progress-seconds", type=float, default=PROGRESS_EVERY_SECONDS)
+    args = parser.parse_args(argv)
+
+    from candidate_index import candidate_index_from_env
+    from npi_sources import npi_source_from_env
+
+    orchestrator = Flow1Orchestrator(
+        npi_source=npi_source_from_env(), candidate_index=candidate_index_from_env()
+    )
+    try:
+        cp = run_file(
+            args.input_csv,
+            args.output_jsonl,
+            orchestrator=orchestrator,
+            workers=args.workers,
+            restart=args.restart,
+            checkpoint_every_rows=args.checkpoint_rows,
+            checkpoint_every_seconds=args.checkpoint_seconds,
+            progress_every_seconds=args.progress_seconds,
+        )
+    except KeyboardInterrupt:
+        raise SystemExit(130)
+    finally:
+        orchestrator.shutdown()
+    print(f"[BATCH] Done: {cp.rows_done:,} rows ({cp.rows_failed:,} failed) -> {args.output_jsonl}")
+
+
+if __name__ == "__main__":
+    main()
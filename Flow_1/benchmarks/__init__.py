@@ -0,0 +1 @@
+# Makes "benchmarks" a package (run from Flow_1: python -m benchmarks.<name>).
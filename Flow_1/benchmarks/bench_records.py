@@ -0,0 +1,125 @@
+# benchmarks/bench_records.py
+"""
+Time and allocations per provider for Flow-1 steps 2-4 (QA, summarize,
+explain) starting from already-fetched sources:
+
+- models at every stage: a validated DataValidationResult, five
+  FieldWithConfidence + ProviderOutput, then ProviderReport (the hot
+  path before records.py)
+- records, model at the boundary: what run_batch / arun_batch return
+  by default
+- records only: what batches with `as_records=True` keep until the
+  serialization / persistence edge (records.report_json)
+
+    cd Flow_1
+    python -m benchmarks.bench_records --rows 5000
+
+Memory is what the reports keep alive (tracemalloc), per provider;
+blocks are sys.getallocatedblocks() deltas over the same.
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from agents.directory_management_agent import DirectoryManagementAgent
+from agents.llm_explanation_agent import LLMExplanationAgent
+from agents.quality_assurance_agent import QualityAssuranceAgent
+from benchmarks.roster import generate_roster
+from benchmarks.run_benchmarks import _prefetched_results
+from models import DataValidationResult, FieldWithConfidence, ProviderOutput
+from records import ValidationRecord
+
+FIELDS = ("name", "npi", "mobile_no", "address", "speciality")
+
+qa = QualityAssuranceAgent()
+dm = DirectoryManagementAgent()
+llm = LLMExplanationAgent()
+
+
+def models_each_stage(source: Tuple):
+    provider, npi_raw, website_data, status = source
+    result = DataValidationResult(
+        provider_input=provider, npi_raw=npi_raw, website_data=website_data, npi_lookup_status=status
+    )
+    fields = qa.generate_output_record(result)
+    output = ProviderOutput(**{
+        name: FieldWithConfidence(value=f.value, confidence=f.confidence, note=f.note)
+        for name, f in zip(FIELDS, fields)
+    })
+    report = dm.summarize_provider(provider, output)
+    report.llm_explanation = llm.explain(report)
+    return report
+
+
+def records_only(source: Tuple):
+    record = dm.summarize_record(source[0], qa.generate_output_record(ValidationRecord(*source)))
+    record.llm_explanation = llm.explain(record)
+    return record
+
+
+def records_then_model(source: Tuple):
+    return records_only(source).to_model()
+
+
+def _measure(fn: Callable, sources: List[Tuple], repeat: int) -> Dict:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for source in sources:
+            fn(source)
+        best = min(best, time.perf_counter() - started)
+
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    kept = [fn(source) for source in sources]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    blocks = sys.getallocatedblocks() - blocks_before
+    del kept
+
+    n = len(sources)
+    return {
+        "us_per_provider": round(best / n * 1e6, 1),
+        "bytes_per_provider": round(current / n),
+        "blocks_per_provider": round(blocks / n, 1),
+        "peak_kb": round(peak / 1024),
+    }
+
+
+def run(rows: int, repeat: int) -> Dict[str, Dict]:
+    providers = generate_roster(rows)
+    sources = [
+        (r.provider_input, r.npi_raw, r.website_data, "found" if r.npi_raw else "not_found")
+        for r in _prefetched_results(providers)
+    ]
+    cases = {
+        "models at every stage": models_each_stage,
+        "records, model at the boundary": records_then_model,
+        "records only": records_only,
+    }
+    print(f"{rows} providers, steps 2-4 (best of {repeat})")
+    results = {}
+    for name, fn in cases.items():
+        results[name] = r = _measure(fn, sources, repeat)
+        print(
+            f"  {name:<32} {r['us_per_provider']:>7.1f} us {r['bytes_per_provider']:>7,} B "
+            f"{r['blocks_per_provider']:>6.1f} blocks  (peak {r['peak_kb']:,} KB)"
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark hot-path record types.")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
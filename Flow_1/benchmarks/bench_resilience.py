@@ -0,0 +1,116 @@
+# benchmarks/bench_resilience.py
+"""
+NPI Registry calls against a misbehaving stub, with and without the
+protections in resilience.py:
+
+- tail     a share of registry calls takes --slow-ms; npi_hedge off vs on
+           (per-row p50/p95/p99/max and batch time)
+- outage   the registry answers every call with 503; npi_breaker off vs
+           on (time until every row is "source_unavailable", and how many
+           requests the dead registry still received)
+
+    cd Flow_1
+    python -m benchmarks.bench_resilience --rows 400 --slow-rate 0.03
+
+Rows only look up NPIs (no practice sites) so the numbers are about the
+registry path.
+"""
+import os
+
+os.environ["NPI_CACHE_PATH"] = ""
+
+import argparse
+import time
+from typing import Dict, List, Optional
+
+import npi_client
+from benchmarks.roster import generate_roster
+from benchmarks.run_benchmarks import _TimedOrchestrator, _point_pipeline_at, summarize
+from benchmarks.stub_server import StubConfig, StubServer
+from resilience import AdaptiveLimiter, CircuitBreaker, Hedge
+
+
+def _fresh_npi_client(stub: StubServer, hedge: bool, breaker: bool) -> None:
+    """
+    Cold cache and fresh limiter / hedge / breaker state for each case.
+    """
+    _point_pipeline_at(stub, host_concurrency=8)
+    npi_client.npi_limiter = AdaptiveLimiter("npi", initial=32, maximum=64)
+    npi_client.npi_hedge = Hedge("npi", enabled=hedge, limiter=npi_client.npi_limiter)
+    npi_client.npi_breaker = CircuitBreaker("npi", open_seconds=30) if breaker else None
+
+
+def _run(providers, stub: StubServer, workers: int) -> Dict:
+    stub.reset_stats()
+    orch = _TimedOrchestrator(practice_websites={})
+    started = time.perf_counter()
+    reports = orch.run_batch(providers, max_workers=workers)
+    seconds = time.perf_counter() - started
+    summary = summarize(len(providers), seconds, orch.latencies, failed=len(providers) - len(reports))
+    summary["max_ms"] = round(max(orch.latencies, default=0.0) * 1000, 3)
+    summary["unavailable"] = sum(r.status == "source_unavailable" for r in reports)
+    summary["registry_requests"] = stub.stats().get("npi", {}).get("requests", 0)
+    return summary
+
+
+def bench_tail(rows: int, workers: int, latency_ms: float, slow_rate: float, slow_ms: float) -> Dict:
+    providers = generate_roster(rows, seed=11)
+    config = StubConfig(latency_ms=latency_ms, jitter_ms=latency_ms / 4, slow_rate=slow_rate, slow_ms=slow_ms)
+    results = {}
+    with StubServer(config) as stub:
+        for name, hedge in (("hedge off", False), ("hedge on", True)):
+            _fresh_npi_client(stub, hedge=hedge, breaker=True)
+            results[name] = _run(providers, stub, workers)
+            results[name]["hedge"] = npi_client.npi_hedge.stats()
+            npi_client.npi_hedge.shutdown()
+    return results
+
+
+def bench_outage(rows: int, workers: int, latency_ms: float) -> Dict:
+    providers = generate_roster(rows, seed=12)
+    config = StubConfig(latency_ms=latency_ms, jitter_ms=latency_ms / 4, down=True)
+    results = {}
+    with StubServer(config) as stub:
+        for name, breaker in (("breaker off", False), ("breaker on", True)):
+            _fresh_npi_client(stub, hedge=False, breaker=breaker)
+            results[name] = _run(providers, stub, workers)
+            if breaker:
+                results[name]["breaker"] = npi_client.npi_breaker.stats()
+    return results
+
+
+def _print(title: str, results: Dict[str, Dict]) -> None:
+    print(title)
+    for name, r in results.items():
+        print(
+            f"  {name:<12} {r['seconds']:>7.2f} s  p50 {r['p50_ms']:>8.1f}  p95 {r['p95_ms']:>8.1f}  "
+            f"p99 {r['p99_ms']:>8.1f}  max {r['max_ms']:>8.1f} ms  "
+            f"unavailable {r['unavailable']:>4}  registry requests {r['registry_requests']:>5}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark NPI hedging and circuit breaking.")
+    parser.add_argument("--rows", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--slow-ms", type=float, default=1500.0)
+    parser.add_argument("--scenarios", default="tail,outage")
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenarios.split(",")
+    if "tail" in scenarios:
+        _print(
+            f"tail: {args.rows} rows, {args.slow_rate:.0%} of registry calls take {args.slow_ms:.0f} ms",
+            bench_tail(args.rows, args.workers, args.latency_ms, args.slow_rate, args.slow_ms),
+        )
+    if "outage" in scenarios:
+        _print(
+            f"outage: {args.rows} rows, registry answers 503",
+            bench_outage(args.rows, args.workers, args.latency_ms),
+        )
+
+
+if __name__ == "__main__":
+    main()
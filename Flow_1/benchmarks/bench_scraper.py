@@ -0,0 +1,118 @@
+# benchmarks/bench_scraper.py
+"""
+Compare the BeautifulSoup extractor that scrape_practice_site used to run
+with the current single-pass lxml extractor, on saved practice pages.
+
+    cd Flow_1
+    python -m benchmarks.bench_scraper                      # bundled sample pages
+    python -m benchmarks.bench_scraper --pages /path/to/saved/html --repeat 50
+
+Reports mean time per page for both extractors, the speed-up, and any
+page where the two disagree.
+"""
+import argparse
+import glob
+import os
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from website_scraper import extract_practice_fields
+
+DEFAULT_PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+
+
+def legacy_extract_practice_fields(html: str) -> Optional[Dict[str, str]]:
+    """
+    The original extractor, kept verbatim as the baseline.
+    """
+    soup = BeautifulSoup(html, "lxml")
+    text = soup.get_text(separator="\n")
+    text_lower = text.lower()
+
+    speciality = None
+    for spec in [
+        "cardiology", "dermatology", "neurology", "pediatrics",
+        "family medicine", "internal medicine", "orthopedics",
+        "ophthalmology", "endocrinology", "gastroenterology",
+    ]:
+        if spec in text_lower:
+            speciality = spec.title()
+            break
+
+    phone_match = re.search(r'\+?\d[\d\-\s\(\)]{7,}', text)
+    phone = phone_match.group(0).strip() if phone_match else None
+
+    address = None
+    for line in text.splitlines():
+        if any(tag in line for tag in ["Street", "St", "Ave", "Avenue", "Road", "Rd", "Blvd", "Drive", "Dr"]):
+            cleaned = line.strip()
+            if len(cleaned) > 10:
+                address = cleaned
+                break
+
+    result: Dict[str, str] = {}
+    if phone:
+        result["phone"] = phone
+    if address:
+        result["address"] = address
+    if speciality:
+        result["speciality"] = speciality
+
+    return result or None
+
+
+def _time_per_page(fn: Callable[[str], Optional[Dict]], pages: List[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            fn(html)
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+
+def run(pages_dir: str, repeat: int) -> Dict:
+    paths = sorted(glob.glob(os.path.join(pages_dir, "*.htm*")))
+    if not paths:
+        raise SystemExit(f"No .html pages found in {pages_dir}")
+
+    pages = []
+    for path in paths:
+        with open(path, mode="r", encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+
+    mismatches = []
+    for path, html in zip(paths, pages):
+        old, new = legacy_extract_practice_fields(html), extract_practice_fields(html)
+        if old != new:
+            mismatches.append({"page": os.path.basename(path), "legacy": old, "current": new})
+
+    legacy_s = _time_per_page(legacy_extract_practice_fields, pages, repeat)
+    current_s = _time_per_page(extract_practice_fields, pages, repeat)
+
+    return {
+        "pages": len(pages),
+        "total_kb": round(sum(len(p) for p in pages) / 1024, 1),
+        "repeat": repeat,
+        "legacy_ms_per_page": round(legacy_s * 1000, 3),
+        "current_ms_per_page": round(current_s * 1000, 3),
+        "speedup": round(legacy_s / current_s, 2) if current_s else None,
+        "mismatches": mismatches,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark practice-page field extraction.")
+    parser.add_argument("--pages", default=DEFAULT_PAGES_DIR, help="Directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the page set per extractor")
+    args = parser.parse_args()
+
+    result = run(args.pages, args.repeat)
+    print(f"Pages            : {result['pages']} ({result['total_kb']} KB)")
+    print(f"Legacy (bs4)     : {result['legacy_ms_per_page']:.3f} ms/page")
+    print(f"Current (lxml)   : {result['current_ms_per_page']:.3f} ms/page")
+    print(f"Speed-up         : {result['speedup']}x")
+    print(f"Mismatching pages: {len(result['mismatches'])}")
+    for m in result["mismatches"]:
+        print(f"  - {m['page']}: legacy={m['legacy']} current={m['current']}")
@@ -0,0 +1,102 @@
+# benchmarks/bench_serialization.py
+"""
+Payload size and encode time of the /flow1/validate-batch response body:
+the original encoding (model_dump() per report, review-queue reports
+dumped a second time, FastAPI's jsonable_encoder + json) against the
+encodings in serialization.py.
+
+    cd Flow_1
+    python -m benchmarks.bench_serialization --rows 5000
+
+Reports are real QA / summarize output on a synthetic roster (no network).
+"""
+import argparse
+import gzip
+import time
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from agents.directory_management_agent import DirectoryManagementAgent
+from agents.quality_assurance_agent import QualityAssuranceAgent
+from benchmarks.roster import generate_roster
+from benchmarks.run_benchmarks import _prefetched_results
+from models import ProviderReport
+from serialization import compress, encode_batch_body, zstandard
+
+
+def build_reports(rows: int) -> List[ProviderReport]:
+    providers = generate_roster(rows)
+    results = _prefetched_results(providers)
+    qa = QualityAssuranceAgent()
+    dm = DirectoryManagementAgent()
+    outputs = qa.generate_outputs(results)
+    return [dm.summarize_provider(p, o) for p, o in zip(providers, outputs)]
+
+
+def legacy_body(reports: List[ProviderReport], dm: DirectoryManagementAgent) -> bytes:
+    """
+    What validate_batch returned before: a dict of model_dump()s rendered
+    by FastAPI (jsonable_encoder, then JSONResponse).
+    """
+    queue = dm.prioritized_review_queue(reports)
+    body = {
+        "reports": [r.model_dump() for r in reports],
+        "review_queue": [r.model_dump() for r in queue],
+        "dedup_stats": {"hits": 0, "misses": len(reports)},
+    }
+    return JSONResponse(content=jsonable_encoder(body)).body
+
+
+def _timed(fn: Callable[[], bytes], repeat: int) -> Dict:
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - started)
+    return {"ms": round(best * 1000, 1), "bytes": len(body)}
+
+
+def run(rows: int, repeat: int) -> Dict[str, Dict]:
+    reports = build_reports(rows)
+    dm = DirectoryManagementAgent()
+    indices = dm.prioritized_review_indices(reports)
+    extra = {"dedup_stats": {"hits": 0, "misses": len(reports)}}
+
+    def new(compact: bool = False, omit: bool = False, encoding: str = "") -> Callable[[], bytes]:
+        def encode() -> bytes:
+            body = encode_batch_body(reports, indices, extra, compact=compact, omit_unchanged=omit)
+            return compress(body, encoding)[0]
+        return encode
+
+    cases = {
+        "legacy (model_dump x2 + jsonable_encoder)": lambda: legacy_body(reports, dm),
+        "legacy + gzip": lambda: gzip.compress(legacy_body(reports, dm), 5),
+        "same shape, encoded once": new(),
+        "compact": new(compact=True),
+        "compact + omit_unchanged": new(compact=True, omit=True),
+        "compact + omit_unchanged + gzip": new(compact=True, omit=True, encoding="gzip"),
+    }
+    if zstandard is not None:
+        cases["compact + omit_unchanged + zstd"] = new(compact=True, omit=True, encoding="zstd")
+
+    print(f"{rows} reports, {len(indices)} in the review queue (best of {repeat})")
+    results = {}
+    for name, fn in cases.items():
+        results[name] = _timed(fn, repeat)
+        print(f"  {name:<40} {results[name]['bytes'] / 1024:>9.0f} KB {results[name]['ms']:>9.1f} ms")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark batch response encoding.")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# benchmarks/roster.py
+"""
+Synthetic provider rosters for benchmarks.
+
+Every NPI has one "registry truth" (synthetic_record), which the stub server
+serves and the roster rows are derived from, so a generated roster exercises
+every QA path: exact matches, drifted fields, unknown NPIs and duplicates.
+
+    cd Flow_1
+    python -m benchmarks.roster --rows 10000 --dup-rate 0.3 --out /tmp/roster.csv
+"""
+import argparse
+import csv
+import random
+import zlib
+from typing import Dict, List, Optional
+
+from models import ProviderInput
+
+FIRST_NAMES = (
+    "James", "Maria", "Robert", "Linda", "Michael", "Aisha", "David", "Priya",
+    "John", "Elena", "Wei", "Fatima", "Carlos", "Grace", "Ahmed", "Sofia",
+)
+LAST_NAMES = (
+    "Smith", "Garcia", "Johnson", "Patel", "Brown", "Nguyen", "Miller", "Khan",
+    "Davis", "Lopez", "Wilson", "Chen", "Moore", "Okafor", "Taylor", "Rossi",
+)
+STREETS = ("Main St", "Oak Ave", "Maple Rd", "Cedar Blvd", "Park Dr", "Elm Street")
+CITIES = (
+    ("Springfield", "IL", "62701"), ("Riverside", "CA", "92501"),
+    ("Fairview", "TX", "75069"), ("Madison", "WI", "53703"),
+    ("Georgetown", "KY", "40324"), ("Salem", "OR", "97301"),
+)
+SPECIALITIES = (
+    "Cardiology", "Dermatology", "Neurology", "Pediatrics", "Family Medicine",
+    "Internal Medicine", "Orthopedics", "Ophthalmology",
+)
+
+# Fraction of NPIs the stub registry does not know (deterministic per NPI)
+NOT_FOUND_RATE = 0.05
+
+
+def _rng_for(npi: str) -> random.Random:
+    return random.Random(zlib.crc32(npi.encode()))
+
+
+def npi_is_known(npi: str) -> bool:
+    return zlib.crc32(b"known:" + npi.encode()) % 1000 >= NOT_FOUND_RATE * 1000
+
+
+def _truth(npi: str) -> Dict[str, str]:
+    rng = _rng_for(npi)
+    city, state, postal = rng.choice(CITIES)
+    return {
+        "first_name": rng.choice(FIRST_NAMES),
+        "last_name": rng.choice(LAST_NAMES),
+        "address_1": f"{rng.randint(1, 9999)} {rng.choice(STREETS)}",
+        "city": city,
+        "state": state,
+        "postal_code": postal,
+        "phone": f"{rng.randint(200, 989)}-555-{rng.randint(0, 9999):04d}",
+        "speciality": rng.choice(SPECIALITIES),
+    }
+
+
+def synthetic_record(npi: str) -> Optional[Dict[str, str]]:
+    """
+    The registry's view of an NPI (flat fields), or None if unknown.
+    """
+    return _truth(npi) if npi_is_known(npi) else None
+
+
+def registry_result(npi: str) -> Optional[Dict]:
+    """
+    synthetic_record in the NPI Registry API result shape.
+    """
+    rec = synthetic_record(npi)
+    if rec is None:
+        return None
+    return {
+        "number": npi,
+        "enumeration_type": "NPI-1",
+        "basic": {"first_name": rec["first_name"], "last_name": rec["last_name"]},
+        "addresses": [{
+            "address_purpose": "LOCATION",
+            "address_1": rec["address_1"],
+            "city": rec["city"],
+            "state": rec["state"],
+            "postal_code": rec["postal_code"],
+            "telephone_number": rec["phone"],
+        }],
+        "taxonomies": [{"code": "207R00000X", "desc": rec["speciality"], "primary": True}],
+    }
+
+
+def practice_page(npi: str) -> str:
+    """
+    HTML for the NPI's practice website (same truth as the registry).
+    """
+    rec = _truth(npi)
+    nav = "".join(f'<li><a href="/s{i}">Service {i}</a></li>' for i in range(30))
+    return (
+        "<!DOCTYPE html><html><head><title>Practice</title>"
+        "<style>body{font-family:sans-serif}</style>"
+        "<script>var analytics={id:'UA-0000'};</script></head><body>"
+        f"<nav><ul>{nav}</ul></nav>"
+        f"<h1>Dr. {rec['first_name']} {rec['last_name']}</h1>"
+        f"<p>Board-certified {rec['speciality']} care for the whole family.</p>"
+        f"<div class='contact'><p>Call {rec['phone']}</p>"
+        f"<p>{rec['address_1']}, {rec['city']}, {rec['state']} {rec['postal_code']}</p></div>"
+        "<footer>&copy; Practice</footer></body></html>"
+    )
+
+
+def _provider_from_npi(npi: str, rng: random.Random, drift_rate: float) -> ProviderInput:
+    rec = _truth(npi)
+    name = f"Dr. {rec['first_name']} {rec['last_name']}"
+    phone = rec["phone"]
+    address = f"{rec['address_1']}, {rec['city']}, {rec['state']}, {rec['postal_code']}"
+    speciality = rec["speciality"]
+
+    # roster data drifts from the registry: stale phones, moved offices, typos
+    if rng.random() < drift_rate:
+        phone = f"{rng.randint(200, 989)}-555-{rng.randint(0, 9999):04d}"
+    if rng.random() < drift_rate:
+        address = f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, {rng.choice(CITIES)[0]}"
+    if rng.random() < drift_rate:
+        speciality = rng.choice(SPECIALITIES)
+    if rng.random() < drift_rate / 2:
+        name = name.replace("Dr. ", "")
+
+    return ProviderInput(
+        name=name,
+        npi=npi,
+        mobile_no=phone,
+        address=address,
+        speciality=speciality,
+        member_impact=rng.randint(1, 5),
+    )
+
+
+def generate_roster(
+    rows: int,
+    dup_rate: float = 0.2,
+    drift_rate: float = 0.3,
+    seed: int = 42,
+) -> List[ProviderInput]:
+    """
+    `rows` providers; about `dup_rate` of them repeat an NPI already in
+    the roster (as real rosters do across plans / locations).
+    """
+    if not 0 <= dup_rate < 1:
+        raise ValueError("dup_rate must be in [0, 1)")
+
+    rng = random.Random(seed)
+    providers: List[ProviderInput] = []
+    seen: List[str] = []
+    for _ in range(rows):
+        if seen and rng.random() < dup_rate:
+            npi = rng.choice(seen)
+        else:
+            npi = str(1_000_000_000 + rng.randrange(900_000_000))
+            seen.append(npi)
+        providers.append(_provider_from_npi(npi, rng, drift_rate))
+    return providers
+
+
+def write_roster_csv(providers: List[ProviderInput], path: str) -> None:
+    fields = ["name", "npi", "mobile_no", "address", "speciality", "member_impact"]
+    with open(path, mode="w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for p in providers:
+            writer.writerow(p.model_dump())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic provider roster CSV.")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--dup-rate", type=float, default=0.2)
+    parser.add_argument("--drift-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    roster = generate_roster(args.rows, args.dup_rate, args.drift_rate, args.seed)
+    write_roster_csv(roster, args.out)
+    print(f"Wrote {len(roster)} providers to {args.out}")
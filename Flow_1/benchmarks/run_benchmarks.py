@@ -0,0 +1,430 @@
+# benchmarks/run_benchmarks.py
+"""
+Reproducible Flow-1 throughput benchmarks against the local stub server.
+
+    cd Flow_1
+    python -m benchmarks.run_benchmarks --rows 2000 --dup-rate 0.3
+    python -m benchmarks.run_benchmarks --baseline benchmarks/results/<earlier>.json
+
+Scenarios (pick with --scenarios):
+- qa          QualityAssuranceAgent.generate_output on pre-fetched data (CPU only)
+- qa_batch    QualityAssuranceAgent.generate_outputs on the same data, in chunks
+              (per-row latency = chunk time / chunk size); also counts rows
+              whose output differs from generate_output
+- run_batch   thread-pool pipeline, cold NPI cache, stub backends
+- arun_batch  asyncio pipeline, cold NPI cache, stub backends
+- endpoints   POST /flow1/validate-provider and /flow1/validate-batch
+- incremental nightly re-run with warm NPI / page caches: full pass vs
+              incremental pass (fingerprint store primed by a first run)
+- hybrid      warm NPI / page caches: run_batch (threads only) vs
+              run_batch_hybrid (CPU stages in --cpu-workers processes);
+              hybrid rows report no per-row latency
+
+Each scenario reports rows/sec and per-row (per-request for endpoints)
+p50/p95/p99 latency. Results are written as JSON; with --baseline the run
+fails (exit 1) when a scenario's rows/sec drops by more than --tolerance.
+"""
+import os
+import tempfile
+
+# Benchmarks must start cold and must not touch the real caches / job store.
+os.environ["NPI_CACHE_PATH"] = ""
+os.environ["PAGE_CACHE_PATH"] = ""
+os.environ.setdefault("FLOW1_JOBS_DIR", tempfile.mkdtemp(prefix="flow1-bench-jobs-"))
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import npi_client
+import website_scraper
+from models import DataValidationResult, ProviderInput, ProviderReport
+from orchestrator import Flow1Orchestrator
+from page_fetcher import PageCache, PageFetcher
+from fingerprint_store import FingerprintStore, IncrementalRun
+from hybrid_pipeline import HybridExecutor
+from agents.quality_assurance_agent import QualityAssuranceAgent
+from benchmarks.roster import generate_roster, practice_page, registry_result
+from benchmarks.stub_server import StubConfig, StubServer
+
+SCENARIOS = ("qa", "qa_batch", "run_batch", "arun_batch", "endpoints", "incremental", "hybrid")
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(p / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(rows: int, seconds: float, latencies: List[float], failed: int = 0) -> Dict:
+    latencies = sorted(latencies)
+    return {
+        "rows": rows,
+        "failed": failed,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds, 2) if seconds > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+class _TimedOrchestrator(Flow1Orchestrator):
+    """
+    Records the wall time of every provider run.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.latencies: List[float] = []
+
+    def run_for_provider(self, provider, *args, **kwargs) -> ProviderReport:
+        started = time.perf_counter()
+        try:
+            return super().run_for_provider(provider, *args, **kwargs)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+    async def arun_for_provider(self, provider, **kwargs) -> ProviderReport:
+        started = time.perf_counter()
+        try:
+            return await super().arun_for_provider(provider, **kwargs)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+
+def _point_pipeline_at(stub: StubServer, host_concurrency: int, page_cache: Optional[PageCache] = None) -> None:
+    npi_client.NPI_BASE_URL = stub.npi_url
+    npi_client.npi_cache.clear()
+    # one stub host stands in for thousands of practice sites: no politeness delay
+    website_scraper.page_fetcher = PageFetcher(
+        cache=page_cache, host_concurrency=host_concurrency, host_rate=0
+    )
+
+
+# ---------- scenarios ----------
+
+def _prefetched_results(providers: List[ProviderInput]) -> List[DataValidationResult]:
+    fields_by_npi: Dict[str, Optional[Dict[str, str]]] = {}
+    results = []
+    for p in providers:
+        if p.npi not in fields_by_npi:
+            fields_by_npi[p.npi] = website_scraper.extract_practice_fields(practice_page(p.npi))
+        results.append(DataValidationResult(
+            provider_input=p,
+            npi_raw=registry_result(p.npi),
+            website_data=fields_by_npi[p.npi],
+        ))
+    return results
+
+
+def bench_qa(providers: List[ProviderInput]) -> Dict:
+    results = _prefetched_results(providers)
+    qa = QualityAssuranceAgent()
+    latencies = []
+    outputs = []  # kept, like a real batch does
+    started = time.perf_counter()
+    for result in results:
+        t0 = time.perf_counter()
+        outputs.append(qa.generate_output(result))
+        latencies.append(time.perf_counter() - t0)
+    return summarize(len(results), time.perf_counter() - started, latencies)
+
+
+def bench_qa_batch(providers: List[ProviderInput], chunk_size: int) -> Dict:
+    results = _prefetched_results(providers)
+    qa = QualityAssuranceAgent()
+    latencies = []
+    outputs = []
+    started = time.perf_counter()
+    for i in range(0, len(results), chunk_size):
+        chunk = results[i:i + chunk_size]
+        t0 = time.perf_counter()
+        outputs.extend(qa.generate_outputs(chunk))
+        latencies.extend([(time.perf_counter() - t0) / len(chunk)] * len(chunk))
+    summary = summarize(len(results), time.perf_counter() - started, latencies)
+
+    summary["chunk_size"] = chunk_size
+    summary["mismatches"] = sum(
+        out != qa.generate_output(result) for out, result in zip(outputs, results)
+    )
+    return summary
+
+
+def bench_run_batch(providers, sites, stub, workers: int) -> Dict:
+    _point_pipeline_at(stub, host_concurrency=workers)
+    orch = _TimedOrchestrator(practice_websites=sites)
+    started = time.perf_counter()
+    reports = orch.run_batch(providers, max_workers=workers)
+    seconds = time.perf_counter() - started
+    return summarize(len(providers), seconds, orch.latencies, failed=len(providers) - len(reports))
+
+
+def bench_arun_batch(providers, sites, stub, npi_concurrency: int, scrape_concurrency: int) -> Dict:
+    _point_pipeline_at(stub, host_concurrency=scrape_concurrency)
+    orch = _TimedOrchestrator(practice_websites=sites)
+    started = time.perf_counter()
+    reports = asyncio.run(orch.arun_batch(
+        providers, npi_concurrency=npi_concurrency, scrape_concurrency=scrape_concurrency
+    ))
+    seconds = time.perf_counter() - started
+    return summarize(len(providers), seconds, orch.latencies, failed=len(providers) - len(reports))
+
+
+def bench_incremental(providers, sites, stub, workers: int) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="flow1-bench-incremental-")
+    _point_pipeline_at(
+        stub, host_concurrency=workers,
+        page_cache=PageCache(os.path.join(workdir, "pages.sqlite3")),
+    )
+    store = FingerprintStore(os.path.join(workdir, "fingerprints.sqlite3"))
+    orch = Flow1Orchestrator(practice_websites=sites)
+
+    # first night: everything is new
+    orch.run_batch(providers, max_workers=workers, incremental=IncrementalRun(store))
+
+    results = {}
+    for mode in ("full", "incremental"):
+        run = IncrementalRun(store) if mode == "incremental" else None
+        timed = _TimedOrchestrator(practice_websites=sites)
+        started = time.perf_counter()
+        reports = timed.run_batch(providers, max_workers=workers, incremental=run)
+        seconds = time.perf_counter() - started
+        results[mode] = summarize(len(providers), seconds, timed.latencies, len(providers) - len(reports))
+        if run is not None:
+            results[mode].update(run.stats())
+    return results
+
+
+def bench_hybrid(providers, sites, stub, workers: int, cpu_workers: int) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="flow1-bench-hybrid-")
+    _point_pipeline_at(
+        stub, host_concurrency=workers,
+        page_cache=PageCache(os.path.join(workdir, "pages.sqlite3")),
+    )
+    orch = Flow1Orchestrator(practice_websites=sites)
+    orch.hybrid = HybridExecutor(
+        io_workers=workers, parse_workers=cpu_workers, score_workers=cpu_workers
+    )
+
+    # warm the NPI / page caches and start the worker processes
+    orch.run_batch(providers, max_workers=workers)
+    orch.run_batch_hybrid(providers[:orch.hybrid.chunk_rows * max(1, cpu_workers)])
+
+    results = {}
+    timed = _TimedOrchestrator(practice_websites=sites)
+    started = time.perf_counter()
+    reports = timed.run_batch(providers, max_workers=workers)
+    seconds = time.perf_counter() - started
+    results["threads"] = summarize(len(providers), seconds, timed.latencies, len(providers) - len(reports))
+
+    try:
+        started = time.perf_counter()
+        hybrid_reports = orch.run_batch_hybrid(providers)
+        seconds = time.perf_counter() - started
+    finally:
+        orch.shutdown()
+    results["hybrid"] = summarize(len(providers), seconds, [], len(providers) - len(hybrid_reports))
+    results["hybrid"]["mismatches"] = sum(a != b for a, b in zip(reports, hybrid_reports))
+    return results
+
+
+def bench_endpoints(providers, sites, stub, scrape_concurrency: int, batch_size: int, single_rows: int) -> Dict:
+    from fastapi.testclient import TestClient
+    import main
+
+    main.orchestrator.dv_agent.practice_websites = sites
+    results = {}
+
+    with TestClient(main.app) as client:
+        # single-provider endpoint, one request at a time
+        _point_pipeline_at(stub, host_concurrency=scrape_concurrency)
+        rows = providers[:single_rows]
+        latencies, failed = [], 0
+        started = time.perf_counter()
+        for p in rows:
+            t0 = time.perf_counter()
+            resp = client.post("/flow1/validate-provider", json=p.model_dump())
+            latencies.append(time.perf_counter() - t0)
+            failed += resp.status_code != 200
+        results["validate_provider"] = summarize(len(rows), time.perf_counter() - started, latencies, failed)
+
+        # batch endpoint, `batch_size` rows per request
+        _point_pipeline_at(stub, host_concurrency=scrape_concurrency)
+        latencies, failed = [], 0
+        started = time.perf_counter()
+        for i in range(0, len(providers), batch_size):
+            chunk = [p.model_dump() for p in providers[i:i + batch_size]]
+            t0 = time.perf_counter()
+            resp = client.post("/flow1/validate-batch", json=chunk)
+            latencies.append(time.perf_counter() - t0)
+            if resp.status_code != 200:
+                failed += len(chunk)
+            else:
+                failed += len(chunk) - len(resp.json()["reports"])
+        results["validate_batch"] = summarize(len(providers), time.perf_counter() - started, latencies, failed)
+        results["validate_batch"]["batch_size"] = batch_size
+
+    return results
+
+
+# ---------- reporting ----------
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=10,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _flatten(results: Dict) -> Dict[str, Dict]:
+    flat = {}
+    for name, value in results.items():
+        if "rows_per_sec" in value:
+            flat[name] = value
+        else:
+            for sub, sub_value in value.items():
+                flat[f"{name}.{sub}"] = sub_value
+    return flat
+
+
+def compare_to_baseline(results: Dict, baseline_path: str, tolerance: float) -> List[str]:
+    """
+    Scenarios whose rows/sec fell more than `tolerance` below the baseline.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = _flatten(json.load(f)["results"])
+
+    regressions = []
+    for name, current in _flatten(results).items():
+        before = baseline.get(name)
+        if not before or not before.get("rows_per_sec"):
+            continue
+        ratio = current["rows_per_sec"] / before["rows_per_sec"]
+        if ratio < 1 - tolerance:
+            regressions.append(
+                f"{name}: {current['rows_per_sec']} rows/s vs {before['rows_per_sec']} "
+                f"in baseline ({(1 - ratio) * 100:.0f}% slower)"
+            )
+    return regressions
+
+
+def _print_table(results: Dict) -> None:
+    print(f"{'scenario':<30}{'rows/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'failed':>8}")
+    for name, r in _flatten(results).items():
+        print(
+            f"{name:<30}{r['rows_per_sec']:>10}{r['p50_ms']:>10}"
+            f"{r['p95_ms']:>10}{r['p99_ms']:>10}{r['failed']:>8}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Flow-1 throughput benchmarks.")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--dup-rate", type=float, default=0.2)
+    parser.add_argument("--drift-rate", type=float, default=0.3)
+    parser.add_argument("--site-rate", type=float, default=0.5,
+                        help="fraction of NPIs with a practice website")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--qa-chunk", type=int, default=1000, help="rows per generate_outputs call")
+    parser.add_argument("--workers", type=int, default=32, help="run_batch threads")
+    parser.add_argument("--cpu-workers", type=int, default=os.cpu_count() or 1,
+                        help="parse / score processes for the hybrid scenario")
+    parser.add_argument("--npi-concurrency", type=int, default=16)
+    parser.add_argument("--scrape-concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=250, help="rows per /validate-batch request")
+    parser.add_argument("--single-rows", type=int, default=200, help="requests to /validate-provider")
+    parser.add_argument("--out", help="result JSON (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier result JSON to compare rows/sec against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    providers = generate_roster(args.rows, args.dup_rate, args.drift_rate, args.seed)
+    stub_config = StubConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_429, args.seed)
+
+    results: Dict = {}
+    stub_stats: Dict = {}
+    with StubServer(stub_config) as stub:
+        unique_npis = sorted({p.npi for p in providers})
+        site_count = int(len(unique_npis) * args.site_rate)
+        sites = {npi: stub.site_url(npi) for npi in unique_npis[:site_count]}
+
+        for name in scenarios:
+            stub.reset_stats()
+            print(f"[BENCH] {name} ...")
+            if name == "qa":
+                results[name] = bench_qa(providers)
+            elif name == "qa_batch":
+                results[name] = bench_qa_batch(providers, args.qa_chunk)
+            elif name == "run_batch":
+                results[name] = bench_run_batch(providers, sites, stub, args.workers)
+            elif name == "arun_batch":
+                results[name] = bench_arun_batch(
+                    providers, sites, stub, args.npi_concurrency, args.scrape_concurrency
+                )
+            elif name == "endpoints":
+                results[name] = bench_endpoints(
+                    providers, sites, stub, args.scrape_concurrency,
+                    args.batch_size, min(args.single_rows, len(providers)),
+                )
+            elif name == "incremental":
+                results[name] = bench_incremental(providers, sites, stub, args.workers)
+            elif name == "hybrid":
+                results[name] = bench_hybrid(providers, sites, stub, args.workers, args.cpu_workers)
+            stub_stats[name] = stub.stats()
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": vars(args),
+        "roster": {"rows": len(providers), "unique_npis": len(unique_npis), "sites": len(sites)},
+        "results": results,
+        "stub_requests": stub_stats,
+    }
+
+    out = args.out or os.path.join(DEFAULT_RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    _print_table(results)
+    print(f"[BENCH] Results written to {out}")
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"[BENCH] REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
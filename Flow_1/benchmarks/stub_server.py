@@ -0,0 +1,221 @@
+# benchmarks/stub_server.py
+"""
+Local stand-in for the NPI Registry API and practice websites.
+
+- GET /api/?version=2.1&number=<npi>   registry JSON (benchmarks.roster truth)
+- GET /site/<npi>                      practice page, with ETag / 304 support
+
+Latency (with an optional slow tail), 5xx errors and 429s are
+configurable, and `down` makes every request a 503, so benchmarks can
+measure the pipeline under realistic (and hostile) backends without
+touching CMS.
+
+    cd Flow_1
+    python -m benchmarks.stub_server --port 8799 --latency-ms 80 --rate-429 0.01
+    NPI_BASE_URL=http://127.0.0.1:8799/api/ uvicorn main:app
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.roster import practice_page, registry_result
+
+
+class StubConfig:
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        jitter_ms: float = 20.0,
+        error_rate: float = 0.0,
+        rate_429: float = 0.0,
+        seed: int = 7,
+        slow_rate: float = 0.0,
+        slow_ms: float = 1000.0,
+        down: bool = False,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.seed = seed
+        self.slow_rate = slow_rate      # share of requests that take slow_ms instead
+        self.slow_ms = slow_ms
+        self.down = down                # may be flipped while the server runs
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_StubHTTPServer"
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real backends
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        stub = self.server.stub
+        parts = urlsplit(self.path)
+        backend = "npi" if parts.path.startswith("/api") else "site"
+        stub.count(backend, "requests")
+
+        time.sleep(stub.delay())
+
+        if stub.config.down:
+            stub.count(backend, "503")
+            self._send(503, b'{"error": "unavailable"}', "application/json")
+            return
+
+        fault = stub.fault()
+        if fault == 429:
+            stub.count(backend, "429")
+            self._send(429, b'{"error": "rate limited"}', "application/json", {"Retry-After": "1"})
+            return
+        if fault == 500:
+            stub.count(backend, "500")
+            self._send(500, b'{"error": "internal"}', "application/json")
+            return
+
+        if backend == "npi":
+            npi = parse_qs(parts.query).get("number", [""])[0]
+            record = registry_result(npi)
+            body = json.dumps({
+                "result_count": 1 if record else 0,
+                "results": [record] if record else [],
+            }).encode()
+            self._send(200, body, "application/json")
+            return
+
+        npi = parts.path.rstrip("/").rsplit("/", 1)[-1]
+        body = practice_page(npi).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            stub.count(backend, "304")
+            self._send(304, b"", None, {"ETag": etag})
+            return
+        self._send(200, body, "text/html; charset=utf-8", {"ETag": etag})
+
+    def _send(
+        self,
+        status: int,
+        body: bytes,
+        content_type: Optional[str],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024   # benchmarks open hundreds of connections at once
+    stub: "StubServer"
+
+
+class StubServer:
+    """
+    Threaded stub server; use as a context manager or start()/stop().
+    """
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or StubConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._httpd = _StubHTTPServer((host, port), _Handler)
+        self._httpd.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def npi_url(self) -> str:
+        return self.base_url + "/api/"
+
+    def site_url(self, npi: str) -> str:
+        return f"{self.base_url}/site/{npi}"
+
+    def delay(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+            slow = self._rng.random() < self.config.slow_rate
+        if slow:
+            return self.config.slow_ms / 1000.0
+        return max(0.0, self.config.latency_ms + jitter) / 1000.0
+
+    def fault(self) -> Optional[int]:
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.config.rate_429:
+            return 429
+        if roll < self.config.rate_429 + self.config.error_rate:
+            return 500
+        return None
+
+    def count(self, backend: str, key: str) -> None:
+        with self._lock:
+            per_backend = self._counts.setdefault(backend, {})
+            per_backend[key] = per_backend.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {b: dict(c) for b, c in self._counts.items()}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._counts = {}
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the NPI / practice-site stub server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=1000.0)
+    parser.add_argument("--down", action="store_true", help="answer every request with 503")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        args.latency_ms, args.jitter_ms, args.error_rate, args.rate_429,
+        slow_rate=args.slow_rate, slow_ms=args.slow_ms, down=args.down,
+    )
+    server = StubServer(config, host=args.host, port=args.port).start()
+    print(f"[STUB] NPI API at {server.npi_url}, practice sites at {server.base_url}/site/<npi>")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,397 @@
+# candidate_index.py
+"""
+Offline NPI candidate search for roster rows whose NPI is missing or
+wrong: "which registry records look like this name + address?".
+
+Built from the NPPES index (see nppes_index.py), no network:
+
+    python candidate_index.py nppes_index.sqlite3 npi_candidates.sqlite3
+
+then point CANDIDATE_INDEX_PATH at the output file.
+
+Blocking instead of brute force: every record is filed under
+"<name-token prefix>|<state>" for each of its name tokens, plus
+"#<ZIP5>". A query only scores the records in its own blocks
+(blocks above MAX_BLOCK rows, e.g. "john|CA", are skipped while a
+smaller one is available), and scores them in one vectorized
+rapidfuzz call per row.
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from rapidfuzz import fuzz, process
+
+from nppes_index import MMAP_SIZE, NPPESIndex
+
+# Blocks larger than this are only used when nothing smaller matched
+MAX_BLOCK = int(os.getenv("FLOW1_CANDIDATE_MAX_BLOCK", "5000"))
+# Name tokens are blocked on their first PREFIX_LEN letters (suffix typos still match)
+PREFIX_LEN = 4
+NAME_WEIGHT = 0.65
+DEFAULT_K = 5
+
+# Titles / suffixes that carry no identity
+_STOP_TOKENS = frozenset(
+    "dr mr mrs ms md do np pa pac rn lpn phd dds dmd od dpm dc pharmd psyd "
+    "lcsw lpc mph facs facp jr sr ii iii iv the of and inc llc pc pllc".split()
+)
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_ZIP_RE = re.compile(r"\b(\d{5})(?:-?\d{4})?\b")
+_STATE_BEFORE_ZIP_RE = re.compile(r"\b([A-Z]{2})[\s,]+\d{5}(?:-?\d{4})?\b")
+_STATES = frozenset(
+    "AL AK AZ AR CA CO CT DE DC FL GA HI ID IL IN IA KS KY LA ME MD MA MI MN MS MO "
+    "MT NE NV NH NJ NM NY NC ND OH OK OR PA RI SC SD TN TX UT VT VA WA WV WI WY "
+    "PR VI GU AS MP".split()
+)
+
+
+class Candidate(NamedTuple):
+    npi: str
+    score: float            # 0.0 – 1.0, name and address combined
+    name_score: float
+    address_score: Optional[float]
+    name: str
+    address: str
+
+
+def name_tokens(name: str) -> List[str]:
+    """
+    Lower-case identity tokens of a person / organization name
+    (titles, credentials and initials dropped).
+    """
+    return [
+        t for t in _TOKEN_RE.findall((name or "").lower())
+        if len(t) > 1 and t not in _STOP_TOKENS
+    ]
+
+
+def parse_state_zip(address: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (state, ZIP5) from a free-text US address, either may be None.
+    """
+    address = address or ""
+    zips = _ZIP_RE.findall(address)
+    return _state_of(address), zips[-1] if zips else None
+
+
+def _state_of(address: str) -> Optional[str]:
+    # only an upper-case code right before the ZIP or ending the address:
+    # "Ct", "la", "IN" elsewhere in a street line are words, not states
+    for match in reversed(list(_STATE_BEFORE_ZIP_RE.finditer(address))):
+        if match.group(1) in _STATES:
+            return match.group(1)
+    tokens = re.findall(r"[A-Za-z0-9]+", address.rsplit(",", 1)[-1])
+    if tokens and tokens[-1] in _STATES:
+        return tokens[-1]
+    return None
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_TOKEN_RE.findall((text or "").lower()))
+
+
+def _block_keys(tokens: Iterable[str], state: Optional[str], zip5: Optional[str]) -> Set[str]:
+    keys = {f"{t[:PREFIX_LEN]}|{state or ''}" for t in tokens}
+    if zip5:
+        keys.add(f"#{zip5}")
+    return keys
+
+
+def _record_row(row: Tuple) -> Optional[Tuple[int, str, str, Set[str]]]:
+    # (npi, org_name, first_name, last_name, address_1, city, state, postal_code)
+    npi, org_name, first_name, last_name, address_1, city, state, postal = row
+    name = org_name or " ".join(p for p in (first_name, last_name) if p)
+    tokens = name_tokens(name)
+    if not tokens:
+        return None
+    zip5 = (postal or "")[:5] or None
+    address = _normalize(" ".join(p for p in (address_1, city, state, zip5) if p))
+    return npi, _normalize(name), address, _block_keys(tokens, state, zip5)
+
+
+# ---------- scoring ----------
+
+def _ratios(query: str, choices: Sequence[str]) -> List[float]:
+    """
+    token_set_ratio of `query` against every choice, 0.0 – 1.0.
+    """
+    if not query or not choices:
+        return [0.0] * len(choices)
+    scores = process.cdist([query], choices, scorer=fuzz.token_set_ratio)
+    return [s / 100.0 for s in scores[0].tolist()]
+
+
+class CandidateIndex:
+    """
+    Read-only top-k candidate search over an index built by
+    build_candidate_index(). Safe to share between threads.
+
+    `nppes` (optional) resolves a candidate to its full registry record.
+    """
+
+    def __init__(self, path: str, nppes: Optional[NPPESIndex] = None) -> None:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Candidate index not found: {path}")
+        self.path = path
+        self.nppes = nppes
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            self._local.conn = conn
+        return conn
+
+    # ---------- blocking ----------
+
+    def _blocks(self, tokens: List[str], state: Optional[str], zip5: Optional[str]) -> List[Tuple[str, int]]:
+        """
+        (key or key prefix, size) of the blocks a query falls in.
+        Without a state, a name block spans every state (prefix range).
+        """
+        conn = self._conn()
+        blocks: List[Tuple[str, int]] = []
+        for prefix in {t[:PREFIX_LEN] for t in tokens}:
+            if state:
+                key = f"{prefix}|{state}"
+                row = conn.execute("SELECT n FROM block_sizes WHERE key = ?", (key,)).fetchone()
+                n = row[0] if row else 0
+            else:
+                key = f"{prefix}|"
+                n = conn.execute(
+                    "SELECT COALESCE(SUM(n), 0) FROM block_sizes WHERE key >= ? AND key < ?",
+                    (key, f"{prefix}}}"),
+                ).fetchone()[0]
+            if n:
+                blocks.append((key, n))
+        if zip5:
+            row = conn.execute("SELECT n FROM block_sizes WHERE key = ?", (f"#{zip5}",)).fetchone()
+            if row:
+                blocks.append((f"#{zip5}", row[0]))
+        return blocks
+
+    def _block_npis(self, blocks: List[Tuple[str, int]], max_block: int) -> Set[int]:
+        usable = [b for b in blocks if b[1] <= max_block]
+        if not usable and blocks:
+            usable = [min(blocks, key=lambda b: b[1])]
+        conn = self._conn()
+        npis: Set[int] = set()
+        for key, _ in usable:
+            if key.endswith("|"):
+                rows = conn.execute(
+                    "SELECT npi FROM blocks WHERE key >= ? AND key < ?", (key, key[:-1] + "}")
+                )
+            else:
+                rows = conn.execute("SELECT npi FROM blocks WHERE key = ?", (key,))
+            npis.update(r[0] for r in rows)
+        return npis
+
+    def _fetch(self, npis: Iterable[int], known: Dict[int, Tuple[str, str]]) -> None:
+        missing = [n for n in npis if n not in known]
+        conn = self._conn()
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            rows = conn.execute(
+                f"SELECT npi, name, address FROM cand WHERE npi IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for npi, name, address in rows:
+                known[npi] = (name, address)
+
+    # ---------- search ----------
+
+    def candidates(
+        self,
+        name: str,
+        address: str = "",
+        k: int = DEFAULT_K,
+        max_block: int = MAX_BLOCK,
+    ) -> List[Candidate]:
+        """
+        Top-k registry records for a name (+ free-text address), best first.
+        """
+        return self._search(name, address, k, max_block, {})
+
+    def _search(
+        self,
+        name: str,
+        address: str,
+        k: int,
+        max_block: int,
+        records: Dict[int, Tuple[str, str]],
+    ) -> List[Candidate]:
+        tokens = name_tokens(name)
+        if not tokens:
+            return []
+        state, zip5 = parse_state_zip(address)
+        npis = self._block_npis(self._blocks(tokens, state, zip5), max_block)
+        if not npis:
+            return []
+
+        self._fetch(npis, records)
+        pool = [n for n in npis if n in records]
+        names = [records[n][0] for n in pool]
+        name_scores = _ratios(" ".join(tokens), names)
+
+        query_address = _normalize(address)
+        if query_address:
+            address_scores = _ratios(query_address, [records[n][1] for n in pool])
+            scores = [
+                NAME_WEIGHT * ns + (1 - NAME_WEIGHT) * a
+                for ns, a in zip(name_scores, address_scores)
+            ]
+        else:
+            address_scores = [None] * len(pool)
+            scores = name_scores
+
+        best = sorted(range(len(pool)), key=scores.__getitem__, reverse=True)[:k]
+        return [
+            Candidate(
+                npi=str(pool[i]),
+                score=round(scores[i], 4),
+                name_score=round(name_scores[i], 4),
+                address_score=None if address_scores[i] is None else round(address_scores[i], 4),
+                name=records[pool[i]][0],
+                address=records[pool[i]][1],
+            )
+            for i in best
+        ]
+
+    def candidates_many(
+        self,
+        rows: Iterable[Tuple[str, str]],
+        k: int = DEFAULT_K,
+        max_block: int = MAX_BLOCK,
+    ) -> List[List[Candidate]]:
+        """
+        candidates() for many (name, address) rows; records shared by
+        rows in the same blocks are read from the index once.
+        """
+        records: Dict[int, Tuple[str, str]] = {}
+        return [self._search(name, address, k, max_block, records) for name, address in rows]
+
+    def record(self, npi: str) -> Optional[Dict]:
+        """
+        Full registry record for a candidate (needs `nppes`).
+        """
+        if self.nppes is None:
+            return None
+        return self.nppes.lookup(npi)
+
+    def metadata(self) -> Dict[str, str]:
+        return dict(self._conn().execute("SELECT key, value FROM cand_meta").fetchall())
+
+
+def candidate_index_from_env() -> Optional[CandidateIndex]:
+    """
+    CANDIDATE_INDEX_PATH (+ NPPES_INDEX_PATH for full records), or None
+    when no candidate index is configured.
+    """
+    path = os.getenv("CANDIDATE_INDEX_PATH", "")
+    if not path:
+        return None
+    nppes = None
+    nppes_path = os.getenv("NPPES_INDEX_PATH", "")
+    if nppes_path and os.path.exists(nppes_path):
+        nppes = NPPESIndex(nppes_path)
+    try:
+        return CandidateIndex(path, nppes=nppes)
+    except FileNotFoundError as e:
+        print(f"[CANDIDATES] {e}; NPI candidate search disabled.")
+        return None
+
+
+# ---------- builder ----------
+
+def _iter_nppes_rows(nppes_path: str) -> Iterator[Tuple]:
+    conn = sqlite3.connect(f"file:{nppes_path}?mode=ro", uri=True)
+    try:
+        yield from conn.execute(
+            "SELECT npi, org_name, first_name, last_name, address_1, city, state, postal_code FROM nppes"
+        )
+    finally:
+        conn.close()
+
+
+def build_candidate_index(nppes_path: str, index_path: str, batch_size: int = 50_000) -> int:
+    """
+    Build (or rebuild) the candidate index from an NPPES index file.
+    Written to a temp file and swapped in. Returns the records indexed.
+    """
+    tmp_path = index_path + ".building"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE cand (npi INTEGER PRIMARY KEY, name TEXT, address TEXT)")
+    conn.execute("CREATE TABLE blocks (key TEXT, npi INTEGER)")
+    conn.execute("CREATE TABLE cand_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    count = 0
+    started = time.time()
+    records: List[Tuple] = []
+    keys: List[Tuple[str, int]] = []
+
+    def flush() -> None:
+        conn.executemany("INSERT INTO cand VALUES (?, ?, ?)", records)
+        conn.executemany("INSERT INTO blocks VALUES (?, ?)", keys)
+        records.clear()
+        keys.clear()
+
+    for row in _iter_nppes_rows(nppes_path):
+        parsed = _record_row(row)
+        if parsed is None:
+            continue
+        npi, name, address, block_keys = parsed
+        records.append((npi, name, address))
+        keys.extend((key, npi) for key in block_keys)
+        if len(records) >= batch_size:
+            count += len(records)
+            flush()
+            print(f"[CANDIDATES] {count:,} records indexed ({time.time() - started:.0f}s)")
+    count += len(records)
+    flush()
+
+    # index after the bulk load: far cheaper than keeping it sorted while inserting
+    conn.execute("CREATE INDEX blocks_key ON blocks (key, npi)")
+    conn.execute("CREATE TABLE block_sizes (key TEXT PRIMARY KEY, n INTEGER) WITHOUT ROWID")
+    conn.execute("INSERT INTO block_sizes SELECT key, COUNT(*) FROM blocks GROUP BY key")
+    conn.executemany(
+        "INSERT INTO cand_meta (key, value) VALUES (?, ?)",
+        [
+            ("source_index", os.path.basename(nppes_path)),
+            ("built_at", str(int(time.time()))),
+            ("record_count", str(count)),
+            ("prefix_len", str(PREFIX_LEN)),
+        ],
+    )
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+    os.replace(tmp_path, index_path)
+    print(f"[CANDIDATES] Done: {count:,} records -> {index_path}")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline NPI candidate index.")
+    parser.add_argument("nppes_index", help="NPPES index built by nppes_index.py")
+    parser.add_argument("index_path", help="Output SQLite candidate index")
+    args = parser.parse_args()
+
+    try:
+        build_candidate_index(args.nppes_index, args.index_path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"[CANDIDATES] Build failed: {e}")
+        sys.exit(1)
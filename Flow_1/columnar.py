@@ -0,0 +1,304 @@
+# columnar.py
+"""
+Columnar storage and export for large ProviderReport sets.
+
+A ProviderReport is a tree of ~8 Pydantic objects; ReportTable keeps the
+same data as flat columns (one value / confidence / note column per
+field) in Arrow record batches, so a million reports take a fraction of
+the memory and scans like "addresses with confidence < 0.6" run over
+one contiguous column.
+
+Without pyarrow the columns are plain Python lists / float arrays;
+Parquet / Arrow export then needs pyarrow, CSV export does not.
+"""
+import csv
+import json
+import os
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from models import FieldWithConfidence, ProviderInput, ProviderOutput, ProviderReport
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pa_ipc = pq = None
+
+# Rows buffered as Python values before they are frozen into one Arrow batch
+CHUNK_ROWS = int(os.getenv("FLOW1_COLUMNAR_CHUNK_ROWS", "65536"))
+
+FIELDS = ("name", "npi", "mobile_no", "address", "speciality")
+
+INPUT_COLUMNS = tuple(f"input_{f}" for f in FIELDS) + ("member_impact",)
+OUTPUT_COLUMNS = tuple(
+    f"{f}_{part}" for f in FIELDS for part in ("value", "confidence", "note")
+)
+REPORT_COLUMNS = (
+    ("status", "priority_score", "priority_level")
+    + INPUT_COLUMNS
+    + OUTPUT_COLUMNS
+    + ("reasons", "llm_explanation")
+)
+
+_FLOAT_COLUMNS = frozenset(
+    ["priority_score"] + [f"{f}_confidence" for f in FIELDS]
+)
+_INT_COLUMNS = frozenset(["member_impact"])
+
+if pa is not None:
+    ARROW_SCHEMA = pa.schema([
+        pa.field(
+            name,
+            pa.float64() if name in _FLOAT_COLUMNS
+            else pa.int64() if name in _INT_COLUMNS
+            else pa.list_(pa.string()) if name == "reasons"
+            else pa.dictionary(pa.int8(), pa.string()) if name in ("status", "priority_level")
+            else pa.string(),
+        )
+        for name in REPORT_COLUMNS
+    ])
+else:
+    ARROW_SCHEMA = None
+
+
+def _report_row(report: ProviderReport) -> tuple:
+    p = report.provider_input
+    o = report.provider_output
+    row = [
+        report.status, report.priority_score, report.priority_level,
+        p.name, p.npi, p.mobile_no, p.address, p.speciality, p.member_impact,
+    ]
+    for f in (o.name, o.npi, o.mobile_no, o.address, o.speciality):
+        row += (f.value, f.confidence, f.note)
+    row += (list(report.reasons), report.llm_explanation)
+    return tuple(row)
+
+
+def _dict_row(report: Dict) -> tuple:
+    # same as _report_row for a report already decoded from JSON
+    p = report["provider_input"]
+    o = report["provider_output"]
+    row = [
+        report["status"], report["priority_score"], report["priority_level"],
+        p["name"], p["npi"], p["mobile_no"], p["address"], p["speciality"],
+        p.get("member_impact", 3),
+    ]
+    for name in FIELDS:
+        f = o[name]
+        row += (f["value"], f["confidence"], f.get("note"))
+    row += (report.get("reasons") or [], report.get("llm_explanation"))
+    return tuple(row)
+
+
+class ReportTable:
+    """
+    Append-only columnar table of ProviderReports.
+
+    - append / extend take reports; extend_json takes report JSON
+      (e.g. job results) without building Pydantic objects.
+    - column(name), scan_confidence(field, below) and rows(indices)
+      read columns without materializing reports.
+    - write_parquet / write_arrow / write_csv export; read_parquet /
+      read_arrow load a table back for analytics.
+    """
+
+    def __init__(self, chunk_rows: int = CHUNK_ROWS) -> None:
+        self.chunk_rows = max(1, chunk_rows)
+        self._batches: List = []          # frozen pa.RecordBatch chunks
+        self._pending: Dict[str, list] = self._new_columns()
+        self._pending_rows = 0
+        self._frozen_rows = 0
+
+    @staticmethod
+    def _new_columns() -> Dict[str, list]:
+        return {
+            name: array("d") if name in _FLOAT_COLUMNS and pa is None else []
+            for name in REPORT_COLUMNS
+        }
+
+    # ---------- building ----------
+
+    def _add_row(self, row: tuple) -> None:
+        for name, value in zip(REPORT_COLUMNS, row):
+            self._pending[name].append(value)
+        self._pending_rows += 1
+        if pa is not None and self._pending_rows >= self.chunk_rows:
+            self._freeze()
+
+    def append(self, report: ProviderReport) -> None:
+        self._add_row(_report_row(report))
+
+    def extend(self, reports: Iterable[ProviderReport]) -> "ReportTable":
+        for report in reports:
+            self._add_row(_report_row(report))
+        return self
+
+    def extend_json(self, reports_json: Iterable[str]) -> "ReportTable":
+        for text in reports_json:
+            self._add_row(_dict_row(json.loads(text)))
+        return self
+
+    @classmethod
+    def from_reports(cls, reports: Iterable[ProviderReport], chunk_rows: int = CHUNK_ROWS) -> "ReportTable":
+        return cls(chunk_rows).extend(reports)
+
+    def _freeze(self) -> None:
+        if not self._pending_rows:
+            return
+        batch = pa.RecordBatch.from_arrays(
+            [
+                pa.array(self._pending[name], type=ARROW_SCHEMA.field(name).type)
+                for name in REPORT_COLUMNS
+            ],
+            schema=ARROW_SCHEMA,
+        )
+        self._batches.append(batch)
+        self._frozen_rows += self._pending_rows
+        self._pending = self._new_columns()
+        self._pending_rows = 0
+
+    def __len__(self) -> int:
+        return self._frozen_rows + self._pending_rows
+
+    # ---------- reading ----------
+
+    def to_arrow(self):
+        """
+        The whole table as a pyarrow.Table (no copy of frozen batches).
+        """
+        _require_pyarrow("to_arrow")
+        self._freeze()
+        return pa.Table.from_batches(self._batches, schema=ARROW_SCHEMA)
+
+    def column(self, name: str) -> Sequence:
+        """
+        One column: a pyarrow ChunkedArray, or a list / array without pyarrow.
+        """
+        if name not in REPORT_COLUMNS:
+            raise KeyError(name)
+        if pa is not None:
+            return self.to_arrow().column(name)
+        return self._pending[name]
+
+    def scan_confidence(self, field: str, below: float = 0.6) -> List[int]:
+        """
+        Row indices where `field`'s confidence is below `below`,
+        e.g. scan_confidence("address", 0.6).
+        """
+        if field not in FIELDS:
+            raise KeyError(field)
+        if not len(self):
+            return []
+        column = self.column(f"{field}_confidence")
+        if pa is not None:
+            return pc.indices_nonzero(pc.less(column, below)).to_pylist()
+        return [i for i, value in enumerate(column) if value < below]
+
+    def rows(self, indices: Optional[Iterable[int]] = None, columns: Sequence[str] = REPORT_COLUMNS) -> List[Dict]:
+        """
+        Selected rows (all when `indices` is None) as flat dicts.
+        """
+        if pa is not None:
+            table = self.to_arrow().select(list(columns))
+            if indices is not None:
+                table = table.take(pa.array(list(indices), type=pa.int64()))
+            return table.to_pylist()
+        picked = range(len(self)) if indices is None else indices
+        return [{name: self._pending[name][i] for name in columns} for i in picked]
+
+    def iter_reports(self) -> Iterator[ProviderReport]:
+        """
+        Rebuild ProviderReports row by row (for loaders that need objects).
+        """
+        for row in self._iter_row_dicts():
+            yield _row_to_report(row)
+
+    def _iter_row_dicts(self) -> Iterator[Dict]:
+        if pa is not None:
+            self._freeze()
+            for batch in self._batches:
+                yield from batch.to_pylist()
+        else:
+            for i in range(len(self)):
+                yield {name: self._pending[name][i] for name in REPORT_COLUMNS}
+
+    # ---------- export / import ----------
+
+    def write_parquet(self, path: str, compression: str = "zstd") -> None:
+        _require_pyarrow("write_parquet")
+        pq.write_table(self.to_arrow(), path, compression=compression)
+
+    def write_arrow(self, path: str) -> None:
+        """
+        Arrow IPC file (memory-mappable by readers).
+        """
+        _require_pyarrow("write_arrow")
+        self._freeze()
+        with pa.OSFile(path, "wb") as sink, pa_ipc.new_file(sink, ARROW_SCHEMA) as writer:
+            for batch in self._batches:
+                writer.write_batch(batch)
+
+    def write_csv(self, path: str) -> None:
+        """
+        One header row plus one row per report; `reasons` joined with "; ".
+        """
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(REPORT_COLUMNS)
+            for row in self._iter_row_dicts():
+                row["reasons"] = "; ".join(row["reasons"] or [])
+                writer.writerow(row[name] for name in REPORT_COLUMNS)
+
+    @classmethod
+    def from_arrow(cls, table) -> "ReportTable":
+        _require_pyarrow("from_arrow")
+        rt = cls()
+        table = table.select(list(REPORT_COLUMNS)).cast(ARROW_SCHEMA)
+        rt._batches = table.to_batches(max_chunksize=rt.chunk_rows)
+        rt._frozen_rows = table.num_rows
+        return rt
+
+    @classmethod
+    def read_parquet(cls, path: str) -> "ReportTable":
+        _require_pyarrow("read_parquet")
+        return cls.from_arrow(pq.read_table(path))
+
+    @classmethod
+    def read_arrow(cls, path: str) -> "ReportTable":
+        _require_pyarrow("read_arrow")
+        with pa.memory_map(path, "r") as source:
+            return cls.from_arrow(pa_ipc.open_file(source).read_all())
+
+
+def _row_to_report(row: Dict) -> ProviderReport:
+    return ProviderReport(
+        provider_input=ProviderInput(
+            name=row["input_name"],
+            npi=row["input_npi"],
+            mobile_no=row["input_mobile_no"],
+            address=row["input_address"],
+            speciality=row["input_speciality"],
+            member_impact=row["member_impact"],
+        ),
+        provider_output=ProviderOutput(**{
+            f: FieldWithConfidence(
+                value=row[f"{f}_value"],
+                confidence=row[f"{f}_confidence"],
+                note=row[f"{f}_note"],
+            )
+            for f in FIELDS
+        }),
+        status=row["status"],
+        reasons=list(row["reasons"] or []),
+        priority_score=row["priority_score"],
+        priority_level=row["priority_level"],
+        llm_explanation=row["llm_explanation"],
+    )
+
+
+def _require_pyarrow(what: str) -> None:
+    if pa is None:
+        raise RuntimeError(f"ReportTable.{what} needs pyarrow (pip install pyarrow)")
@@ -1,9 +1,42 @@
 # data_loader.py
 import csv
-from typing import List
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
 
 from models import ProviderInput
 
+REQUIRED_COLUMNS = ("name", "npi", "mobile_no", "address", "speciality")
+
+
+class RowError(NamedTuple):
+    """
+    A CSV row that could not be turned into a ProviderInput.
+    """
+    line_number: int     # physical line in the file (header = line 1)
+    error: str
+    row: Optional[Dict[str, str]] = None
+
+
+def _row_to_provider(row: Dict[str, str]) -> ProviderInput:
+    # member_impact is optional – default to 3 if missing/bad
+    raw_impact = (row.get("member_impact") or "3").strip()
+    try:
+        member_impact = int(raw_impact)
+    except ValueError:
+        member_impact = 3
+
+    return ProviderInput(
+        name=row["name"].strip(),
+        npi=row["npi"].strip(),
+        mobile_no=row["mobile_no"].strip(),
+        address=row["address"].strip(),
+        speciality=row["speciality"].strip(),
+        member_impact=member_impact,
+    )
+
+
+def _print_row_error(err: RowError) -> None:
+    print(f"[DATA LOADER] Skipping line {err.line_number}: {err.error}")
+
 
 def load_providers_from_csv(path: str) -> List[ProviderInput]:
     providers: List[ProviderInput] = []
@@ -11,21 +44,80 @@ def load_providers_from_csv(path: str) -> List[ProviderInput]:
     with open(path, mode="r", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            # member_impact is optional – default to 3 if missing/bad
-            raw_impact = (row.get("member_impact") or "3").strip()
-            try:
-                member_impact = int(raw_impact)
-            except ValueError:
-                member_impact = 3
-
-            provider = ProviderInput(
-                name=row["name"].strip(),
-                npi=row["npi"].strip(),
-                mobile_no=row["mobile_no"].strip(),
-                address=row["address"].strip(),
-                speciality=row["speciality"].strip(),
-                member_impact=member_impact,
-            )
-            providers.append(provider)
+            providers.append(_row_to_provider(row))
 
     return providers
+
+
+def iter_providers_from_csv(
+    path: str,
+    on_error: Optional[Callable[[RowError], None]] = None,
+) -> Iterator[ProviderInput]:
+    """
+    Stream ProviderInput rows from a CSV without loading the file.
+
+    Malformed rows (missing columns, bad encoding, invalid values) are
+    reported to `on_error` and skipped; parsing continues with the next row.
+    """
+    report = on_error or _print_row_error
+
+    with open(path, mode="r", encoding="utf-8", errors="replace", newline="") as f:
+        reader = csv.DictReader(f)
+
+        missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"CSV {path} is missing required columns: {', '.join(missing)}")
+
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                report(RowError(line_number=reader.line_num, error=f"CSV parse error: {e}"))
+                continue
+
+            # short rows give None for the trailing columns
+            absent = [c for c in REQUIRED_COLUMNS if row.get(c) is None]
+            if absent:
+                report(RowError(
+                    line_number=reader.line_num,
+                    error=f"missing value(s) for {', '.join(absent)}",
+                    row=row,
+                ))
+                continue
+
+            try:
+                provider = _row_to_provider(row)
+            except ValueError as e:
+                # pydantic.ValidationError is a ValueError
+                report(RowError(line_number=reader.line_num, error=str(e), row=row))
+                continue
+
+            yield provider
+
+
+def iter_provider_batches(
+    path: str,
+    batch_size: int = 1000,
+    on_error: Optional[Callable[[RowError], None]] = None,
+) -> Iterator[List[ProviderInput]]:
+    """
+    Stream a CSV as ProviderInput batches of at most `batch_size` rows.
+
+    Only one batch is held in memory at a time, so memory stays flat no
+    matter how large the file is. Feed the batches to
+    Flow1Orchestrator.run_batches.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
+
+    batch: List[ProviderInput] = []
+    for provider in iter_providers_from_csv(path, on_error=on_error):
+        batch.append(provider)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
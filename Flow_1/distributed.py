@@ -0,0 +1,529 @@
+# distributed.py
+"""
+Sharded batch runs across many worker processes / hosts, coordinated
+through one SQLite work queue (no external service).
+
+- enqueue: rows are split into shards by a hash of the NPI (repeats of
+  an NPI land in the same shard, so coalescing and the NPI cache still
+  work) and stored durably with the shard list.
+- workers lease one shard at a time, run it with Flow1Orchestrator
+  (iter_batch, the engine behind run_batch) and commit results in chunks
+  while renewing the lease. Results are keyed by row, so a re-run after a
+  crash overwrites instead of duplicating (at-least-once).
+- a worker that dies stops renewing; its lease expires and another
+  worker picks the shard up, skipping rows that already have results.
+
+Workers on several hosts need the queue file on a shared volume with
+working POSIX locks; set FLOW1_QUEUE_JOURNAL=DELETE there (WAL needs
+shared memory, so it only works on one host).
+
+    cd Flow_1
+    python distributed.py enqueue roster.csv --shards 64
+    python distributed.py worker --processes 4        # on each host
+    python distributed.py status <run_id>
+    python distributed.py export <run_id> out.parquet
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import ProviderInput
+from records import report_json
+
+DEFAULT_QUEUE_PATH = os.getenv(
+    "FLOW1_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "work_queue.sqlite3"),
+)
+DEFAULT_SHARDS = 64
+DEFAULT_LEASE_SECONDS = float(os.getenv("FLOW1_SHARD_LEASE_SECONDS", "120"))
+
+# Results written per commit while a shard is running
+COMMIT_EVERY_ROWS = 200
+
+# Rows per INSERT batch while enqueueing
+ENQUEUE_CHUNK_ROWS = 10_000
+
+
+def shard_of(npi: str, shards: int) -> int:
+    digest = hashlib.blake2b((npi or "").strip().encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """
+    Durable shard queue: runs, their input rows by shard, shard leases
+    and per-row results, in one SQLite file shared by all workers.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self._conn.execute(f"PRAGMA journal_mode={os.getenv('FLOW1_QUEUE_JOURNAL', 'WAL')}")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                id TEXT PRIMARY KEY,
+                shard_count INTEGER NOT NULL,
+                total_rows INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS shards (
+                run_id TEXT NOT NULL,
+                shard INTEGER NOT NULL,
+                rows INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',   -- pending | leased | done
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                finished_at REAL,
+                PRIMARY KEY (run_id, shard)
+            );
+            CREATE INDEX IF NOT EXISTS shards_by_state ON shards (state, lease_expires_at);
+            CREATE TABLE IF NOT EXISTS inputs (
+                run_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                shard INTEGER NOT NULL,
+                provider_json TEXT NOT NULL,
+                PRIMARY KEY (run_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS inputs_by_shard ON inputs (run_id, shard, idx);
+            CREATE TABLE IF NOT EXISTS results (
+                run_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                shard INTEGER NOT NULL,
+                report_json TEXT,
+                error TEXT,
+                worker TEXT,
+                PRIMARY KEY (run_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS results_by_shard ON results (run_id, shard);
+            """
+        )
+        self._conn.commit()
+
+    # ---------- producer ----------
+
+    def enqueue(
+        self,
+        providers: Iterable[ProviderInput],
+        shards: int = DEFAULT_SHARDS,
+        run_id: Optional[str] = None,
+    ) -> str:
+        """
+        Store rows (streamed, any size) as a new run split into `shards`
+        shards. Returns the run id.
+        """
+        run_id = run_id or uuid.uuid4().hex[:12]
+        counts = [0] * shards
+        total = 0
+        chunk: List[Tuple] = []
+
+        def flush() -> None:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT INTO inputs (run_id, idx, shard, provider_json) VALUES (?, ?, ?, ?)",
+                    chunk,
+                )
+                self._conn.commit()
+            chunk.clear()
+
+        for provider in providers:
+            shard = shard_of(provider.npi, shards)
+            counts[shard] += 1
+            chunk.append((run_id, total, shard, provider.model_dump_json()))
+            total += 1
+            if len(chunk) >= ENQUEUE_CHUNK_ROWS:
+                flush()
+        if chunk:
+            flush()
+
+        with self._lock:
+            # shards become visible to workers only once every row is in
+            self._conn.executemany(
+                "INSERT INTO shards (run_id, shard, rows, state) VALUES (?, ?, ?, ?)",
+                [
+                    (run_id, shard, rows, "pending" if rows else "done")
+                    for shard, rows in enumerate(counts)
+                ],
+            )
+            self._conn.execute(
+                "INSERT INTO runs (id, shard_count, total_rows, created_at) VALUES (?, ?, ?, ?)",
+                (run_id, shards, total, time.time()),
+            )
+            self._conn.commit()
+        return run_id
+
+    # ---------- leases ----------
+
+    def lease(
+        self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS
+    ) -> Optional[Tuple[str, int]]:
+        """
+        Take the next pending shard (or one whose lease expired) as
+        (run_id, shard), or None when there is none right now.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                """
+                UPDATE shards
+                SET state = 'leased', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1
+                WHERE rowid = (
+                    SELECT rowid FROM shards
+                    WHERE state = 'pending'
+                       OR (state = 'leased' AND lease_expires_at < ?)
+                    ORDER BY state = 'leased', run_id, shard
+                    LIMIT 1
+                )
+                RETURNING run_id, shard
+                """,
+                (worker_id, now + lease_seconds, now),
+            ).fetchone()
+            self._conn.commit()
+        return (row[0], row[1]) if row is not None else None
+
+    def heartbeat(
+        self, run_id: str, shard: int, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS
+    ) -> bool:
+        """
+        Extend a lease. False when the worker no longer holds it.
+        """
+        with self._lock:
+            changed = self._conn.execute(
+                "UPDATE shards SET lease_expires_at = ? "
+                "WHERE run_id = ? AND shard = ? AND state = 'leased' AND lease_owner = ?",
+                (time.time() + lease_seconds, run_id, shard, worker_id),
+            ).rowcount
+            self._conn.commit()
+        return changed > 0
+
+    def complete(self, run_id: str, shard: int, worker_id: str) -> bool:
+        """
+        Mark a shard done if `worker_id` holds it and every row has a
+        result (report or error).
+        """
+        with self._lock:
+            changed = self._conn.execute(
+                """
+                UPDATE shards SET state = 'done', finished_at = ?, lease_expires_at = NULL
+                WHERE run_id = ? AND shard = ? AND state = 'leased' AND lease_owner = ?
+                  AND rows <= (SELECT COUNT(*) FROM results WHERE run_id = ? AND shard = ?)
+                """,
+                (time.time(), run_id, shard, worker_id, run_id, shard),
+            ).rowcount
+            self._conn.commit()
+        return changed > 0
+
+    def open_shards(self) -> int:
+        """
+        Shards not done yet (pending or leased), across all runs.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM shards WHERE state != 'done'"
+            ).fetchone()[0]
+
+    # ---------- rows ----------
+
+    def pending_rows(self, run_id: str, shard: int) -> List[Tuple[int, ProviderInput]]:
+        """
+        (idx, provider) rows of a shard that have no result yet.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT i.idx, i.provider_json FROM inputs i
+                LEFT JOIN results r ON r.run_id = i.run_id AND r.idx = i.idx
+                WHERE i.run_id = ? AND i.shard = ? AND r.idx IS NULL
+                ORDER BY i.idx
+                """,
+                (run_id, shard),
+            ).fetchall()
+        return [(idx, ProviderInput.model_validate_json(data)) for idx, data in rows]
+
+    def commit_results(
+        self,
+        run_id: str,
+        shard: int,
+        worker_id: str,
+        rows: List[Tuple[int, Optional[str], Optional[str]]],
+    ) -> None:
+        """
+        Store (idx, report_json, error) rows. Re-committing a row replaces
+        it, so a shard processed twice still has one result per row.
+        """
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (run_id, idx, shard, report_json, error, worker) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, idx, shard, report, error, worker_id) for idx, report, error in rows],
+            )
+            self._conn.commit()
+
+    def iter_results(self, run_id: str, page_rows: int = 5000) -> Iterator[Tuple[int, Optional[str], Optional[str]]]:
+        """
+        (idx, report_json, error) for every finished row, in input order.
+        """
+        cursor = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT idx, report_json, error FROM results "
+                    "WHERE run_id = ? AND idx > ? ORDER BY idx LIMIT ?",
+                    (run_id, cursor, page_rows),
+                ).fetchall()
+            yield from rows
+            if len(rows) < page_rows:
+                return
+            cursor = rows[-1][0]
+
+    def progress(self, run_id: str) -> Optional[Dict]:
+        with self._lock:
+            run = self._conn.execute(
+                "SELECT shard_count, total_rows, created_at FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+            if run is None:
+                return None
+            by_state = dict(self._conn.execute(
+                "SELECT state, COUNT(*) FROM shards WHERE run_id = ? GROUP BY state", (run_id,)
+            ).fetchall())
+            done, failed = self._conn.execute(
+                "SELECT COUNT(*), COUNT(error) FROM results WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            retried = self._conn.execute(
+                "SELECT COUNT(*) FROM shards WHERE run_id = ? AND attempts > 1", (run_id,)
+            ).fetchone()[0]
+        shard_count, total, created_at = run
+        return {
+            "run_id": run_id,
+            "total_rows": total,
+            "done_rows": done,
+            "failed_rows": failed,
+            "shards": shard_count,
+            "shards_by_state": {s: by_state.get(s, 0) for s in ("pending", "leased", "done")},
+            "shards_retried": retried,
+            "created_at": created_at,
+        }
+
+
+# ---------- worker ----------
+
+class _LeaseKeeper(threading.Thread):
+    """
+    Renews one shard lease every lease_seconds / 3 until stopped;
+    sets `lost` if another worker has taken the shard over.
+    """
+
+    def __init__(self, queue: WorkQueue, run_id: str, shard: int, worker_id: str, lease_seconds: float) -> None:
+        super().__init__(name="shard-lease", daemon=True)
+        self.queue = queue
+        self.args = (run_id, shard, worker_id, lease_seconds)
+        self.interval = max(0.5, lease_seconds / 3)
+        self.stopped = threading.Event()
+        self.lost = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            if not self.queue.heartbeat(*self.args):
+                self.lost.set()
+                return
+
+
+def process_shard(
+    queue: WorkQueue,
+    orchestrator,
+    run_id: str,
+    shard: int,
+    worker_id: str,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    threads: int = 8,
+) -> Dict[str, int]:
+    """
+    Run the unfinished rows of one leased shard and commit their results.
+    """
+    pending = queue.pending_rows(run_id, shard)
+    positions = [idx for idx, _ in pending]
+    keeper = _LeaseKeeper(queue, run_id, shard, worker_id, lease_seconds)
+    keeper.start()
+
+    buffer: List[Tuple[int, Optional[str], Optional[str]]] = []
+    stats = {"rows": 0, "failed": 0}
+
+    def on_error(pos: int, provider: ProviderInput, e: Exception) -> None:
+        buffer.append((positions[pos], None, str(e)))
+        stats["failed"] += 1
+
+    batch = orchestrator.iter_batch(
+        (p for _, p in pending), max_workers=threads, on_error=on_error, as_records=True
+    )
+    try:
+        for pos, report in batch:
+            buffer.append((positions[pos], report_json(report), None))
+            stats["rows"] += 1
+            if len(buffer) >= COMMIT_EVERY_ROWS:
+                queue.commit_results(run_id, shard, worker_id, buffer)
+                buffer = []
+            if keeper.lost.is_set():
+                print(f"[WORKER {worker_id}] lost lease on {run_id}/{shard}; stopping it")
+                break
+    finally:
+        batch.close()
+        keeper.stopped.set()
+        # on_error may have added rows after the last commit
+        queue.commit_results(run_id, shard, worker_id, buffer)
+
+    if not keeper.lost.is_set() and not queue.complete(run_id, shard, worker_id):
+        print(f"[WORKER {worker_id}] shard {run_id}/{shard} left unfinished; it will be retried")
+    return stats
+
+
+def run_worker(
+    queue: WorkQueue,
+    orchestrator,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    threads: int = 8,
+    poll_seconds: float = 2.0,
+    stop: Optional[Callable[[], bool]] = None,
+) -> Dict[str, int]:
+    """
+    Lease and process shards until every shard in the queue is done
+    (or `stop()` returns True). Waits while other workers still hold
+    leases, so shards of a crashed worker are picked up when they expire.
+    """
+    worker_id = worker_id or default_worker_id()
+    totals = {"shards": 0, "rows": 0, "failed": 0}
+    while stop is None or not stop():
+        lease = queue.lease(worker_id, lease_seconds)
+        if lease is None:
+            if queue.open_shards() == 0:
+                break
+            time.sleep(poll_seconds)
+            continue
+        run_id, shard = lease
+        stats = process_shard(queue, orchestrator, run_id, shard, worker_id, lease_seconds, threads)
+        totals["shards"] += 1
+        totals["rows"] += stats["rows"]
+        totals["failed"] += stats["failed"]
+    return totals
+
+
+def _worker_process(queue_path: str, lease_seconds: float, threads: int) -> None:
+    from candidate_index import candidate_index_from_env
+    from npi_sources import npi_source_from_env
+    from orchestrator import Flow1Orchestrator
+
+    orchestrator = Flow1Orchestrator(
+        npi_source=npi_source_from_env(), candidate_index=candidate_index_from_env()
+    )
+    totals = run_worker(WorkQueue(queue_path), orchestrator, lease_seconds=lease_seconds, threads=threads)
+    print(f"[WORKER {default_worker_id()}] finished: {totals}")
+
+
+def run_worker_processes(
+    queue_path: str,
+    processes: int,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    threads: int = 8,
+) -> None:
+    """
+    Start `processes` worker processes on this host and wait for them.
+    """
+    ctx = multiprocessing.get_context(os.getenv("FLOW1_MP_START", "forkserver"))
+    procs = [
+        ctx.Process(target=_worker_process, args=(queue_path, lease_seconds, threads), name=f"flow1-worker-{i}")
+        for i in range(processes)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+
+# ---------- CLI ----------
+
+def _export(queue: WorkQueue, run_id: str, out_path: str) -> int:
+    from columnar import ReportTable
+
+    if out_path.endswith(".jsonl"):
+        count = 0
+        with open(out_path, "w", encoding="utf-8") as f:
+            for idx, report, error in queue.iter_results(run_id):
+                f.write(json.dumps({"index": idx, "report": json.loads(report) if report else None, "error": error}) + "\n")
+                count += 1
+        return count
+
+    table = ReportTable().extend_json(
+        report for _, report, _ in queue.iter_results(run_id) if report is not None
+    )
+    if out_path.endswith(".parquet"):
+        table.write_parquet(out_path)
+    elif out_path.endswith(".arrow"):
+        table.write_arrow(out_path)
+    else:
+        table.write_csv(out_path)
+    return len(table)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Sharded Flow-1 batch runs over a SQLite work queue.")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="work queue SQLite file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enqueue", help="split a roster CSV into shards")
+    p.add_argument("csv_path")
+    p.add_argument("--shards", type=int, default=DEFAULT_SHARDS)
+
+    p = sub.add_parser("worker", help="process shards until the queue is drained")
+    p.add_argument("--processes", type=int, default=1)
+    p.add_argument("--threads", type=int, default=8, help="run_batch threads per process")
+    p.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS)
+
+    p = sub.add_parser("status", help="progress of a run")
+    p.add_argument("run_id")
+
+    p = sub.add_parser("export", help="write a run's reports (.parquet / .arrow / .csv / .jsonl)")
+    p.add_argument("run_id")
+    p.add_argument("out_path")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "enqueue":
+        from data_loader import iter_providers_from_csv
+
+        queue = WorkQueue(args.queue)
+        run_id = queue.enqueue(iter_providers_from_csv(args.csv_path), shards=args.shards)
+        print(json.dumps(queue.progress(run_id)))
+    elif args.command == "worker":
+        run_worker_processes(args.queue, args.processes, args.lease_seconds, args.threads)
+    elif args.command == "status":
+        progress = WorkQueue(args.queue).progress(args.run_id)
+        if progress is None:
+            raise SystemExit(f"Unknown run {args.run_id}")
+        print(json.dumps(progress, indent=2))
+    elif args.command == "export":
+        count = _export(WorkQueue(args.queue), args.run_id, args.out_path)
+        print(f"Wrote {count} rows to {args.out_path}")
+
+
+if __name__ == "__main__":
+    main()
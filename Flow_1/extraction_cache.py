@@ -0,0 +1,67 @@
+# extraction_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from models import ProviderInput
+
+
+class ExtractionCache:
+    """
+    SQLite store of DocumentExtractionAgent output, keyed by content:
+    SHA-256 of the PDF bytes (plus page range) and the prompt / model
+    version. Re-uploading the same roster costs no Gemini calls, and a
+    prompt or model change misses the cache instead of serving stale rows.
+    """
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extractions (
+                key TEXT PRIMARY KEY,
+                providers_json TEXT NOT NULL,
+                created_at REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[List[ProviderInput]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT providers_json FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+            self._stats["hits" if row is not None else "misses"] += 1
+        if row is None:
+            return None
+        return [ProviderInput(**item) for item in json.loads(row[0])]
+
+    def put(self, key: str, providers: List[ProviderInput]) -> None:
+        data = json.dumps([p.model_dump() for p in providers], ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, providers_json, created_at) VALUES (?, ?, ?)",
+                (key, data, time.time()),
+            )
+            self._conn.commit()
+            self._stats["writes"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM extractions")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
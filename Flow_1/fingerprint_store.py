@@ -0,0 +1,269 @@
+# fingerprint_store.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from models import DataValidationResult, ProviderInput, ProviderReport
+from records import AnyReport, report_json
+
+# Bump when QA / summarize / explain logic changes so every stored report
+# is recomputed on the next run.
+REPORT_VERSION = 1
+
+# Buffered report writes per IncrementalRun before they hit SQLite
+FLUSH_EVERY_ROWS = 500
+
+# Report JSON kept in memory so repeat runs in one process skip SQLite
+# (0 disables). Every hit is parsed into a fresh ProviderReport, which at
+# ~16 us is a third of the cost of model_copy(deep=True).
+MEMORY_ROWS = int(os.getenv("FLOW1_FINGERPRINT_MEMORY_ROWS", "50000"))
+
+
+def _digest(data: str) -> str:
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _canonical(value) -> str:
+    # NPI records and website fields come out of the same parsers every time,
+    # so key order is already stable; sort_keys would only add cost.
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+class Fingerprint(NamedTuple):
+    """
+    What a ProviderReport was computed from.
+    """
+    input_hash: str     # the ProviderInput row (+ REPORT_VERSION)
+    npi_hash: str       # the NPI record (None counts as a value)
+    web_hash: str       # the scraped website fields
+
+    @classmethod
+    def of(cls, provider: ProviderInput, dv_result: DataValidationResult) -> "Fingerprint":
+        return cls.of_sources(provider, dv_result.npi_raw, dv_result.website_data)
+
+    @classmethod
+    def of_sources(
+        cls,
+        provider: ProviderInput,
+        npi_raw: Optional[Dict],
+        website_data: Optional[Dict[str, str]],
+    ) -> "Fingerprint":
+        return cls(
+            input_hash=_digest(f"v{REPORT_VERSION}:" + provider.model_dump_json()),
+            npi_hash=_digest(_canonical(npi_raw)),
+            web_hash=_digest(_canonical(website_data)),
+        )
+
+
+class FingerprintStore:
+    """
+    SQLite store of the last report per (NPI, input row), with the hashes
+    of the NPI record and website data it was built from.
+
+    A row whose input and sources hash the same as last time gets a copy
+    of its stored report back instead of going through QA / summarize /
+    explain, so callers may modify it. prune() drops the input rows of
+    an NPI that a full-roster run no longer has.
+    """
+
+    def __init__(self, path: str, memory_rows: int = MEMORY_ROWS) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._memory_rows = memory_rows
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[Fingerprint, str]]" = OrderedDict()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                npi TEXT NOT NULL,
+                input_hash TEXT NOT NULL,
+                npi_hash TEXT NOT NULL,
+                web_hash TEXT NOT NULL,
+                report_json TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (npi, input_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+
+    def _reader(self) -> sqlite3.Connection:
+        # per-thread read connections: WAL readers don't block each other
+        # or the writer, so lookups skip the write lock entirely
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, npi: str, fingerprint: Fingerprint) -> Optional[ProviderReport]:
+        """
+        Copy of the stored report if this exact fingerprint was seen,
+        else None.
+        """
+        key = (npi, fingerprint.input_hash)
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                self._memory.move_to_end(key)
+        if hit is not None:
+            if hit[0] != fingerprint:
+                return None
+            return ProviderReport.model_validate_json(hit[1])
+
+        row = self._reader().execute(
+            "SELECT report_json FROM fingerprints "
+            "WHERE npi = ? AND input_hash = ? AND npi_hash = ? AND web_hash = ?",
+            (npi, fingerprint.input_hash, fingerprint.npi_hash, fingerprint.web_hash),
+        ).fetchone()
+        if row is None:
+            return None
+        self._remember([(npi, fingerprint, row[0])])
+        return ProviderReport.model_validate_json(row[0])
+
+    def _remember(self, rows: List[Tuple[str, Fingerprint, str]]) -> None:
+        if self._memory_rows <= 0:
+            return
+        with self._lock:
+            for npi, fingerprint, data in rows:
+                key = (npi, fingerprint.input_hash)
+                self._memory[key] = (fingerprint, data)
+                self._memory.move_to_end(key)
+            while len(self._memory) > self._memory_rows:
+                self._memory.popitem(last=False)
+
+    def save_many(self, rows: List[Tuple[str, Fingerprint, AnyReport]]) -> None:
+        """
+        Store (npi, fingerprint, report) rows, replacing older ones.
+        """
+        if not rows:
+            return
+        now = time.time()
+        rows = [(npi, fp, report_json(report)) for npi, fp, report in rows]
+        params = [
+            (npi, fp.input_hash, fp.npi_hash, fp.web_hash, data, now)
+            for npi, fp, data in rows
+        ]
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO fingerprints (npi, input_hash, npi_hash, web_hash, report_json, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(npi, input_hash) DO UPDATE SET
+                    npi_hash = excluded.npi_hash,
+                    web_hash = excluded.web_hash,
+                    report_json = excluded.report_json,
+                    updated_at = excluded.updated_at
+                """,
+                params,
+            )
+            self._conn.commit()
+        self._remember(rows)
+
+    def prune(self, keep: Dict[str, Set[str]]) -> int:
+        """
+        For each NPI in `keep`, delete the reports stored for input rows
+        (input hashes) not in its set. Returns the number of rows deleted.
+        """
+        if not keep:
+            return 0
+        params = [(npi, json.dumps(sorted(hashes))) for npi, hashes in keep.items()]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "DELETE FROM fingerprints WHERE npi = ? "
+                "AND input_hash NOT IN (SELECT value FROM json_each(?))",
+                params,
+            )
+            self._conn.commit()
+            deleted = self._conn.total_changes - before
+            stale = [
+                key for key in self._memory
+                if key[0] in keep and key[1] not in keep[key[0]]
+            ]
+            for key in stale:
+                del self._memory[key]
+        return deleted
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM fingerprints")
+            self._conn.commit()
+            self._memory.clear()
+
+
+class IncrementalRun:
+    """
+    Batch-scoped view of a FingerprintStore (like RequestCoalescer, create
+    one per run and read its stats afterwards).
+
+    Counts skipped vs recomputed rows and buffers new reports so the store
+    is written in chunks instead of once per row.
+
+    `full_roster=True` says the run covers every row of the roster: then
+    flush() (end of batch) also deletes each NPI's reports for input rows
+    the run did not see, so a changed row replaces its old entry instead
+    of piling up next to it. Leave it off for partial runs (one feed, a
+    small batch): their NPIs can have other rows that are still current.
+    """
+
+    def __init__(self, store: FingerprintStore, full_roster: bool = False) -> None:
+        self.store = store
+        self.full_roster = full_roster
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, Fingerprint, AnyReport]] = []
+        self._seen: Dict[str, Set[str]] = {}
+        self._skipped = 0
+        self._recomputed = 0
+
+    def reuse(self, provider: ProviderInput, fingerprint: Fingerprint) -> Optional[ProviderReport]:
+        report = self.store.lookup(provider.npi, fingerprint)
+        if report is None:
+            return None
+        with self._lock:
+            self._skipped += 1
+            if self.full_roster:
+                self._seen.setdefault(provider.npi, set()).add(fingerprint.input_hash)
+        return report
+
+    def record(self, provider: ProviderInput, fingerprint: Fingerprint, report: AnyReport) -> None:
+        with self._lock:
+            self._recomputed += 1
+            if self.full_roster:
+                self._seen.setdefault(provider.npi, set()).add(fingerprint.input_hash)
+            self._pending.append((provider.npi, fingerprint, report))
+            if len(self._pending) < FLUSH_EVERY_ROWS:
+                return
+            pending, self._pending = self._pending, []
+        self.store.save_many(pending)
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            seen = {npi: set(hashes) for npi, hashes in self._seen.items()}
+        self.store.save_many(pending)
+        if self.full_roster:
+            self.store.prune(seen)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "skipped": self._skipped,
+                "recomputed": self._recomputed,
+                "total": self._skipped + self._recomputed,
+            }
@@ -0,0 +1,426 @@
+# hybrid_pipeline.py
+"""
+Hybrid thread + process execution of Flow-1.
+
+run_batch keeps every stage on threads, so page parsing, fuzzy scoring,
+Pydantic validation and the explanation text all share one GIL. Here:
+
+- I/O stages (NPI lookup, page fetch) stay on a thread pool
+- CPU stages run in process pools, in chunks of rows:
+    parse_pages   HTML -> practice fields (only pages not parsed before)
+    score_rows    QA (batch mode) -> summarize -> explain
+
+Payloads are kept small: rows go out as plain tuples / dicts and each
+chunk of reports comes back as one JSON blob, decoded in a single
+TypeAdapter call (cheaper than unpickling Pydantic models one by one).
+
+Worker counts (per stage):
+    FLOW1_IO_WORKERS      threads for NPI + fetch     (default 32)
+    FLOW1_PARSE_WORKERS   processes for HTML parsing  (default cpu_count / 4)
+    FLOW1_SCORE_WORKERS   processes for QA / report   (default cpu_count)
+A stage with 0 workers runs in the calling process instead.
+"""
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from models import ProviderInput, ProviderReport
+from records import ValidationRecord
+from page_fetcher import FetchResult
+from website_scraper import (
+    fetch_practice_page,
+    extract_practice_fields,
+    cached_practice_fields,
+    store_practice_fields,
+)
+from request_coalescer import RequestCoalescer
+from metrics import STAGE_SECONDS, BatchMeter
+from fingerprint_store import Fingerprint, IncrementalRun
+
+if TYPE_CHECKING:
+    from orchestrator import Flow1Orchestrator
+
+_CPUS = os.cpu_count() or 1
+
+IO_WORKERS = int(os.getenv("FLOW1_IO_WORKERS", "32"))
+PARSE_WORKERS = int(os.getenv("FLOW1_PARSE_WORKERS", str(max(1, _CPUS // 4))))
+SCORE_WORKERS = int(os.getenv("FLOW1_SCORE_WORKERS", str(_CPUS)))
+
+# Rows per parse / score task: enough to amortise the IPC round trip and
+# let QA score in bulk, small enough to keep every worker busy.
+CHUNK_ROWS = int(os.getenv("FLOW1_CPU_CHUNK_ROWS", "64"))
+
+# "forkserver" starts workers from a clean process, so they never inherit
+# locks held by the I/O threads (plain fork can).
+MP_START_METHOD = os.getenv("FLOW1_MP_START", "forkserver")
+
+_INPUT_FIELDS = ("name", "npi", "mobile_no", "address", "speciality", "member_impact")
+_REPORTS = TypeAdapter(List[ProviderReport])
+
+_VALIDATE_SECONDS = STAGE_SECONDS.labels("validate")
+_PARSE_SECONDS = STAGE_SECONDS.labels("parse")
+_QA_SECONDS = STAGE_SECONDS.labels("qa")
+_SUMMARIZE_SECONDS = STAGE_SECONDS.labels("summarize")
+_EXPLAIN_SECONDS = STAGE_SECONDS.labels("explain")
+
+# (npi_raw, npi_lookup_status, fetched page or None, website fields,
+#  fields still need parsing, NPI candidates from the local index)
+_Sources = Tuple[
+    Optional[Dict], Optional[str], Optional[FetchResult], Optional[Dict[str, str]], bool, Optional[List[Dict]]
+]
+
+
+# ---------- worker side (runs in the process pools) ----------
+
+_worker_agents = None
+
+
+def _agents():
+    global _worker_agents
+    if _worker_agents is None:
+        from agents.quality_assurance_agent import QualityAssuranceAgent
+        from agents.directory_management_agent import DirectoryManagementAgent
+        from agents.llm_explanation_agent import LLMExplanationAgent
+
+        _worker_agents = (QualityAssuranceAgent(), DirectoryManagementAgent(), LLMExplanationAgent())
+    return _worker_agents
+
+
+def parse_pages(pages: List[str]) -> Tuple[List[Optional[Dict[str, str]]], float]:
+    """
+    extract_practice_fields for each page; returns (fields, seconds).
+    """
+    started = perf_counter()
+    fields = [extract_practice_fields(html) for html in pages]
+    return fields, perf_counter() - started
+
+
+def score_rows(
+    rows: List[Tuple[tuple, Optional[Dict], Optional[Dict[str, str]], Optional[str], Optional[List[Dict]]]],
+) -> Tuple[bytes, List[Tuple[int, str]], Tuple[float, float, float]]:
+    """
+    Steps 2-4 of Flow-1 for (input values, npi_raw, website_data,
+    npi_lookup_status, npi_candidates) rows.
+
+    Returns the JSON list of reports that succeeded (in row order), the
+    (row position, error) of those that failed, and seconds spent in
+    QA / summarize / explain for the whole chunk.
+    """
+    qa_agent, dir_agent, llm_agent = _agents()
+    t0 = perf_counter()
+
+    results = [
+        ValidationRecord(
+            provider_input=ProviderInput(**dict(zip(_INPUT_FIELDS, values))),
+            npi_raw=npi_raw,
+            website_data=website_data,
+            npi_lookup_status=npi_status,
+            npi_candidates=candidates,
+        )
+        for values, npi_raw, website_data, npi_status, candidates in rows
+    ]
+
+    errors: List[Tuple[int, str]] = []
+    try:
+        outputs = qa_agent.generate_outputs(results)
+    except Exception:
+        # one bad row must not fail the chunk: redo it row by row
+        outputs = []
+        for pos, result in enumerate(results):
+            try:
+                outputs.append(qa_agent.generate_output(result))
+            except Exception as e:
+                errors.append((pos, str(e)))
+                outputs.append(None)
+    t1 = perf_counter()
+
+    reports: List[ProviderReport] = []
+    summarize_seconds = 0.0
+    for pos, (result, output) in enumerate(zip(results, outputs)):
+        if output is None:
+            continue
+        try:
+            started = perf_counter()
+            report = dir_agent.summarize_provider(result.provider_input, output)
+            summarize_seconds += perf_counter() - started
+            report.llm_explanation = llm_agent.explain(report)
+        except Exception as e:
+            errors.append((pos, str(e)))
+            continue
+        reports.append(report)
+    t2 = perf_counter()
+
+    return _REPORTS.dump_json(reports), errors, (t1 - t0, summarize_seconds, t2 - t1 - summarize_seconds)
+
+
+# ---------- parent side ----------
+
+def _run_inline(fn: Callable, arg) -> Future:
+    future: Future = Future()
+    try:
+        future.set_result(fn(arg))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+class HybridExecutor:
+    """
+    Owns the parse / score process pools. They start on first use and
+    are kept for later batches (starting a worker costs more than
+    scoring a chunk); call shutdown() when done.
+    """
+
+    def __init__(
+        self,
+        io_workers: int = IO_WORKERS,
+        parse_workers: int = PARSE_WORKERS,
+        score_workers: int = SCORE_WORKERS,
+        chunk_rows: int = CHUNK_ROWS,
+        start_method: str = MP_START_METHOD,
+    ) -> None:
+        self.io_workers = max(1, io_workers)
+        self.parse_workers = max(0, parse_workers)
+        self.score_workers = max(0, score_workers)
+        self.chunk_rows = max(1, chunk_rows)
+        self.start_method = start_method
+        self._lock = threading.Lock()   # jobs may share one executor
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self._score_pool: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self, workers: int, current: Optional[ProcessPoolExecutor]) -> Optional[ProcessPoolExecutor]:
+        if workers == 0 or current is not None:
+            return current
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+        )
+
+    def _submit_parse(self, pages: List[str]) -> Future:
+        with self._lock:
+            self._parse_pool = pool = self._pool(self.parse_workers, self._parse_pool)
+        if pool is None:
+            return _run_inline(parse_pages, pages)
+        return pool.submit(parse_pages, pages)
+
+    def _submit_score(self, rows: List[tuple]) -> Future:
+        with self._lock:
+            self._score_pool = pool = self._pool(self.score_workers, self._score_pool)
+        if pool is None:
+            return _run_inline(score_rows, rows)
+        return pool.submit(score_rows, rows)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pools = (self._parse_pool, self._score_pool)
+            self._parse_pool = None
+            self._score_pool = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    # ---------- I/O stage (threads) ----------
+
+    @staticmethod
+    def _gather_sources(
+        orchestrator: "Flow1Orchestrator",
+        provider: ProviderInput,
+        coalescer: RequestCoalescer,
+    ) -> _Sources:
+        started = perf_counter()
+        dv_agent = orchestrator.dv_agent
+
+        npi_raw, npi_status = dv_agent.lookup_npi(provider.npi, coalescer=coalescer)
+        # candidate search needs the index, which only this process has
+        candidates = dv_agent.npi_candidates(provider, npi_status)
+
+        page, fields, needs_parse = None, None, False
+        practice_url = dv_agent.practice_websites.get(provider.npi)
+        if practice_url:
+            page = coalescer.do("page", practice_url, lambda: fetch_practice_page(practice_url))
+            resolved, fields = cached_practice_fields(page)
+            needs_parse = not resolved
+
+        _VALIDATE_SECONDS.observe(perf_counter() - started)
+        return npi_raw, npi_status, page, fields, needs_parse, candidates
+
+    # ---------- batch ----------
+
+    def iter_batch(
+        self,
+        orchestrator: "Flow1Orchestrator",
+        providers: Iterable[ProviderInput],
+        coalescer: Optional[RequestCoalescer] = None,
+        max_in_flight: Optional[int] = None,
+        on_error: Optional[Callable[[int, ProviderInput, Exception], None]] = None,
+        incremental: Optional[IncrementalRun] = None,
+    ) -> Iterator[Tuple[int, ProviderReport]]:
+        """
+        Generator yielding (input_index, report) in completion order,
+        with the same contract as Flow1Orchestrator.iter_batch.
+        """
+        if coalescer is None:
+            coalescer = RequestCoalescer()
+        if max_in_flight is None:
+            max_in_flight = max(4 * self.io_workers, 2 * self.chunk_rows * (self.score_workers + 1))
+
+        rows = enumerate(providers)
+        exhausted = False
+        meter = BatchMeter()
+        io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="flow1-io")
+
+        # row = [idx, provider, npi_raw, npi_status, page, fields, needs_parse, candidates]
+        io_futures: Dict[Future, Tuple[int, ProviderInput]] = {}
+        parse_futures: Dict[Future, Tuple[List[list], List[FetchResult]]] = {}
+        score_futures: Dict[Future, List[Tuple[int, ProviderInput, Optional[Fingerprint]]]] = {}
+        chunk: List[list] = []
+        ready: Deque[Tuple[int, ProviderReport]] = deque()
+        rows_in_cpu = 0
+
+        def fail(idx: int, provider: ProviderInput, e: Exception) -> None:
+            meter.failed += 1
+            if on_error is not None:
+                on_error(idx, provider, e)
+            else:
+                print(
+                    "[HybridExecutor] Error processing provider "
+                    f"{provider.name} (NPI: {provider.npi}): {e}"
+                )
+
+        def refill() -> None:
+            nonlocal exhausted
+            while not exhausted and len(io_futures) + len(chunk) + rows_in_cpu < max_in_flight:
+                try:
+                    idx, provider = next(rows)
+                except StopIteration:
+                    exhausted = True
+                    return
+                future = io_pool.submit(self._gather_sources, orchestrator, provider, coalescer)
+                io_futures[future] = (idx, provider)
+
+        def dispatch(batch: List[list]) -> None:
+            nonlocal rows_in_cpu
+            rows_in_cpu += len(batch)
+            pages: Dict[str, FetchResult] = {}
+            for row in batch:
+                if row[6]:
+                    pages.setdefault(row[4].url, row[4])
+            if pages:
+                to_parse = list(pages.values())
+                parse_futures[self._submit_parse([page.text for page in to_parse])] = (batch, to_parse)
+            else:
+                score(batch)
+
+        def score(batch: List[list]) -> None:
+            nonlocal rows_in_cpu
+            payload, pending = [], []
+            for idx, provider, npi_raw, npi_status, _, fields, _, candidates in batch:
+                fingerprint = None
+                # a registry outage says nothing about the row: never reuse or store it
+                if incremental is not None and npi_status != "unavailable":
+                    fingerprint = Fingerprint.of_sources(provider, npi_raw, fields)
+                    report = incremental.reuse(provider, fingerprint)
+                    if report is not None:
+                        rows_in_cpu -= 1
+                        meter.ok += 1
+                        ready.append((idx, report))
+                        continue
+                payload.append((
+                    tuple(getattr(provider, f) for f in _INPUT_FIELDS), npi_raw, fields, npi_status, candidates,
+                ))
+                pending.append((idx, provider, fingerprint))
+            if payload:
+                score_futures[self._submit_score(payload)] = pending
+
+        def parsed(future: Future, batch: List[list], pages: List[FetchResult]) -> None:
+            nonlocal rows_in_cpu
+            try:
+                fields_list, seconds = future.result()
+            except Exception as e:
+                rows_in_cpu -= len(batch)
+                self._fail_rows(batch, e, fail)
+                return
+            by_url = {}
+            for page, fields in zip(pages, fields_list):
+                store_practice_fields(page, fields)
+                by_url[page.url] = fields
+                _PARSE_SECONDS.observe(seconds / len(pages))
+            for row in batch:
+                if row[6]:
+                    row[5] = by_url[row[4].url]
+            score(batch)
+
+        def scored(future: Future, pending: List[Tuple[int, ProviderInput, Optional[Fingerprint]]]) -> None:
+            try:
+                reports_json, errors, seconds = future.result()
+            except Exception as e:
+                self._fail_rows([(idx, provider) for idx, provider, _ in pending], e, fail)
+                return
+            failed = dict(errors)
+            reports = iter(_REPORTS.validate_json(reports_json))
+            for pos, (idx, provider, fingerprint) in enumerate(pending):
+                if pos in failed:
+                    fail(idx, provider, RuntimeError(failed[pos]))
+                    continue
+                report = next(reports)
+                if fingerprint is not None:
+                    incremental.record(provider, fingerprint, report)
+                meter.ok += 1
+                ready.append((idx, report))
+
+            n = len(pending)
+            for histogram, total in zip((_QA_SECONDS, _SUMMARIZE_SECONDS, _EXPLAIN_SECONDS), seconds):
+                per_row = total / n
+                for _ in range(n):
+                    histogram.observe(per_row)
+
+        try:
+            refill()
+            while io_futures or parse_futures or score_futures or chunk:
+                # a partial chunk goes out when no more rows are coming, or
+                # when nothing else is in flight (max_in_flight < chunk_rows)
+                idle = not (io_futures or parse_futures or score_futures)
+                if chunk and (len(chunk) >= self.chunk_rows or idle or (exhausted and not io_futures)):
+                    batch, chunk = chunk, []
+                    dispatch(batch)
+                else:
+                    done, _ = wait(
+                        list(io_futures) + list(parse_futures) + list(score_futures),
+                        return_when=FIRST_COMPLETED,
+                    )
+                    for future in done:
+                        if future in io_futures:
+                            idx, provider = io_futures.pop(future)
+                            try:
+                                chunk.append([idx, provider, *future.result()])
+                            except Exception as e:
+                                fail(idx, provider, e)
+                        elif future in parse_futures:
+                            batch, pages = parse_futures.pop(future)
+                            parsed(future, batch, pages)
+                        else:
+                            pending = score_futures.pop(future)
+                            rows_in_cpu -= len(pending)
+                            scored(future, pending)
+
+                refill()
+                while ready:
+                    yield ready.popleft()
+        finally:
+            io_pool.shutdown(wait=True, cancel_futures=True)
+            for future in list(parse_futures) + list(score_futures):
+                future.cancel()
+            if incremental is not None:
+                incremental.flush()
+            meter.finish()
+
+    @staticmethod
+    def _fail_rows(batch, error: Exception, fail) -> None:
+        for row in batch:
+            fail(row[0], row[1], error)
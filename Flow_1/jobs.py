@@ -0,0 +1,492 @@
+# jobs.py
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from columnar import ReportTable
+from models import ProviderInput, ProviderReport
+from orchestrator import Flow1Orchestrator
+from records import as_report_model
+from review_queue import ReviewQueue
+
+# Job lifecycle: queued -> running -> completed | cancelled | failed
+# Jobs that were queued/running when the process stopped are picked up
+# again by JobManager.resume_unfinished().
+ACTIVE_STATUSES = ("queued", "running")
+
+# How often a running job flushes finished rows to the store
+FLUSH_EVERY_ROWS = 200
+FLUSH_EVERY_SECONDS = 1.0
+
+
+class JobStore:
+    """
+    SQLite persistence for batch jobs: job metadata, the submitted rows
+    and every finished report. Finished rows are never recomputed, so a
+    restarted worker resumes a job where it stopped.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                done INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                source_path TEXT,
+                source_name TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS job_inputs (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                provider_json TEXT NOT NULL,
+                PRIMARY KEY (job_id, idx)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS job_results (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                report_json TEXT,          -- NULL when the row failed
+                error TEXT,
+                PRIMARY KEY (job_id, idx)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+    # ---------- jobs ----------
+
+    def create_job(
+        self,
+        kind: str,
+        providers: Optional[List[ProviderInput]] = None,
+        source_path: Optional[str] = None,
+        source_name: Optional[str] = None,
+    ) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, source_path, source_name, created_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, source_path, source_name, time.time()),
+            )
+            self._conn.commit()
+        if providers is not None:
+            self.set_inputs(job_id, providers)
+        return job_id
+
+    def set_inputs(self, job_id: str, providers: List[ProviderInput]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_inputs (job_id, idx, provider_json) VALUES (?, ?, ?)",
+                ((job_id, idx, p.model_dump_json()) for idx, p in enumerate(providers)),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET total = ? WHERE id = ?", (len(providers), job_id)
+            )
+            self._conn.commit()
+
+    def has_inputs(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM job_inputs WHERE job_id = ? LIMIT 1", (job_id,)
+            ).fetchone()
+        return row is not None
+
+    def update_job(self, job_id: str, **fields) -> None:
+        if not fields:
+            return
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+            self._conn.commit()
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            names = [d[0] for d in cur.description]
+        return dict(zip(names, row))
+
+    def unfinished_job_ids(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                ACTIVE_STATUSES,
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    # ---------- rows ----------
+
+    def pending_inputs(self, job_id: str) -> List[Tuple[int, ProviderInput]]:
+        """
+        Rows of this job that have no stored result yet.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT i.idx, i.provider_json FROM job_inputs i
+                LEFT JOIN job_results r ON r.job_id = i.job_id AND r.idx = i.idx
+                WHERE i.job_id = ? AND r.idx IS NULL
+                ORDER BY i.idx
+                """,
+                (job_id,),
+            ).fetchall()
+        return [(idx, ProviderInput.model_validate_json(data)) for idx, data in rows]
+
+    def count_results(self, job_id: str) -> Tuple[int, int]:
+        """
+        (done, failed) as stored on disk.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(report_json), COUNT(*) - COUNT(report_json) "
+                "FROM job_results WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        return row[0], row[1]
+
+    def save_results(
+        self,
+        job_id: str,
+        rows: List[Tuple[int, Optional[str], Optional[str]]],
+        done: int,
+        failed: int,
+    ) -> None:
+        """
+        Store (idx, report_json, error) rows and the job's progress
+        counters in one transaction.
+        """
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_results (job_id, idx, report_json, error) "
+                "VALUES (?, ?, ?, ?)",
+                ((job_id, idx, report, error) for idx, report, error in rows),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET done = ?, failed = ? WHERE id = ?",
+                (done, failed, job_id),
+            )
+            self._conn.commit()
+
+    def get_results(
+        self, job_id: str, cursor: int = 0, limit: int = 100
+    ) -> List[Tuple[int, Optional[str], Optional[str]]]:
+        """
+        Finished rows with idx >= cursor, in input order.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT idx, report_json, error FROM job_results "
+                "WHERE job_id = ? AND idx >= ? ORDER BY idx LIMIT ?",
+                (job_id, cursor, limit),
+            ).fetchall()
+
+
+class JobManager:
+    """
+    Runs submitted batches in the background on a bounded pool:
+    - `max_jobs` jobs run at the same time (others wait as "queued")
+    - each job runs Flow1Orchestrator.iter_batch with `workers_per_job` threads,
+      or iter_batch_hybrid (CPU stages in process pools) when `hybrid` is set
+
+    `extract_fn(path, filename)` turns an uploaded PDF/ZIP into providers
+    for "ingest-pdf" jobs; uploads are kept under `upload_dir` until the
+    job has its rows stored.
+
+    With a `review_queue`, finished reports are added to it each time a
+    chunk of results is stored.
+    """
+
+    def __init__(
+        self,
+        orchestrator: Flow1Orchestrator,
+        store: JobStore,
+        upload_dir: str,
+        extract_fn: Optional[Callable[[str, str], List[ProviderInput]]] = None,
+        max_jobs: int = 2,
+        workers_per_job: int = 8,
+        hybrid: bool = False,
+        review_queue: Optional[ReviewQueue] = None,
+    ) -> None:
+        self.orchestrator = orchestrator
+        self.review_queue = review_queue
+        self.store = store
+        self.upload_dir = upload_dir
+        self.extract_fn = extract_fn
+        self.workers_per_job = workers_per_job
+        self.hybrid = hybrid
+
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="flow1-job")
+        self._cancel_events: Dict[str, threading.Event] = {}
+        # rows handed to the orchestrator minus rows finished, per running job
+        self._in_flight: Dict[str, int] = {}
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    # ---------- submission ----------
+
+    def submit(self, providers: List[ProviderInput]) -> str:
+        job_id = self.store.create_job("validate-batch", providers=providers)
+        self._schedule(job_id)
+        return job_id
+
+    def submit_upload(self, filename: str, fileobj) -> str:
+        """
+        Spool an uploaded PDF/ZIP to disk and queue an "ingest-pdf" job for it.
+        """
+        os.makedirs(self.upload_dir, exist_ok=True)
+        path = os.path.join(self.upload_dir, uuid.uuid4().hex + os.path.splitext(filename)[1].lower())
+        with open(path, "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+
+        job_id = self.store.create_job("ingest-pdf", source_path=path, source_name=filename)
+        self._schedule(job_id)
+        return job_id
+
+    def resume_unfinished(self) -> List[str]:
+        """
+        Re-queue jobs left queued/running by a previous process.
+        """
+        job_ids = self.store.unfinished_job_ids()
+        for job_id in job_ids:
+            self.store.update_job(job_id, status="queued")
+            self._schedule(job_id)
+        return job_ids
+
+    def _schedule(self, job_id: str) -> None:
+        with self._lock:
+            self._cancel_events[job_id] = threading.Event()
+        self._executor.submit(self._run_job, job_id)
+
+    # ---------- queries ----------
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        job = self.store.get_job(job_id)
+        if job is None:
+            return None
+
+        with self._lock:
+            in_flight = self._in_flight.get(job_id, 0) if job["status"] == "running" else 0
+
+        return {
+            "job_id": job["id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "total": job["total"],
+            "done": job["done"],
+            "failed": job["failed"],
+            "in_flight": in_flight,
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+        }
+
+    def results(self, job_id: str, cursor: int = 0, limit: int = 100) -> Dict:
+        rows = self.store.get_results(job_id, cursor=cursor, limit=limit)
+        items = []
+        for idx, report_json, error in rows:
+            items.append({
+                "index": idx,
+                "report": json.loads(report_json) if report_json is not None else None,
+                "error": error,
+            })
+        next_cursor = rows[-1][0] + 1 if len(rows) == limit else None
+        return {"job_id": job_id, "items": items, "next_cursor": next_cursor}
+
+    def report_table(self, job_id: str, page_rows: int = 5000) -> ReportTable:
+        """
+        All finished reports of a job as a columnar ReportTable, in input
+        order (failed rows are left out).
+        """
+        table = ReportTable()
+        cursor = 0
+        while True:
+            rows = self.store.get_results(job_id, cursor=cursor, limit=page_rows)
+            table.extend_json(report_json for _, report_json, _ in rows if report_json is not None)
+            if len(rows) < page_rows:
+                return table
+            cursor = rows[-1][0] + 1
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Ask a queued/running job to stop. Finished rows are kept.
+        """
+        job = self.store.get_job(job_id)
+        if job is None or job["status"] not in ACTIVE_STATUSES:
+            return False
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        if job["status"] == "queued":
+            self.store.update_job(job_id, status="cancelled", finished_at=time.time())
+        return True
+
+    # ---------- worker ----------
+
+    def _run_job(self, job_id: str) -> None:
+        with self._lock:
+            cancel_event = self._cancel_events.get(job_id) or threading.Event()
+
+        job = self.store.get_job(job_id)
+        if job is None or job["status"] not in ACTIVE_STATUSES:
+            return
+        if cancel_event.is_set():
+            self.store.update_job(job_id, status="cancelled", finished_at=time.time())
+            return
+
+        self.store.update_job(job_id, status="running", started_at=job["started_at"] or time.time())
+
+        try:
+            if job["kind"] == "ingest-pdf" and not self.store.has_inputs(job_id):
+                self._extract_inputs(job)
+
+            self._process_rows(job_id, cancel_event)
+        except Exception as e:
+            print(f"[JobManager] Job {job_id} failed: {e}")
+            self.store.update_job(
+                job_id,
+                status="failed",
+                error=str(getattr(e, "detail", None) or e),
+                finished_at=time.time(),
+            )
+        finally:
+            with self._lock:
+                self._cancel_events.pop(job_id, None)
+
+    def _extract_inputs(self, job: Dict) -> None:
+        if self.extract_fn is None:
+            raise RuntimeError("No document extractor configured for ingest-pdf jobs")
+
+        providers = self.extract_fn(job["source_path"], job["source_name"] or "")
+        self.store.set_inputs(job["id"], providers)
+
+        # rows are stored now; the upload is no longer needed for resume
+        try:
+            os.remove(job["source_path"])
+        except OSError:
+            pass
+
+    def _process_rows(self, job_id: str, cancel_event: threading.Event) -> None:
+        done, failed = self.store.count_results(job_id)
+        pending = self.store.pending_inputs(job_id)
+
+        buffer: List[Tuple[int, Optional[str], Optional[str]]] = []
+        finished: List[ProviderReport] = []
+        last_flush = time.monotonic()
+        failures: List[Tuple[int, str]] = []
+
+        def track(delta: int) -> None:
+            with self._lock:
+                self._in_flight[job_id] = self._in_flight.get(job_id, 0) + delta
+
+        def submitted():
+            # iter_batch pulls a row only when it submits it
+            for _, provider in pending:
+                track(1)
+                yield provider
+
+        def on_error(idx: int, provider: ProviderInput, e: Exception) -> None:
+            failures.append((idx, str(e)))
+            track(-1)
+
+        positions = [idx for idx, _ in pending]
+        if self.hybrid:
+            batch = self.orchestrator.iter_batch_hybrid(
+                submitted(),
+                on_error=on_error,
+            )
+        else:
+            batch = self.orchestrator.iter_batch(
+                submitted(),
+                max_workers=self.workers_per_job,
+                on_error=on_error,
+                as_records=True,
+            )
+
+        try:
+            for pos, report in batch:
+                track(-1)
+                report = as_report_model(report)
+                buffer.append((positions[pos], report.model_dump_json(), None))
+                finished.append(report)
+                done += 1
+
+                while failures:
+                    pos_failed, error = failures.pop()
+                    buffer.append((positions[pos_failed], None, error))
+                    failed += 1
+
+                if (
+                    len(buffer) >= FLUSH_EVERY_ROWS
+                    or time.monotonic() - last_flush >= FLUSH_EVERY_SECONDS
+                ):
+                    self.store.save_results(job_id, buffer, done, failed)
+                    self._queue_for_review(job_id, finished)
+                    buffer = []
+                    finished = []
+                    last_flush = time.monotonic()
+
+                if cancel_event.is_set() or self._stopping.is_set():
+                    break
+        finally:
+            batch.close()
+            with self._lock:
+                self._in_flight.pop(job_id, None)
+
+        while failures:
+            pos_failed, error = failures.pop()
+            buffer.append((positions[pos_failed], None, error))
+            failed += 1
+        self.store.save_results(job_id, buffer, done, failed)
+        self._queue_for_review(job_id, finished)
+
+        if cancel_event.is_set():
+            self.store.update_job(job_id, status="cancelled", finished_at=time.time())
+        elif not self._stopping.is_set():
+            self.store.update_job(job_id, status="completed", finished_at=time.time())
+        # else: process is stopping; leave the job "running" so it is resumed
+
+    def _queue_for_review(self, job_id: str, reports: List[ProviderReport]) -> None:
+        if self.review_queue is None or not reports:
+            return
+        try:
+            self.review_queue.add_reports(reports, source=f"job:{job_id}")
+        except Exception as e:
+            print(f"[JobManager] Could not update review queue for job {job_id}: {e}")
+
+    def shutdown(self) -> None:
+        """
+        Stop workers after flushing finished rows. Interrupted jobs stay
+        active and are resumed by the next resume_unfinished().
+        """
+        self._stopping.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -2,18 +2,35 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from typing import List
-import io
-import zipfile
+from typing import List, Optional, Tuple
+import asyncio
+import json
+import os
+import tempfile
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
 from models import ProviderInput, ProviderReport
 from orchestrator import Flow1Orchestrator
+from npi_client import npi_breaker, npi_cache, npi_hedge, npi_limiter
+from request_coalescer import AsyncRequestCoalescer
 from agents.document_extraction_agent import DocumentExtractionAgent
+from jobs import JobManager, JobStore
+from npi_sources import npi_source_from_env
+from candidate_index import candidate_index_from_env
+from website_scraper import page_fetcher
+from metrics import REGISTRY, CONTENT_TYPE, STAGE_SECONDS
+from fingerprint_store import FingerprintStore, IncrementalRun
+from records import AnyReport, as_report_model
+from extraction_cache import ExtractionCache
+from pdf_ingest import PdfIngestor, UnsupportedUpload, pdf_members, spool_upload
+from review_queue import DEFAULT_LEASE_SECONDS, ReviewQueue
+from serialization import FastJSONResponse, encode_batch_body, json_bytes_response
 
-app = FastAPI(title="Provider Data Validation – Flow 1")
+app = FastAPI(title="Provider Data Validation – Flow 1", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,8 +40,92 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-orchestrator = Flow1Orchestrator()
-doc_extractor = DocumentExtractionAgent()
+# NPI_SOURCE=api | nppes | nppes+api (see npi_sources.py);
+# CANDIDATE_INDEX_PATH enables NPI candidates for unknown NPIs (candidate_index.py)
+orchestrator = Flow1Orchestrator(
+    npi_source=npi_source_from_env(), candidate_index=candidate_index_from_env()
+)
+# Gemini extractions keyed by PDF SHA-256 + prompt / model version
+EXTRACTION_CACHE_PATH = os.getenv(
+    "FLOW1_EXTRACTION_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "extractions.sqlite3"),
+)
+doc_extractor = DocumentExtractionAgent(cache=ExtractionCache(EXTRACTION_CACHE_PATH))
+# Concurrent, rate-limit-aware extraction over spooled PDF / ZIP uploads
+pdf_ingestor = PdfIngestor(doc_extractor)
+
+# In-flight call limits per backend for the async pipeline. Higher is
+# not faster: benchmarks.run_benchmarks (400 rows, 50 ms stub) ran
+# arun_batch at ~96 rows/s with 100 / 20, ~135 rows/s with 16 / 8, and
+# the 8-thread run_batch at ~113 rows/s.
+NPI_CONCURRENCY = int(os.getenv("FLOW1_NPI_CONCURRENCY", "16"))
+SCRAPE_CONCURRENCY = int(os.getenv("FLOW1_SCRAPE_CONCURRENCY", "8"))
+
+# Building response bodies counts as a pipeline stage in /metrics
+_SERIALIZE_SECONDS = STAGE_SECONDS.labels("serialize")
+# Batch bodies with at least this many reports are encoded and compressed
+# in a worker thread instead of on the event loop
+SERIALIZE_THREAD_ROWS = int(os.getenv("FLOW1_SERIALIZE_THREAD_ROWS", "50"))
+
+# Last report per row + hashes of its sources, for ?incremental=true runs
+FINGERPRINTS_PATH = os.getenv(
+    "FLOW1_FINGERPRINTS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "fingerprints.sqlite3"),
+)
+fingerprint_store = FingerprintStore(FINGERPRINTS_PATH)
+
+# Persistent manual-review queue, fed by every batch / job / upload
+REVIEW_QUEUE_PATH = os.getenv(
+    "FLOW1_REVIEW_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "review_queue.sqlite3"),
+)
+review_queue = ReviewQueue(REVIEW_QUEUE_PATH)
+
+# Streamed batches hand reports to the review queue in chunks of this size
+REVIEW_QUEUE_FLUSH_ROWS = 500
+
+# Background batch jobs (results persisted in SQLite)
+JOBS_DIR = os.getenv(
+    "FLOW1_JOBS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobs"),
+)
+
+
+# Where /flow1/ingest-pdf spools uploads (default: the system temp dir)
+UPLOAD_SPOOL_DIR = os.getenv("FLOW1_UPLOAD_SPOOL_DIR") or None
+
+
+def _extract_from_spooled_upload(path: str, filename: str) -> List[ProviderInput]:
+    providers = pdf_ingestor.extract_all(path, filename)
+    if not providers:
+        raise ValueError("No providers could be extracted from the document(s).")
+    return providers
+
+
+job_manager = JobManager(
+    orchestrator,
+    JobStore(os.path.join(JOBS_DIR, "jobs.sqlite3")),
+    upload_dir=os.path.join(JOBS_DIR, "uploads"),
+    extract_fn=_extract_from_spooled_upload,
+    max_jobs=int(os.getenv("FLOW1_MAX_JOBS", "2")),
+    workers_per_job=int(os.getenv("FLOW1_JOB_WORKERS", "8")),
+    # "hybrid": CPU stages in process pools (see hybrid_pipeline)
+    hybrid=os.getenv("FLOW1_JOB_MODE", "threads") == "hybrid",
+    review_queue=review_queue,
+)
+
+
+@app.on_event("startup")
+def resume_jobs():
+    resumed = job_manager.resume_unfinished()
+    if resumed:
+        print(f"[Flow1] Resumed {len(resumed)} unfinished job(s).")
+
+
+@app.on_event("shutdown")
+def stop_jobs():
+    job_manager.shutdown()
+    orchestrator.shutdown()
 
 
 @app.get("/health")
@@ -32,100 +133,516 @@ def health_check():
     return {"status": "ok", "flow": "flow-1"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Per-stage latency, external calls by outcome, in-flight work and
+    batch throughput, in Prometheus text format.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/flow1/npi-cache/stats")
+def npi_cache_stats():
+    """
+    Hit / miss / eviction counters for the NPI Registry response cache.
+    """
+    return npi_cache.stats()
+
+
+@app.get("/flow1/npi-limiter/stats")
+def npi_limiter_stats():
+    """
+    Current adaptive concurrency limit for NPI Registry calls, with
+    increase / decrease / pause counters (see resilience.py).
+    """
+    return npi_limiter.stats()
+
+
+@app.get("/flow1/resilience/stats")
+def resilience_stats():
+    """
+    NPI Registry circuit breaker and hedged-request counters, and the
+    practice-site hosts whose circuit is open or half-open.
+    """
+    return {
+        "npi_breaker": npi_breaker.stats(),
+        "npi_hedge": npi_hedge.stats(),
+        "website": page_fetcher.breaker_stats(),
+    }
+
+
 @app.post("/flow1/validate-provider", response_model=ProviderReport)
-def validate_single_provider(provider: ProviderInput):
+async def validate_single_provider(provider: ProviderInput):
     """
     Run Flow-1 for a single provider (structured JSON input).
     """
-    return orchestrator.run_for_provider(provider)
+    return await orchestrator.arun_for_provider(provider)
 
 
 @app.post("/flow1/validate-batch")
-def validate_batch(providers: List[ProviderInput]):
+async def validate_batch(
+    providers: List[ProviderInput],
+    request: Request,
+    stream: bool = False,
+    incremental: bool = False,
+    full_roster: bool = False,
+    compact: bool = False,
+    omit_unchanged: bool = False,
+):
     """
     Run Flow-1 for a batch of providers (structured input from CSV/etc.).
 
-    Uses a thread pool under the hood to validate multiple providers
-    in parallel, significantly improving speed for larger batches.
+    Runs the async pipeline on the event loop, keeping up to
+    NPI_CONCURRENCY registry calls and SCRAPE_CONCURRENCY page fetches
+    in flight without tying up a worker thread.
+
+    With `?stream=true` the response is NDJSON (see _stream_batch_ndjson)
+    and each report is sent as soon as it completes.
+
+    With `?incremental=true`, rows whose input, NPI record and website data
+    are unchanged since their last run reuse the stored report instead of
+    being re-scored; `incremental_stats` gives skipped / recomputed counts.
+    Add `?full_roster=true` when the batch is the whole roster: stored
+    reports for rows of its NPIs that are no longer in it are dropped.
+
+    Response size (see serialization.py): `?compact=true` lists the review
+    queue as {index, npi, priority} entries pointing into `reports`;
+    `?omit_unchanged=true` leaves out output values equal to the input and
+    null notes. Bodies are gzip / zstd compressed per Accept-Encoding.
     """
-    max_workers = 8  # tweak this if needed
+    run = IncrementalRun(fingerprint_store, full_roster=full_roster) if incremental else None
 
-    reports = orchestrator.run_batch(providers, max_workers=max_workers)
-    review_queue = orchestrator.build_review_queue(reports)
+    if stream:
+        return StreamingResponse(
+            _stream_batch_ndjson(providers, run),
+            media_type="application/x-ndjson",
+        )
 
-    return {
-        "reports": [r.model_dump() for r in reports],
-        "review_queue": [r.model_dump() for r in review_queue],
+    coalescer = AsyncRequestCoalescer()
+    records = await orchestrator.arun_batch(
+        providers,
+        npi_concurrency=NPI_CONCURRENCY,
+        scrape_concurrency=SCRAPE_CONCURRENCY,
+        coalescer=coalescer,
+        incremental=run,
+        as_records=True,
+    )
+    reports = await asyncio.to_thread(_as_models, records)
+    await asyncio.to_thread(review_queue.add_reports, reports, "validate-batch")
+
+    extra = {"dedup_stats": coalescer.stats()}
+    if run is not None:
+        extra["incremental_stats"] = run.stats()
+    return await _batch_response(
+        request, reports, extra, compact=compact, omit_unchanged=omit_unchanged
+    )
+
+
+def _encode_batch_response(
+    reports: List[ProviderReport],
+    extra: dict,
+    compact: bool,
+    omit_unchanged: bool,
+    accept_encoding: Optional[str],
+) -> Response:
+    with _SERIALIZE_SECONDS.time():
+        body = encode_batch_body(
+            reports,
+            orchestrator.review_queue_indices(reports),
+            extra,
+            compact=compact,
+            omit_unchanged=omit_unchanged,
+        )
+        return json_bytes_response(body, accept_encoding)
+
+
+async def _batch_response(
+    request: Request,
+    reports: List[ProviderReport],
+    extra: dict,
+    compact: bool = False,
+    omit_unchanged: bool = False,
+) -> Response:
+    """
+    Encoded (and compressed) batch body; large batches are encoded in a
+    worker thread so other requests keep being served meanwhile.
+    """
+    args = (reports, extra, compact, omit_unchanged, request.headers.get("accept-encoding"))
+    if len(reports) < SERIALIZE_THREAD_ROWS:
+        return _encode_batch_response(*args)
+    return await asyncio.to_thread(_encode_batch_response, *args)
+
+
+def _as_models(records: List[AnyReport]) -> List[ProviderReport]:
+    """
+    The batch's ReportRecords as ProviderReports (run off the event loop).
+    """
+    return [as_report_model(r) for r in records]
+
+
+async def _stream_batch_ndjson(
+    providers: List[ProviderInput],
+    incremental: Optional[IncrementalRun] = None,
+):
+    """
+    One JSON object per line:
+    - {"type": "report", "index": i, "report": {...}}   in completion order
+    - {"type": "summary", ...}                          counts + dedup / incremental stats
+    - {"type": "review_queue", "items": [...]}          needs_review rows by priority
+
+    Review-queue items reference reports by input index instead of
+    repeating them, so finished reports are not kept in memory.
+    """
+    coalescer = AsyncRequestCoalescer()
+    status_counts = {}
+    review_items = []
+    to_queue: List[ProviderReport] = []
+    processed = 0
+
+    async for idx, report in orchestrator.aiter_batch(
+        providers,
+        npi_concurrency=NPI_CONCURRENCY,
+        scrape_concurrency=SCRAPE_CONCURRENCY,
+        coalescer=coalescer,
+        incremental=incremental,
+        as_records=True,
+    ):
+        processed += 1
+        status_counts[report.status] = status_counts.get(report.status, 0) + 1
+        if report.status == "needs_review":
+            review_items.append({
+                "index": idx,
+                "npi": report.provider_input.npi,
+                "name": report.provider_input.name,
+                "priority_score": report.priority_score,
+                "priority_level": report.priority_level,
+            })
+        with _SERIALIZE_SECONDS.time():
+            report = as_report_model(report)
+            line = '{"type":"report","index":%d,"report":%s}\n' % (idx, report.model_dump_json())
+
+        to_queue.append(report)
+        if len(to_queue) >= REVIEW_QUEUE_FLUSH_ROWS:
+            await asyncio.to_thread(review_queue.add_reports, to_queue, "validate-batch")
+            to_queue = []
+        yield line
+
+    await asyncio.to_thread(review_queue.add_reports, to_queue, "validate-batch")
+
+    summary = {
+        "type": "summary",
+        "total_providers": len(providers),
+        "processed": processed,
+        "failed": len(providers) - processed,
+        "status_counts": status_counts,
+        "dedup_stats": coalescer.stats(),
     }
+    if incremental is not None:
+        summary["incremental_stats"] = incremental.stats()
+    yield json.dumps(summary) + "\n"
+
+    review_items.sort(key=lambda item: (-item["priority_score"], item["index"]))
+    yield json.dumps({"type": "review_queue", "items": review_items}) + "\n"
+
+
+async def _extract_and_validate(
+    path: str, filename: str, members: List[str]
+) -> Tuple[int, List[ProviderReport], AsyncRequestCoalescer]:
+    """
+    Extract PDFs concurrently and validate each PDF's providers as soon as
+    it is extracted, while the remaining PDFs are still with Gemini.
+    Reports come back in ZIP member order.
+    """
+    coalescer = AsyncRequestCoalescer()
+    per_member: List[List[AnyReport]] = [[] for _ in members]
+    extracted: asyncio.Queue = asyncio.Queue()
+
+    async def validate() -> None:
+        # one PDF at a time, so NPI / scrape concurrency stays as configured
+        while True:
+            item = await extracted.get()
+            if item is None:
+                return
+            idx, providers = item
+            per_member[idx] = await orchestrator.arun_batch(
+                providers,
+                npi_concurrency=NPI_CONCURRENCY,
+                scrape_concurrency=SCRAPE_CONCURRENCY,
+                coalescer=coalescer,
+                as_records=True,
+            )
+
+    validator = asyncio.create_task(validate())
+    total = 0
+    try:
+        async for idx, _, providers in pdf_ingestor.aiter_extracted(path, filename, members):
+            total += len(providers)
+            if providers:
+                extracted.put_nowait((idx, providers))
+    except BaseException:
+        validator.cancel()
+        raise
+    extracted.put_nowait(None)
+    await validator
+
+    records = [r for reports in per_member for r in reports]
+    return total, await asyncio.to_thread(_as_models, records), coalescer
 
 
 @app.post("/flow1/ingest-pdf")
-async def ingest_pdf(file: UploadFile = File(...)):
+async def ingest_pdf(
+    request: Request,
+    file: UploadFile = File(...),
+    compact: bool = False,
+    omit_unchanged: bool = False,
+):
     """
     Accepts:
     - A single PDF
     - OR a ZIP file containing one or more PDFs
 
-    Extracts providers using Gemini (DocumentExtractionAgent),
-    then runs the standard Flow-1 validation pipeline.
+    The upload is spooled to disk and its PDFs are extracted concurrently
+    with Gemini (DocumentExtractionAgent); each PDF's providers go through
+    the standard Flow-1 validation pipeline as soon as they are extracted.
+
+    `compact` / `omit_unchanged` and compression as for /flow1/validate-batch.
     """
     filename = (file.filename or "").lower()
-    content = await file.read()
+    path = await asyncio.to_thread(
+        spool_upload, file.file, UPLOAD_SPOOL_DIR, os.path.splitext(filename)[1]
+    )
+    try:
+        if os.path.getsize(path) == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+        try:
+            members = pdf_members(path, filename)
+        except UnsupportedUpload as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        total, reports, coalescer = await _extract_and_validate(path, filename, members)
+    finally:
+        os.remove(path)
+
+    if not total:
+        raise HTTPException(
+            status_code=422,
+            detail="No providers could be extracted from the document(s).",
+        )
 
-    if not content:
-        raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+    await asyncio.to_thread(review_queue.add_reports, reports, f"ingest-pdf:{filename}")
 
-    extracted_providers: List[ProviderInput] = []
+    return await _batch_response(
+        request,
+        reports,
+        {"total_extracted_providers": total, "dedup_stats": coalescer.stats()},
+        compact=compact,
+        omit_unchanged=omit_unchanged,
+    )
 
-    # -------- CASE 1: ZIP FILE (contains PDFs) --------
-    if filename.endswith(".zip"):
-        try:
-            with zipfile.ZipFile(io.BytesIO(content)) as z:
-                pdf_files = [
-                    name for name in z.namelist()
-                    if name.lower().endswith(".pdf")
-                ]
-
-                if not pdf_files:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="ZIP file does not contain any PDF documents.",
-                    )
-
-                for pdf_name in pdf_files:
-                    pdf_bytes = z.read(pdf_name)
-                    providers = doc_extractor.extract_providers_from_pdf(pdf_bytes)
-                    extracted_providers.extend(providers)
-
-        except zipfile.BadZipFile:
-            raise HTTPException(status_code=400, detail="Invalid ZIP file uploaded.")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error processing ZIP: {e}")
-
-    # -------- CASE 2: SINGLE PDF --------
-    elif filename.endswith(".pdf"):
-        extracted_providers = doc_extractor.extract_providers_from_pdf(content)
-
-    # -------- UNSUPPORTED FILE --------
-    else:
+
+# ---------- review queue ----------
+
+@app.get("/flow1/review-queue")
+def list_review_queue(
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    state: str = "open",
+    priority_level: Optional[str] = None,
+    status: Optional[str] = None,
+    min_member_impact: Optional[int] = None,
+):
+    """
+    Review items by priority (highest first), one page at a time.
+    Pass the returned `next_cursor` to fetch the next page.
+    """
+    return review_queue.page(
+        cursor=cursor,
+        limit=max(1, min(limit, 1000)),
+        state=state,
+        priority_level=priority_level,
+        status=status,
+        min_member_impact=min_member_impact,
+    )
+
+
+@app.get("/flow1/review-queue/top")
+def top_review_items(
+    k: int = 10,
+    priority_level: Optional[str] = None,
+    status: Optional[str] = None,
+    min_member_impact: Optional[int] = None,
+):
+    """
+    The k highest-priority open items.
+    """
+    return review_queue.top(
+        k=max(1, min(k, 1000)),
+        priority_level=priority_level,
+        status=status,
+        min_member_impact=min_member_impact,
+    )
+
+
+@app.get("/flow1/review-queue/stats")
+def review_queue_stats():
+    """
+    Item counts by state, and open items by priority level.
+    """
+    return review_queue.stats()
+
+
+@app.post("/flow1/review-queue/claim")
+def claim_review_item(
+    reviewer: str,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    priority_level: Optional[str] = None,
+    status: Optional[str] = None,
+    min_member_impact: Optional[int] = None,
+):
+    """
+    Claim the highest-priority open item for `reviewer`. 204 when the
+    queue is empty. Unresolved claims return to the queue after the lease.
+    """
+    item = review_queue.claim_next(
+        reviewer,
+        lease_seconds=lease_seconds,
+        priority_level=priority_level,
+        status=status,
+        min_member_impact=min_member_impact,
+    )
+    if item is None:
+        return Response(status_code=204)
+    return item
+
+
+@app.get("/flow1/review-queue/{item_id}")
+def get_review_item(item_id: int):
+    item = review_queue.get(item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Review item not found.")
+    return item
+
+
+@app.post("/flow1/review-queue/{item_id}/resolve")
+def resolve_review_item(item_id: int, reviewer: Optional[str] = None):
+    """
+    Mark an item reviewed (with `reviewer`: only if they hold the claim).
+    """
+    if not review_queue.resolve(item_id, reviewer):
+        raise HTTPException(status_code=409, detail="Item is not open or not claimed by this reviewer.")
+    return review_queue.get(item_id)
+
+
+@app.post("/flow1/review-queue/{item_id}/release")
+def release_review_item(item_id: int, reviewer: Optional[str] = None):
+    """
+    Put a claimed item back in the queue unreviewed.
+    """
+    if not review_queue.release(item_id, reviewer):
+        raise HTTPException(status_code=409, detail="Item is not open or not claimed by this reviewer.")
+    return review_queue.get(item_id)
+
+
+# ---------- background jobs ----------
+
+@app.post("/flow1/jobs", status_code=202)
+def submit_batch_job(providers: List[ProviderInput]):
+    """
+    Queue a batch for background validation. Returns a job id to poll.
+    """
+    if not providers:
+        raise HTTPException(status_code=400, detail="No providers submitted.")
+    job_id = job_manager.submit(providers)
+    return job_manager.status(job_id)
+
+
+@app.post("/flow1/jobs/ingest-pdf", status_code=202)
+def submit_pdf_job(file: UploadFile = File(...)):
+    """
+    Queue a PDF (or ZIP of PDFs) for background extraction + validation.
+    """
+    filename = (file.filename or "").lower()
+    if not (filename.endswith(".pdf") or filename.endswith(".zip")):
         raise HTTPException(
             status_code=400,
             detail="Unsupported file type. Upload a PDF or a ZIP containing PDFs.",
         )
+    job_id = job_manager.submit_upload(filename, file.file)
+    return job_manager.status(job_id)
 
-    if not extracted_providers:
-        raise HTTPException(
-            status_code=422,
-            detail="No providers could be extracted from the document(s).",
-        )
 
-    # -------- RUN FLOW-1 PIPELINE --------
-    max_workers = 8
-    reports = orchestrator.run_batch(extracted_providers, max_workers=max_workers)
-    review_queue = orchestrator.build_review_queue(reports)
+@app.get("/flow1/jobs/{job_id}")
+def get_job_status(job_id: str):
+    """
+    Progress counters: total / done / failed / in_flight and job status.
+    """
+    status = job_manager.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return status
 
-    return {
-        "total_extracted_providers": len(extracted_providers),
-        "reports": [r.model_dump() for r in reports],
-        "review_queue": [r.model_dump() for r in review_queue],
-    }
+
+@app.get("/flow1/jobs/{job_id}/results")
+def get_job_results(job_id: str, cursor: int = 0, limit: int = 100):
+    """
+    Finished reports in input order, one page at a time.
+    Pass the returned `next_cursor` to fetch the next page.
+    """
+    if job_manager.status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    limit = max(1, min(limit, 1000))
+    return job_manager.results(job_id, cursor=cursor, limit=limit)
+
+
+_EXPORT_FORMATS = {
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+    "csv": (".csv", "text/csv"),
+}
+
+
+@app.get("/flow1/jobs/{job_id}/export")
+def export_job_results(job_id: str, format: str = "parquet"):
+    """
+    All finished reports of a job as one columnar file: Parquet (zstd),
+    Arrow IPC or CSV, one flat row per report (see columnar.py).
+    """
+    if job_manager.status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if format not in _EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(_EXPORT_FORMATS)}")
+    suffix, media_type = _EXPORT_FORMATS[format]
+
+    table = job_manager.report_table(job_id)
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    try:
+        if format == "parquet":
+            table.write_parquet(path)
+        elif format == "arrow":
+            table.write_arrow(path)
+        else:
+            table.write_csv(path)
+    except RuntimeError as e:
+        os.remove(path)
+        raise HTTPException(status_code=501, detail=str(e))
+
+    return FileResponse(
+        path,
+        media_type=media_type,
+        filename=f"flow1-{job_id}{suffix}",
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+@app.post("/flow1/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """
+    Stop a queued or running job. Reports finished so far are kept.
+    """
+    if job_manager.status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if not job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job is not running.")
+    return job_manager.status(job_id)
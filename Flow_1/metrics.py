@@ -0,0 +1,404 @@
+# metrics.py
+"""
+In-process pipeline metrics, exposed in Prometheus text format on /metrics.
+
+Deliberately tiny (no prometheus_client dependency): counters, gauges and
+fixed-bucket histograms, each optionally split by label values. Hot paths
+bind their label values once (`METRIC.labels(...)`) and then pay one lock
+and an add per update.
+"""
+import bisect
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; covers cache hits (~µs) up to slow registry calls / scrapes
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape_label(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """
+        The series for these label values (created on first use).
+        Keep the returned object around on hot paths.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _series(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for values, child in self._series():
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def render(self, name: str, labelnames, values) -> List[str]:
+        return [f"{name}{_label_text(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count (calls, rows, errors).
+    """
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self, name: str, labelnames, values) -> List[str]:
+        return [f"{name}{_label_text(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down (in-flight calls, last batch throughput).
+    """
+
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_upper", "_counts", "_sum", "_count")
+
+    def __init__(self, upper: Tuple[float, ...]) -> None:
+        self._lock = threading.Lock()
+        self._upper = upper
+        self._counts = [0] * (len(upper) + 1)   # last slot: > largest bucket
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self._upper, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def render(self, name: str, labelnames, values) -> List[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        lines = []
+        cumulative = 0
+        for upper, n in zip(self._upper + (float("inf"),), counts):
+            cumulative += n
+            le = 'le="' + _format_value(upper) + '"'
+            lines.append(f"{name}_bucket{_label_text(labelnames, values, le)} {cumulative}")
+        lines.append(f"{name}_sum{_label_text(labelnames, values)} {_format_value(total)}")
+        lines.append(f"{name}_count{_label_text(labelnames, values)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("_child", "_started")
+
+    def __init__(self, child: _HistogramChild) -> None:
+        self._child = child
+        self._started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._child.observe(time.perf_counter() - self._started)
+
+
+class Histogram(_Metric):
+    """
+    Distribution of durations (seconds) in fixed cumulative buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------- Flow-1 metrics ----------
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "flow1_stage_seconds",
+    "Time spent per provider in each pipeline stage.",
+    ["stage"],
+))
+
+EXTERNAL_CALLS = REGISTRY.register(Counter(
+    "flow1_external_calls_total",
+    "Calls to external services by outcome (cache hits are not counted).",
+    ["backend", "outcome"],
+))
+
+EXTERNAL_CALL_SECONDS = REGISTRY.register(Histogram(
+    "flow1_external_call_seconds",
+    "Latency of calls to external services.",
+    ["backend"],
+))
+
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "flow1_in_flight",
+    "Work currently in progress (providers, npi calls, website fetches).",
+    ["kind"],
+))
+
+CONCURRENCY_LIMIT = REGISTRY.register(Gauge(
+    "flow1_concurrency_limit",
+    "Current adaptive concurrency limit per backend (see resilience.py).",
+    ["backend"],
+))
+
+RETRIES = REGISTRY.register(Counter(
+    "flow1_retries_total",
+    "Retried external calls by reason (HTTP status / timeout / connection).",
+    ["backend", "reason"],
+))
+
+CIRCUITS_OPEN = REGISTRY.register(Gauge(
+    "flow1_circuits_open",
+    "Circuit breakers currently open or half-open, per backend (see resilience.py).",
+    ["backend"],
+))
+
+CIRCUIT_EVENTS = REGISTRY.register(Counter(
+    "flow1_circuit_events_total",
+    "Circuit breaker events per backend (opened / closed / rejected / probe).",
+    ["backend", "event"],
+))
+
+HEDGED_CALLS = REGISTRY.register(Counter(
+    "flow1_hedged_calls_total",
+    "Hedged calls per backend (sent / won = the hedge answered first / denied = over budget "
+    "/ no_slot = the backend's limiter was full).",
+    ["backend", "outcome"],
+))
+
+BATCH_ROWS = REGISTRY.register(Counter(
+    "flow1_batch_rows_total",
+    "Rows finished by batch runs, by outcome (ok / failed).",
+    ["outcome"],
+))
+
+BATCH_SECONDS = REGISTRY.register(Histogram(
+    "flow1_batch_seconds",
+    "Wall time of whole batch runs.",
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600),
+))
+
+BATCH_ROWS_PER_SECOND = REGISTRY.register(Gauge(
+    "flow1_batch_last_rows_per_second",
+    "Throughput of the most recently finished batch.",
+))
+
+
+def call_outcome(error: Optional[BaseException]) -> str:
+    """
+    Outcome label for an external call that raised `error`
+    (requests or httpx): timeout / 404 / 429 / http_error / cancelled / error.
+    """
+    if error is None:
+        return "ok"
+
+    name = type(error).__name__
+    if name == "CancelledError":
+        return "cancelled"
+    if "Timeout" in name:
+        return "timeout"
+
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status == 404:
+        return "404"
+    if status == 429:
+        return "429"
+    if status is not None:
+        return "http_error"
+    return "error"
+
+
+class ExternalCall:
+    """
+    Times one call to an external service and records it:
+
+        with ExternalCall("npi") as call:
+            ...
+            if nothing_found:
+                call.outcome = "not_found"
+
+    An exception leaving the block sets the outcome from call_outcome().
+    """
+
+    __slots__ = ("backend", "outcome", "_in_flight", "_seconds", "_started")
+
+    def __init__(self, backend: str) -> None:
+        self.backend = backend
+        self.outcome = "ok"
+        self._in_flight = IN_FLIGHT.labels(backend)
+        self._seconds = EXTERNAL_CALL_SECONDS.labels(backend)
+        self._started = 0.0
+
+    def __enter__(self) -> "ExternalCall":
+        self._in_flight.inc()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._seconds.observe(time.perf_counter() - self._started)
+        self._in_flight.dec()
+        if exc is not None:
+            self.outcome = call_outcome(exc)
+        EXTERNAL_CALLS.labels(self.backend, self.outcome).inc()
+
+
+class BatchMeter:
+    """
+    Rows / wall time for one batch run; published when the batch ends.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.ok = 0
+        self.failed = 0
+
+    def finish(self) -> None:
+        elapsed = time.perf_counter() - self.started
+        BATCH_ROWS.labels("ok").inc(self.ok)
+        BATCH_ROWS.labels("failed").inc(self.failed)
+        BATCH_SECONDS.observe(elapsed)
+        if elapsed > 0 and self.ok + self.failed:
+            BATCH_ROWS_PER_SECOND.set((self.ok + self.failed) / elapsed)
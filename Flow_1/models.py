@@ -17,6 +17,12 @@ class DataValidationResult(BaseModel):
     provider_input: ProviderInput
     npi_raw: Optional[Dict] = None             # full JSON from NPI Registry
     website_data: Optional[Dict[str, str]] = None  # scraped practice site info
+    # "found" | "not_found" | "unavailable" (registry throttled / down, so
+    # npi_raw=None says nothing about the NPI) | None (not looked up)
+    npi_lookup_status: Optional[str] = None
+    # NPI missing / not found: likely registry records from the local
+    # candidate index ({"npi", "score", "name", "address", ...}), best first
+    npi_candidates: Optional[List[Dict]] = None
 
 
 class FieldWithConfidence(BaseModel):
@@ -36,7 +42,7 @@ class ProviderOutput(BaseModel):
 class ProviderReport(BaseModel):
     provider_input: ProviderInput
     provider_output: ProviderOutput
-    status: str                    # "confirmed" | "updated" | "needs_review"
+    status: str                    # "confirmed" | "updated" | "needs_review" | "source_unavailable"
     reasons: List[str]
     priority_score: float
     priority_level: str            # "HIGH" | "MEDIUM" | "LOW" | "NONE"
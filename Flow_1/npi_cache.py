@@ -0,0 +1,199 @@
+# npi_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600           # NPI records rarely change
+DEFAULT_NEGATIVE_TTL_SECONDS = 24 * 3600      # re-check "not found" daily
+DEFAULT_MEMORY_ENTRIES = 50_000
+
+
+class NPICache:
+    """
+    Two-level cache for NPI Registry responses:
+    - in-process LRU (fast path, bounded number of entries)
+    - SQLite file (survives restarts, shared by every run on the box)
+
+    Every entry carries its own expiry. A cached record of None means the
+    registry answered with no results ("not found" / negative cache).
+    Lookup failures (timeouts, HTTP errors) must NOT be stored here.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+        max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_memory_entries = max_memory_entries
+
+        # npi -> (expires_at, record)
+        self._memory: "OrderedDict[str, Tuple[float, Optional[Dict]]]" = OrderedDict()
+        self._mem_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self._stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "writes": 0,
+        }
+
+        if path:
+            self._open_db(path)
+
+    # ---------- storage helpers ----------
+
+    def _open_db(self, path: str) -> None:
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS npi_cache (
+                    npi TEXT PRIMARY KEY,
+                    payload TEXT,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error as e:
+            print(f"[NPI CACHE] Disk cache disabled ({path}): {e}")
+            self._conn = None
+
+    def _bump(self, key: str) -> None:
+        self._stats[key] += 1
+
+    def _remember(self, npi: str, expires_at: float, record: Optional[Dict]) -> None:
+        with self._mem_lock:
+            self._memory[npi] = (expires_at, record)
+            self._memory.move_to_end(npi)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+                self._bump("evictions")
+
+    # ---------- public API ----------
+
+    def get(self, npi: str) -> Tuple[bool, Optional[Dict]]:
+        """
+        Return (hit, record). `record` is None on a negative hit or a miss,
+        so callers must look at `hit` to tell them apart.
+        """
+        now = time.time()
+
+        with self._mem_lock:
+            entry = self._memory.get(npi)
+            if entry is not None:
+                expires_at, record = entry
+                if expires_at > now:
+                    self._memory.move_to_end(npi)
+                    self._bump("memory_hits")
+                    if record is None:
+                        self._bump("negative_hits")
+                    return True, record
+                del self._memory[npi]
+                self._bump("expired")
+
+        if self._conn is not None:
+            with self._db_lock:
+                row = self._conn.execute(
+                    "SELECT payload, expires_at FROM npi_cache WHERE npi = ?",
+                    (npi,),
+                ).fetchone()
+            if row is not None:
+                payload, expires_at = row
+                if expires_at > now:
+                    record = json.loads(payload) if payload is not None else None
+                    self._remember(npi, expires_at, record)
+                    with self._mem_lock:
+                        self._bump("disk_hits")
+                        if record is None:
+                            self._bump("negative_hits")
+                    return True, record
+                with self._mem_lock:
+                    self._bump("expired")
+
+        with self._mem_lock:
+            self._bump("misses")
+        return False, None
+
+    def set(self, npi: str, record: Optional[Dict]) -> None:
+        """
+        Store a registry answer. Pass record=None for "no results".
+        """
+        now = time.time()
+        ttl = self.ttl_seconds if record is not None else self.negative_ttl_seconds
+        expires_at = now + ttl
+
+        self._remember(npi, expires_at, record)
+
+        if self._conn is not None:
+            payload = json.dumps(record) if record is not None else None
+            try:
+                with self._db_lock:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO npi_cache (npi, payload, fetched_at, expires_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (npi, payload, now, expires_at),
+                    )
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"[NPI CACHE] Failed to persist NPI {npi}: {e}")
+
+        with self._mem_lock:
+            self._bump("writes")
+
+    def invalidate(self, npi: str) -> None:
+        with self._mem_lock:
+            self._memory.pop(npi, None)
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.execute("DELETE FROM npi_cache WHERE npi = ?", (npi,))
+                self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """
+        Drop expired rows from the disk store. Returns number of rows removed.
+        """
+        if self._conn is None:
+            return 0
+        with self._db_lock:
+            cur = self._conn.execute(
+                "DELETE FROM npi_cache WHERE expires_at <= ?", (time.time(),)
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def clear(self) -> None:
+        with self._mem_lock:
+            self._memory.clear()
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.execute("DELETE FROM npi_cache")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._mem_lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+        return stats
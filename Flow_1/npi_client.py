@@ -1,32 +1,221 @@
 # npi_client.py
+import asyncio
+import os
 from typing import Optional, Dict
 
 import requests
 
-NPI_BASE_URL = "https://npiregistry.cms.hhs.gov/api/"
+from async_http import httpx
+
+from metrics import ExternalCall
+from resilience import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    Hedge,
+    RetryPolicy,
+    SourceUnavailable,
+    call_with_retries,
+    acall_with_retries,
+)
+from npi_cache import (
+    NPICache,
+    DEFAULT_TTL_SECONDS,
+    DEFAULT_NEGATIVE_TTL_SECONDS,
+    DEFAULT_MEMORY_ENTRIES,
+)
+
+# Override to point at a stand-in server (see benchmarks/stub_server.py)
+NPI_BASE_URL = os.getenv("NPI_BASE_URL", "https://npiregistry.cms.hhs.gov/api/")
+NPI_TIMEOUT_SECONDS = float(os.getenv("NPI_TIMEOUT_SECONDS", "6"))
 
 # Reuse a single session for all requests (connection pooling, less overhead)
 _session = requests.Session()
 
+# Response cache shared by every caller in this process.
+# Set NPI_CACHE_PATH="" to keep the cache in memory only.
+NPI_CACHE_PATH = os.getenv(
+    "NPI_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "npi_cache.sqlite3"),
+)
+
+npi_cache = NPICache(
+    path=NPI_CACHE_PATH or None,
+    ttl_seconds=float(os.getenv("NPI_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+    negative_ttl_seconds=float(
+        os.getenv("NPI_CACHE_NEGATIVE_TTL_SECONDS", DEFAULT_NEGATIVE_TTL_SECONDS)
+    ),
+    max_memory_entries=int(os.getenv("NPI_CACHE_MEMORY_ENTRIES", DEFAULT_MEMORY_ENTRIES)),
+)
+
+# Registry calls in flight, shared by every thread / batch in this process:
+# grows while the registry answers fast, halves on 429 / 5xx / timeouts.
+npi_limiter = AdaptiveLimiter(
+    "npi",
+    initial=int(os.getenv("NPI_CONCURRENCY_INITIAL", "8")),
+    minimum=int(os.getenv("NPI_CONCURRENCY_MIN", "1")),
+    maximum=int(os.getenv("NPI_CONCURRENCY_MAX", "64")),
+    latency_target=float(os.getenv("NPI_LATENCY_TARGET_SECONDS", "2.0")),
+)
+
+# Jittered retries of transient failures, all within one deadline
+npi_retry_policy = RetryPolicy(
+    attempts=int(os.getenv("NPI_RETRY_ATTEMPTS", "4")),
+    base_delay=float(os.getenv("NPI_RETRY_BASE_SECONDS", "0.25")),
+    max_delay=float(os.getenv("NPI_RETRY_MAX_SECONDS", "8")),
+    deadline=float(os.getenv("NPI_RETRY_DEADLINE_SECONDS", "20")),
+)
+
+# While the registry is down, lookups fail fast (rows become
+# "source_unavailable") instead of each waiting out its timeouts.
+npi_breaker = CircuitBreaker(
+    "npi",
+    failure_threshold=int(os.getenv("NPI_BREAKER_FAILURES", "5")),
+    open_seconds=float(os.getenv("NPI_BREAKER_OPEN_SECONDS", "30")),
+    max_open_seconds=float(os.getenv("NPI_BREAKER_MAX_OPEN_SECONDS", "300")),
+)
 
-def query_npi_by_number(npi: str) -> Optional[Dict]:
+# A registry call slower than the recent p95 gets a second attempt in its
+# own npi_limiter slot; the first answer wins (at most ~NPI_HEDGE_BUDGET
+# extra calls per call).
+npi_hedge = Hedge(
+    "npi",
+    quantile=float(os.getenv("NPI_HEDGE_QUANTILE", "0.95")),
+    initial_delay=float(os.getenv("NPI_HEDGE_INITIAL_SECONDS", "1.0")),
+    budget=float(os.getenv("NPI_HEDGE_BUDGET", "0.1")),
+    max_workers=2 * int(os.getenv("NPI_CONCURRENCY_MAX", "64")),
+    enabled=os.getenv("NPI_HEDGE", "1") != "0",
+    limiter=npi_limiter,
+)
+
+
+def query_npi_by_number(npi: str, use_cache: bool = True) -> Optional[Dict]:
     """
     Call CMS NPI Registry API by NPI number.
     Returns the first result dict if found, otherwise None.
+
+    Throttling, 5xx and timeouts are retried (npi_retry_policy) under
+    npi_limiter; if they persist SourceUnavailable is raised, so a
+    registry outage is never reported as "NPI not found". Slow calls
+    are hedged (npi_hedge), and while npi_breaker is open the lookup
+    fails fast with SourceUnavailable.
+
+    Answers (including "not found") are cached; failed calls are not,
+    so a timeout is retried on the next lookup.
     """
-    params = {
-        "version": "2.1",
-        "number": npi.strip(),
-    }
+    npi = npi.strip()
+
+    if use_cache:
+        hit, record = npi_cache.get(npi)
+        if hit:
+            return record
 
     try:
-        resp = _session.get(NPI_BASE_URL, params=params, timeout=6)
-        resp.raise_for_status()
-        data = resp.json()
-        results = data.get("results", [])
-        if not results:
-            return None
-        return results[0]
+        record = call_with_retries(
+            lambda: npi_hedge.call(lambda: _fetch_npi(npi)),
+            "npi",
+            npi_retry_policy,
+            npi_limiter,
+            npi_breaker,
+        )
+    except SourceUnavailable as e:
+        print(f"[NPI UNAVAILABLE] for NPI {npi}: {e}")
+        raise
+    except Exception as e:
+        print(f"[NPI ERROR] for NPI {npi}: {e}")
+        return None
+
+    if use_cache:
+        npi_cache.set(npi, record)
+    return record
+
+
+async def aquery_npi_by_number(
+    npi: str,
+    client: Optional["httpx.AsyncClient"] = None,
+    limit: Optional[asyncio.Semaphore] = None,
+    use_cache: bool = True,
+) -> Optional[Dict]:
+    """
+    Async version of query_npi_by_number.
+
+    - `client`: pooled httpx.AsyncClient (see async_http.new_async_client)
+    - `limit`: semaphore capping concurrent registry calls; cache hits
+      never wait on it, and it is held per try, not while waiting to
+      retry (npi_limiter applies on top, per try)
+    - the SQLite level of npi_cache is read / written from a worker
+      thread, off the event loop
+    """
+    if client is None or httpx is None:
+        if limit is not None:
+            async with limit:
+                return await asyncio.to_thread(query_npi_by_number, npi, use_cache)
+        return await asyncio.to_thread(query_npi_by_number, npi, use_cache)
+
+    npi = npi.strip()
+
+    if use_cache:
+        if npi_cache.path:
+            hit, record = await asyncio.to_thread(npi_cache.get, npi)
+        else:
+            hit, record = npi_cache.get(npi)
+        if hit:
+            return record
+
+    def fetch():
+        return npi_hedge.acall(lambda: _afetch_npi(npi, client))
+
+    try:
+        record = await acall_with_retries(
+            fetch, "npi", npi_retry_policy, npi_limiter, npi_breaker, slot=limit
+        )
+    except SourceUnavailable as e:
+        print(f"[NPI UNAVAILABLE] for NPI {npi}: {e}")
+        raise
     except Exception as e:
         print(f"[NPI ERROR] for NPI {npi}: {e}")
         return None
+
+    if use_cache:
+        if npi_cache.path:
+            await asyncio.to_thread(npi_cache.set, npi, record)
+        else:
+            npi_cache.set(npi, record)
+    return record
+
+
+def _fetch_npi(npi: str) -> Optional[Dict]:
+    """
+    One registry call (no cache); raises on failure.
+    Recorded under backend="npi" in the external-call metrics.
+    """
+    with ExternalCall("npi") as call:
+        resp = _session.get(NPI_BASE_URL, params=_npi_params(npi), timeout=NPI_TIMEOUT_SECONDS)
+        resp.raise_for_status()
+        record = _first_result(resp.json())
+        if record is None:
+            call.outcome = "not_found"
+    return record
+
+
+async def _afetch_npi(npi: str, client: "httpx.AsyncClient") -> Optional[Dict]:
+    with ExternalCall("npi") as call:
+        resp = await client.get(NPI_BASE_URL, params=_npi_params(npi), timeout=NPI_TIMEOUT_SECONDS)
+        resp.raise_for_status()
+        record = _first_result(resp.json())
+        if record is None:
+            call.outcome = "not_found"
+    return record
+
+
+def _npi_params(npi: str) -> Dict[str, str]:
+    return {
+        "version": "2.1",
+        "number": npi,
+    }
+
+
+def _first_result(data: Dict) -> Optional[Dict]:
+    results = data.get("results", [])
+    if not results:
+        return None
+    return results[0]
@@ -0,0 +1,142 @@
+# npi_sources.py
+import asyncio
+import os
+from typing import Dict, List, Optional
+
+from npi_client import query_npi_by_number, aquery_npi_by_number
+from nppes_index import NPPESIndex
+from resilience import SourceUnavailable
+
+
+class NPISource:
+    """
+    Where DataValidationAgent gets NPI records from.
+
+    lookup() returns a record in the NPI Registry API result shape
+    (basic / addresses / taxonomies), or None if the NPI is unknown.
+    It raises resilience.SourceUnavailable when the source could not
+    answer at all (never "None" for an outage).
+    """
+
+    name = "base"
+
+    def lookup(self, npi: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def alookup(
+        self,
+        npi: str,
+        client=None,
+        limit: Optional[asyncio.Semaphore] = None,
+    ) -> Optional[Dict]:
+        # Local sources answer in microseconds; no need to leave the loop.
+        return self.lookup(npi)
+
+
+class RegistryAPISource(NPISource):
+    """
+    Live CMS NPI Registry API (cached, see npi_client).
+    """
+
+    name = "api"
+
+    def lookup(self, npi: str) -> Optional[Dict]:
+        return query_npi_by_number(npi)
+
+    async def alookup(
+        self,
+        npi: str,
+        client=None,
+        limit: Optional[asyncio.Semaphore] = None,
+    ) -> Optional[Dict]:
+        return await aquery_npi_by_number(npi, client=client, limit=limit)
+
+
+class NPPESIndexSource(NPISource):
+    """
+    Local NPPES bulk-file index (see nppes_index.py). No network.
+    """
+
+    name = "nppes"
+
+    def __init__(self, index_path: str) -> None:
+        self.index = NPPESIndex(index_path)
+
+    def lookup(self, npi: str) -> Optional[Dict]:
+        return self.index.lookup(npi)
+
+
+class FallbackSource(NPISource):
+    """
+    Try sources in order; the first one that knows the NPI wins.
+    E.g. local index first, live API for NPIs issued after the file was built.
+
+    A source that is unavailable is skipped; if no other source knows the
+    NPI, SourceUnavailable is raised (the NPI may exist there).
+    """
+
+    name = "fallback"
+
+    def __init__(self, sources: List[NPISource]) -> None:
+        self.sources = sources
+        self.name = "+".join(s.name for s in sources)
+
+    def lookup(self, npi: str) -> Optional[Dict]:
+        unavailable: Optional[SourceUnavailable] = None
+        for source in self.sources:
+            try:
+                record = source.lookup(npi)
+            except SourceUnavailable as e:
+                unavailable = e
+                continue
+            if record is not None:
+                return record
+        if unavailable is not None:
+            raise unavailable
+        return None
+
+    async def alookup(
+        self,
+        npi: str,
+        client=None,
+        limit: Optional[asyncio.Semaphore] = None,
+    ) -> Optional[Dict]:
+        unavailable: Optional[SourceUnavailable] = None
+        for source in self.sources:
+            try:
+                record = await source.alookup(npi, client=client, limit=limit)
+            except SourceUnavailable as e:
+                unavailable = e
+                continue
+            if record is not None:
+                return record
+        if unavailable is not None:
+            raise unavailable
+        return None
+
+
+def npi_source_from_env() -> NPISource:
+    """
+    NPI_SOURCE:
+    - "api" (default): live registry API
+    - "nppes": local index only (needs NPPES_INDEX_PATH)
+    - "nppes+api": local index, API for NPIs missing from it
+    """
+    mode = os.getenv("NPI_SOURCE", "api").strip().lower()
+    if mode == "api":
+        return RegistryAPISource()
+
+    index_path = os.getenv("NPPES_INDEX_PATH", "")
+    try:
+        local = NPPESIndexSource(index_path)
+    except FileNotFoundError as e:
+        print(f"[NPI SOURCE] {e}; falling back to the registry API.")
+        return RegistryAPISource()
+
+    if mode == "nppes":
+        return local
+    if mode == "nppes+api":
+        return FallbackSource([local, RegistryAPISource()])
+
+    print(f"[NPI SOURCE] Unknown NPI_SOURCE={mode!r}; using the registry API.")
+    return RegistryAPISource()
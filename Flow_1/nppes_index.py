@@ -0,0 +1,278 @@
+# nppes_index.py
+"""
+Offline NPI lookups from the CMS NPPES dissemination file.
+
+Build once (takes a few minutes for the full ~9 GB file):
+
+    python nppes_index.py npidata_pfile_YYYYMMDD-YYYYMMDD.csv nppes_index.sqlite3 \
+        --taxonomy nucc_taxonomy.csv
+
+then point NPPES_INDEX_PATH at the .sqlite3 file (see npi_sources.py).
+
+Only the fields QualityAssuranceAgent reads are kept (basic name, practice
+location address + phone, primary taxonomy), one row per active NPI keyed by
+the integer NPI, so a lookup is a single B-tree probe on a memory-mapped file.
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# NPPES column headers we need
+COL_NPI = "NPI"
+COL_ENTITY_TYPE = "Entity Type Code"
+COL_ORG_NAME = "Provider Organization Name (Legal Business Name)"
+COL_LAST_NAME = "Provider Last Name (Legal Name)"
+COL_FIRST_NAME = "Provider First Name"
+COL_ADDRESS_1 = "Provider First Line Business Practice Location Address"
+COL_ADDRESS_2 = "Provider Second Line Business Practice Location Address"
+COL_CITY = "Provider Business Practice Location Address City Name"
+COL_STATE = "Provider Business Practice Location Address State Name"
+COL_POSTAL = "Provider Business Practice Location Address Postal Code"
+COL_PHONE = "Provider Business Practice Location Address Telephone Number"
+TAXONOMY_SLOTS = 15
+COL_TAXONOMY = "Healthcare Provider Taxonomy Code_{}"
+COL_PRIMARY_SWITCH = "Healthcare Provider Primary Taxonomy Switch_{}"
+
+# Index row layout (after the integer NPI key)
+RECORD_COLUMNS = (
+    "entity_type", "org_name", "first_name", "last_name",
+    "address_1", "address_2", "city", "state", "postal_code", "telephone_number",
+    "taxonomy_code", "taxonomy_desc",
+)
+
+# Large mmap window: the whole index of a national file fits comfortably
+MMAP_SIZE = 4 * 1024 * 1024 * 1024
+
+
+def record_from_row(row: Tuple) -> Dict:
+    """
+    Turn an index row (without the NPI key) into the NPI Registry API
+    result shape that QualityAssuranceAgent expects.
+    """
+    (entity_type, org_name, first_name, last_name,
+     address_1, address_2, city, state, postal_code, phone,
+     taxonomy_code, taxonomy_desc) = row
+
+    basic: Dict[str, str] = {}
+    if org_name:
+        basic["organization_name"] = org_name
+    if first_name:
+        basic["first_name"] = first_name
+    if last_name:
+        basic["last_name"] = last_name
+
+    address = {
+        "address_purpose": "LOCATION",
+        "address_1": address_1,
+        "address_2": address_2,
+        "city": city,
+        "state": state,
+        "postal_code": postal_code,
+        "telephone_number": phone,
+    }
+
+    taxonomies: List[Dict] = []
+    if taxonomy_code:
+        taxonomies.append({"code": taxonomy_code, "desc": taxonomy_desc, "primary": True})
+
+    return {
+        "enumeration_type": "NPI-2" if entity_type == "2" else "NPI-1",
+        "basic": basic,
+        "addresses": [address],
+        "taxonomies": taxonomies,
+        "source": "nppes_index",
+    }
+
+
+class NPPESIndex:
+    """
+    Read-only lookups against an index built by build_nppes_index().
+    Safe to share between threads (one SQLite connection per thread).
+    """
+
+    def __init__(self, path: str) -> None:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"NPPES index not found: {path}")
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, npi: str) -> Optional[Dict]:
+        npi = (npi or "").strip()
+        if not npi.isdigit():
+            return None
+        row = self._conn().execute(
+            f"SELECT {', '.join(RECORD_COLUMNS)} FROM nppes WHERE npi = ?",
+            (int(npi),),
+        ).fetchone()
+        if row is None:
+            return None
+        return record_from_row(row)
+
+    def metadata(self) -> Dict[str, str]:
+        return dict(self._conn().execute("SELECT key, value FROM nppes_meta").fetchall())
+
+
+# ---------- importer ----------
+
+def load_taxonomy_descriptions(path: str) -> Dict[str, str]:
+    """
+    code -> description from the NUCC taxonomy CSV
+    ("Classification, Specialization", as the registry API shows it).
+    """
+    descriptions: Dict[str, str] = {}
+    with open(path, mode="r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        for row in csv.DictReader(f):
+            code = (row.get("Code") or "").strip()
+            if not code:
+                continue
+            parts = [
+                (row.get("Classification") or "").strip(),
+                (row.get("Specialization") or "").strip(),
+            ]
+            descriptions[code] = ", ".join(p for p in parts if p)
+    return descriptions
+
+
+def _iter_index_rows(
+    csv_path: str, taxonomy_desc: Dict[str, str]
+) -> Iterator[Tuple]:
+    with open(csv_path, mode="r", encoding="utf-8", errors="replace", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        pos = {name: i for i, name in enumerate(header)}
+
+        def col(name: str) -> int:
+            if name not in pos:
+                raise ValueError(f"NPPES file is missing column: {name}")
+            return pos[name]
+
+        i_npi = col(COL_NPI)
+        i_entity = col(COL_ENTITY_TYPE)
+        fields = [
+            col(COL_ORG_NAME), col(COL_FIRST_NAME), col(COL_LAST_NAME),
+            col(COL_ADDRESS_1), col(COL_ADDRESS_2), col(COL_CITY), col(COL_STATE),
+            col(COL_POSTAL), col(COL_PHONE),
+        ]
+        taxonomy_cols = [
+            (col(COL_TAXONOMY.format(n)), col(COL_PRIMARY_SWITCH.format(n)))
+            for n in range(1, TAXONOMY_SLOTS + 1)
+        ]
+
+        for row in reader:
+            entity_type = row[i_entity]
+            # deactivated NPIs have no entity type; the API does not return them
+            if not entity_type or not row[i_npi].isdigit():
+                continue
+
+            taxonomy_code = ""
+            for i_code, i_switch in taxonomy_cols:
+                code = row[i_code]
+                if not code:
+                    continue
+                if not taxonomy_code:
+                    taxonomy_code = code
+                if row[i_switch] == "Y":
+                    taxonomy_code = code
+                    break
+
+            values = [row[i] or None for i in fields]
+            yield (
+                int(row[i_npi]),
+                entity_type,
+                *values,
+                taxonomy_code or None,
+                taxonomy_desc.get(taxonomy_code) or None,
+            )
+
+
+def build_nppes_index(
+    csv_path: str,
+    index_path: str,
+    taxonomy_path: Optional[str] = None,
+    batch_size: int = 50_000,
+) -> int:
+    """
+    Build (or rebuild) the index from an NPPES dissemination CSV.
+    Writes to a temp file and swaps it in, so readers never see a
+    half-built index. Returns the number of NPIs indexed.
+    """
+    taxonomy_desc = load_taxonomy_descriptions(taxonomy_path) if taxonomy_path else {}
+
+    tmp_path = index_path + ".building"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(
+        f"""
+        CREATE TABLE nppes (
+            npi INTEGER PRIMARY KEY,
+            {', '.join(f'{c} TEXT' for c in RECORD_COLUMNS)}
+        )
+        """
+    )
+    conn.execute("CREATE TABLE nppes_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    insert = (
+        f"INSERT OR REPLACE INTO nppes (npi, {', '.join(RECORD_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * (len(RECORD_COLUMNS) + 1))})"
+    )
+
+    count = 0
+    started = time.time()
+    batch: List[Tuple] = []
+    for row in _iter_index_rows(csv_path, taxonomy_desc):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(insert, batch)
+            count += len(batch)
+            batch = []
+            print(f"[NPPES] {count:,} NPIs indexed ({time.time() - started:.0f}s)")
+    if batch:
+        conn.executemany(insert, batch)
+        count += len(batch)
+
+    conn.executemany(
+        "INSERT INTO nppes_meta (key, value) VALUES (?, ?)",
+        [
+            ("source_file", os.path.basename(csv_path)),
+            ("built_at", str(int(time.time()))),
+            ("npi_count", str(count)),
+        ],
+    )
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+    os.replace(tmp_path, index_path)
+    print(f"[NPPES] Done: {count:,} NPIs -> {index_path}")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a local NPPES NPI index.")
+    parser.add_argument("nppes_csv", help="NPPES dissemination file (npidata_pfile_*.csv)")
+    parser.add_argument("index_path", help="Output SQLite index file")
+    parser.add_argument("--taxonomy", help="NUCC taxonomy CSV for taxonomy descriptions")
+    args = parser.parse_args()
+
+    try:
+        build_nppes_index(args.nppes_csv, args.index_path, taxonomy_path=args.taxonomy)
+    except (OSError, ValueError) as e:
+        print(f"[NPPES] Import failed: {e}")
+        sys.exit(1)
@@ -1,12 +1,29 @@
 # orchestrator.py
-from typing import List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from time import perf_counter
+import asyncio
 
-from models import ProviderInput, ProviderOutput, ProviderReport
+from models import ProviderInput, ProviderReport
+from records import AnyReport, ValidationRecord, as_report_model
 from agents.data_validation_agent import DataValidationAgent
 from agents.quality_assurance_agent import QualityAssuranceAgent
 from agents.directory_management_agent import DirectoryManagementAgent
 from agents.llm_explanation_agent import LLMExplanationAgent
+from request_coalescer import RequestCoalescer, AsyncRequestCoalescer
+from async_http import new_async_client
+from npi_sources import NPISource
+from candidate_index import CandidateIndex
+from metrics import STAGE_SECONDS, IN_FLIGHT, BatchMeter
+from fingerprint_store import Fingerprint, IncrementalRun
+from hybrid_pipeline import HybridExecutor
+
+# Bound once: these are updated for every provider
+_VALIDATE_SECONDS = STAGE_SECONDS.labels("validate")
+_QA_SECONDS = STAGE_SECONDS.labels("qa")
+_SUMMARIZE_SECONDS = STAGE_SECONDS.labels("summarize")
+_EXPLAIN_SECONDS = STAGE_SECONDS.labels("explain")
+_PROVIDERS_IN_FLIGHT = IN_FLIGHT.labels("providers")
 
 
 class Flow1Orchestrator:
@@ -19,75 +36,439 @@ class Flow1Orchestrator:
       -> ExplanationAgent (rule-based in Workflow-1)
 
     Designed for I/O-bound workloads (NPI API, scraping).
-    Uses thread-based parallelism for speed.
+    Uses thread-based parallelism for speed (run_batch), or asyncio with
+    one pooled HTTP client per batch (arun_batch). run_batch_hybrid keeps
+    I/O on threads and moves the CPU stages to process pools.
+
+    Reports are ProviderReport models. Callers that only serialize them
+    pass `as_records=True` and get ReportRecords (records.py), which are
+    cheaper to build and keep; encode them with records.report_json.
     """
 
-    def __init__(self) -> None:
-        self.dv_agent = DataValidationAgent()
+    def __init__(
+        self,
+        npi_source: Optional[NPISource] = None,
+        practice_websites: Optional[Dict[str, str]] = None,
+        candidate_index: Optional[CandidateIndex] = None,
+    ) -> None:
+        self.dv_agent = DataValidationAgent(
+            npi_source=npi_source,
+            practice_websites=practice_websites,
+            candidate_index=candidate_index,
+        )
         self.qa_agent = QualityAssuranceAgent()
         self.dir_agent = DirectoryManagementAgent()
 
         # NOTE: In Workflow-1 this agent is RULE-BASED (no LLM calls)
         self.llm_agent = LLMExplanationAgent()
 
-    def run_for_provider(self, provider: ProviderInput) -> ProviderReport:
+        # Process pools for run_batch_hybrid, started on first use
+        self.hybrid: Optional[HybridExecutor] = None
+
+    def run_for_provider(
+        self,
+        provider: ProviderInput,
+        coalescer: Optional[RequestCoalescer] = None,
+        incremental: Optional[IncrementalRun] = None,
+        as_record: bool = False,
+    ) -> AnyReport:
         """
         Run Flow-1 for a single provider (sequential).
+
+        With `incremental`, steps 2-4 are skipped (and the stored report
+        returned) when the input row, NPI record and website data are the
+        same as on the last run.
+        """
+        _PROVIDERS_IN_FLIGHT.inc()
+        try:
+            # 1) Validate provider data (NPI + public sources)
+            started = perf_counter()
+            dv_result = self.dv_agent.validate_record(provider, coalescer=coalescer)
+            _VALIDATE_SECONDS.observe(perf_counter() - started)
+
+            report = self._score_and_summarize(provider, dv_result, incremental)
+            return report if as_record else as_report_model(report)
+        finally:
+            _PROVIDERS_IN_FLIGHT.dec()
+
+    async def arun_for_provider(
+        self,
+        provider: ProviderInput,
+        client=None,
+        coalescer: Optional[AsyncRequestCoalescer] = None,
+        npi_limit: Optional[asyncio.Semaphore] = None,
+        scrape_limit: Optional[asyncio.Semaphore] = None,
+        incremental: Optional[IncrementalRun] = None,
+        as_record: bool = False,
+    ) -> AnyReport:
         """
-        # 1) Validate provider data (NPI + public sources)
-        dv_result = self.dv_agent.validate_provider(provider)
+        Async version of run_for_provider.
+        Only step 1 awaits network I/O; steps 2-4 are quick CPU work and
+        run on the loop, except with `incremental`, whose fingerprint
+        store (SQLite) is read in a worker thread.
+        """
+        _PROVIDERS_IN_FLIGHT.inc()
+        try:
+            started = perf_counter()
+            dv_result = await self.dv_agent.avalidate_record(
+                provider,
+                client=client,
+                coalescer=coalescer,
+                npi_limit=npi_limit,
+                scrape_limit=scrape_limit,
+            )
+            _VALIDATE_SECONDS.observe(perf_counter() - started)
+
+            if incremental is not None:
+                report = await asyncio.to_thread(
+                    self._score_and_summarize, provider, dv_result, incremental
+                )
+            else:
+                report = self._score_and_summarize(provider, dv_result, incremental)
+            return report if as_record else as_report_model(report)
+        finally:
+            _PROVIDERS_IN_FLIGHT.dec()
+
+    def _score_and_summarize(
+        self,
+        provider: ProviderInput,
+        dv_result: ValidationRecord,
+        incremental: Optional[IncrementalRun] = None,
+    ) -> AnyReport:
+        """
+        Steps 2-4 of Flow-1, each timed into flow1_stage_seconds.
+        Returns a ReportRecord (or the stored ProviderReport an
+        incremental run reused); no model is built here.
+        """
+        # a registry outage says nothing about the row: never reuse or store it
+        if dv_result.npi_lookup_status == "unavailable":
+            incremental = None
+
+        fingerprint = None
+        if incremental is not None:
+            fingerprint = Fingerprint.of(provider, dv_result)
+            report = incremental.reuse(provider, fingerprint)
+            if report is not None:
+                return report
+
+        t0 = perf_counter()
 
         # 2) Consolidate and score fields
-        output: ProviderOutput = self.qa_agent.generate_output(dv_result)
+        output = self.qa_agent.generate_output_record(dv_result)
+        t1 = perf_counter()
 
         # 3) Determine status, reasons, and priority
-        report: ProviderReport = self.dir_agent.summarize_provider(provider, output)
+        record = self.dir_agent.summarize_record(provider, output)
+        t2 = perf_counter()
 
         # 4) Generate human-readable explanation (rule-based)
-        report.llm_explanation = self.llm_agent.explain(report)
+        record.llm_explanation = self.llm_agent.explain(record)
+        t3 = perf_counter()
 
-        return report
+        _QA_SECONDS.observe(t1 - t0)
+        _SUMMARIZE_SECONDS.observe(t2 - t1)
+        _EXPLAIN_SECONDS.observe(t3 - t2)
+
+        if incremental is not None:
+            incremental.record(provider, fingerprint, record)
+        return record
 
     def run_batch(
         self,
         providers: List[ProviderInput],
         max_workers: int = 8,
-    ) -> List[ProviderReport]:
+        coalescer: Optional[RequestCoalescer] = None,
+        incremental: Optional[IncrementalRun] = None,
+        as_records: bool = False,
+    ) -> List[AnyReport]:
         """
         Run Flow-1 for many providers in parallel.
 
         - Uses threads because the workload is I/O-bound.
         - Preserves input order in output.
+        - Repeated NPIs / practice URLs are fetched once per batch;
+          pass your own `coalescer` to read its stats afterwards.
+        - With `incremental`, unchanged rows reuse their last report;
+          read skipped / recomputed counts from incremental.stats().
         """
         if not providers:
             return []
 
-        reports: List[ProviderReport] = [None] * len(providers)  # type: ignore
+        reports: List[Optional[AnyReport]] = [None] * len(providers)
+        for idx, report in self.iter_batch(
+            providers,
+            max_workers=max_workers,
+            coalescer=coalescer,
+            incremental=incremental,
+            as_records=as_records,
+        ):
+            reports[idx] = report
 
-        def task(index: int, provider: ProviderInput) -> ProviderReport:
-            return self.run_for_provider(provider)
+        return [r for r in reports if r is not None]
+
+    def iter_batch(
+        self,
+        providers: Iterable[ProviderInput],
+        max_workers: int = 8,
+        coalescer: Optional[RequestCoalescer] = None,
+        max_in_flight: Optional[int] = None,
+        on_error: Optional[Callable[[int, ProviderInput, Exception], None]] = None,
+        incremental: Optional[IncrementalRun] = None,
+        as_records: bool = False,
+    ) -> Iterator[Tuple[int, AnyReport]]:
+        """
+        Thread-pool generator yielding (input_index, report) as each
+        provider finishes, in completion order.
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_index = {
-                executor.submit(task, idx, p): idx
-                for idx, p in enumerate(providers)
-            }
+        - At most `max_in_flight` rows are submitted at once (default:
+          4 x max_workers), so `providers` may be a lazy iterator.
+        - Failed rows are logged (or passed to `on_error`) and skipped.
+        - Closing the generator early cancels rows not yet started.
+        """
+        if coalescer is None:
+            coalescer = RequestCoalescer()
+        if max_in_flight is None:
+            max_in_flight = 4 * max_workers
+
+        rows = enumerate(providers)
+        meter = BatchMeter()
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        future_to_row: Dict[Future, Tuple[int, ProviderInput]] = {}
 
-            for future in as_completed(future_to_index):
-                idx = future_to_index[future]
+        def refill() -> None:
+            while len(future_to_row) < max_in_flight:
                 try:
-                    reports[idx] = future.result()
-                except Exception as e:
-                    provider = providers[idx]
-                    print(
-                        "[Flow1Orchestrator] Error processing provider "
-                        f"{provider.name} (NPI: {provider.npi}): {e}"
-                    )
+                    idx, provider = next(rows)
+                except StopIteration:
+                    return
+                future = executor.submit(
+                    self.run_for_provider, provider, coalescer, incremental, as_records
+                )
+                future_to_row[future] = (idx, provider)
+
+        try:
+            refill()
+            while future_to_row:
+                done, _ = wait(future_to_row, return_when=FIRST_COMPLETED)
+                finished = [(future, future_to_row.pop(future)) for future in done]
+                refill()
+
+                for future, (idx, provider) in finished:
+                    try:
+                        report = future.result()
+                    except Exception as e:
+                        meter.failed += 1
+                        if on_error is not None:
+                            on_error(idx, provider, e)
+                        else:
+                            print(
+                                "[Flow1Orchestrator] Error processing provider "
+                                f"{provider.name} (NPI: {provider.npi}): {e}"
+                            )
+                        continue
+                    meter.ok += 1
+                    yield idx, report
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if incremental is not None:
+                incremental.flush()
+            meter.finish()
+
+    def run_batch_hybrid(
+        self,
+        providers: List[ProviderInput],
+        coalescer: Optional[RequestCoalescer] = None,
+        incremental: Optional[IncrementalRun] = None,
+    ) -> List[ProviderReport]:
+        """
+        run_batch with the CPU stages (page parsing, QA, summarize,
+        explain) in process pools, so they scale with cores instead of
+        sharing the GIL with the fetch threads.
+
+        Worker counts per stage come from self.hybrid (see
+        hybrid_pipeline for the FLOW1_*_WORKERS defaults).
+        """
+        if not providers:
+            return []
+
+        reports: List[Optional[ProviderReport]] = [None] * len(providers)
+        for idx, report in self.iter_batch_hybrid(
+            providers, coalescer=coalescer, incremental=incremental
+        ):
+            reports[idx] = report
 
         return [r for r in reports if r is not None]
 
+    def iter_batch_hybrid(
+        self,
+        providers: Iterable[ProviderInput],
+        coalescer: Optional[RequestCoalescer] = None,
+        max_in_flight: Optional[int] = None,
+        on_error: Optional[Callable[[int, ProviderInput, Exception], None]] = None,
+        incremental: Optional[IncrementalRun] = None,
+    ) -> Iterator[Tuple[int, ProviderReport]]:
+        """
+        Generator form of run_batch_hybrid (same contract as iter_batch).
+        """
+        if self.hybrid is None:
+            self.hybrid = HybridExecutor()
+        return self.hybrid.iter_batch(
+            self,
+            providers,
+            coalescer=coalescer,
+            max_in_flight=max_in_flight,
+            on_error=on_error,
+            incremental=incremental,
+        )
+
+    def shutdown(self) -> None:
+        """
+        Stop the hybrid process pools (if any were started).
+        """
+        if self.hybrid is not None:
+            self.hybrid.shutdown()
+
+    def run_batches(
+        self,
+        batches: Iterable[List[ProviderInput]],
+        max_workers: int = 8,
+    ) -> Iterator[List[ProviderReport]]:
+        """
+        Run Flow-1 over a stream of batches (e.g. data_loader.iter_provider_batches),
+        yielding each batch's reports as soon as it is done.
+
+        Only one batch is in memory at a time. De-duplication is per batch;
+        repeats across batches are served by the NPI cache.
+        """
+        for batch in batches:
+            yield self.run_batch(batch, max_workers=max_workers)
+
+    async def arun_batch(
+        self,
+        providers: List[ProviderInput],
+        npi_concurrency: int = 16,
+        scrape_concurrency: int = 8,
+        coalescer: Optional[AsyncRequestCoalescer] = None,
+        incremental: Optional[IncrementalRun] = None,
+        as_records: bool = False,
+    ) -> List[AnyReport]:
+        """
+        Run Flow-1 for many providers on the event loop.
+
+        - One pooled async HTTP client is shared by the whole batch.
+        - `npi_concurrency` / `scrape_concurrency` cap in-flight calls
+          per backend independently.
+        - Preserves input order in output; failed rows are dropped
+          (same as run_batch).
+        """
+        if not providers:
+            return []
+
+        reports: List[Optional[AnyReport]] = [None] * len(providers)
+        async for idx, report in self.aiter_batch(
+            providers,
+            npi_concurrency=npi_concurrency,
+            scrape_concurrency=scrape_concurrency,
+            coalescer=coalescer,
+            incremental=incremental,
+            as_records=as_records,
+        ):
+            reports[idx] = report
+
+        return [r for r in reports if r is not None]
+
+    async def aiter_batch(
+        self,
+        providers: Iterable[ProviderInput],
+        npi_concurrency: int = 16,
+        scrape_concurrency: int = 8,
+        coalescer: Optional[AsyncRequestCoalescer] = None,
+        max_in_flight: Optional[int] = None,
+        incremental: Optional[IncrementalRun] = None,
+        as_records: bool = False,
+    ) -> AsyncIterator[Tuple[int, AnyReport]]:
+        """
+        Async generator yielding (input_index, report) as each provider
+        finishes, in completion order.
+
+        At most `max_in_flight` rows are started at once (default:
+        4 x npi_concurrency), so `providers` may be a lazy iterator.
+        Failed rows are logged and skipped.
+        """
+        if coalescer is None:
+            coalescer = AsyncRequestCoalescer()
+        if max_in_flight is None:
+            max_in_flight = 4 * npi_concurrency
+
+        npi_limit = asyncio.Semaphore(npi_concurrency)
+        scrape_limit = asyncio.Semaphore(scrape_concurrency)
+        client = new_async_client(max_connections=npi_concurrency + scrape_concurrency)
+
+        async def task(
+            idx: int, provider: ProviderInput
+        ) -> Tuple[int, Optional[AnyReport]]:
+            try:
+                report = await self.arun_for_provider(
+                    provider,
+                    client=client,
+                    coalescer=coalescer,
+                    npi_limit=npi_limit,
+                    scrape_limit=scrape_limit,
+                    incremental=incremental,
+                    as_record=as_records,
+                )
+                return idx, report
+            except Exception as e:
+                print(
+                    "[Flow1Orchestrator] Error processing provider "
+                    f"{provider.name} (NPI: {provider.npi}): {e}"
+                )
+                return idx, None
+
+        rows = enumerate(providers)
+        pending: set = set()
+        meter = BatchMeter()
+
+        def refill() -> None:
+            while len(pending) < max_in_flight:
+                try:
+                    idx, provider = next(rows)
+                except StopIteration:
+                    return
+                pending.add(asyncio.ensure_future(task(idx, provider)))
+
+        try:
+            refill()
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                refill()
+                for fut in done:
+                    idx, report = fut.result()
+                    if report is None:
+                        meter.failed += 1
+                        continue
+                    meter.ok += 1
+                    yield idx, report
+        finally:
+            for fut in pending:
+                fut.cancel()
+            # let cancelled rows unwind before their client is closed
+            await asyncio.gather(*pending, return_exceptions=True)
+            if incremental is not None:
+                await asyncio.to_thread(incremental.flush)
+            if client is not None:
+                await client.aclose()
+            meter.finish()
+
     def build_review_queue(self, reports: List[ProviderReport]) -> List[ProviderReport]:
         """
         Return providers that need human review, sorted by priority.
         """
         return self.dir_agent.prioritized_review_queue(reports)
+
+    def review_queue_indices(self, reports: List[ProviderReport]) -> List[int]:
+        """
+        Same order as build_review_queue, as positions in `reports`.
+        """
+        return self.dir_agent.prioritized_review_indices(reports)
@@ -0,0 +1,534 @@
+# page_fetcher.py
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from async_http import httpx
+from metrics import ExternalCall
+from resilience import CircuitBreaker
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024      # practice pages are small; cap runaway downloads
+DEFAULT_FRESH_SECONDS = 3600             # re-use a cached page without revalidating
+DEFAULT_HOST_CONCURRENCY = 2
+DEFAULT_HOST_RATE = 2.0                  # requests / second / host
+DEFAULT_BREAKER_FAILURES = 3             # failed fetches in a row before a host is skipped
+DEFAULT_BREAKER_OPEN_SECONDS = 120.0
+DEFAULT_PAGE_MAX_AGE_SECONDS = 30 * 24 * 3600   # drop pages not seen for a month
+DEFAULT_PAGE_MAX_PAGES = 100_000
+PRUNE_EVERY_PUTS = 1000
+USER_AGENT = "provider-directory-flow1/1.0 (+provider data validation)"
+
+
+class FetchResult(NamedTuple):
+    url: str
+    status_code: int                 # 0 when the request failed
+    text: Optional[str]              # decoded body (None on failure)
+    content_hash: Optional[str]      # sha256 of the body bytes
+    from_cache: bool                 # served from the page cache (fresh or 304)
+    truncated: bool = False
+    error: Optional[str] = None
+
+
+class _CachedPage(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: str
+    body: bytes
+    encoding: Optional[str]
+    fetched_at: float
+
+
+class PageCache:
+    """
+    SQLite store of fetched pages: validators (ETag / Last-Modified) for
+    conditional GETs, the compressed body, and the fields parsed from it
+    so an unchanged page (same content hash) is never parsed twice.
+
+    Pages not fetched or revalidated for `max_age_seconds` are dropped,
+    and only the `max_pages` most recently fetched are kept. If the file
+    cannot be opened or a query fails, the cache turns itself off and
+    every lookup is a miss (pages are then fetched from the network).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_age_seconds: float = DEFAULT_PAGE_MAX_AGE_SECONDS,
+        max_pages: int = DEFAULT_PAGE_MAX_PAGES,
+    ) -> None:
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.max_pages = max_pages
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._puts = 0
+        self._open_db(path)
+        self.prune()
+
+    # ---------- storage helpers ----------
+
+    def _open_db(self, path: str) -> None:
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    encoding TEXT,
+                    fetched_at REAL NOT NULL,
+                    parsed_hash TEXT,
+                    parser_version INTEGER,
+                    parsed_json TEXT
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at)")
+            conn.commit()
+            self._conn = conn
+        except (sqlite3.Error, OSError) as e:
+            print(f"[PAGE CACHE] Disk cache disabled ({path}): {e}")
+            self._conn = None
+
+    def _disable(self, e: Exception) -> None:
+        # caller holds self._lock
+        print(f"[PAGE CACHE] Disk cache disabled ({self.path}): {e}")
+        try:
+            self._conn.close()
+        except sqlite3.Error:
+            pass
+        self._conn = None
+
+    def _fetchone(self, sql: str, params: Tuple) -> Optional[Tuple]:
+        with self._lock:
+            if self._conn is None:
+                return None
+            try:
+                return self._conn.execute(sql, params).fetchone()
+            except sqlite3.Error as e:
+                self._disable(e)
+                return None
+
+    def _write(self, sql: str, params: Tuple) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(sql, params)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._disable(e)
+
+    # ---------- public API ----------
+
+    def get(self, url: str) -> Optional[_CachedPage]:
+        row = self._fetchone(
+            "SELECT etag, last_modified, content_hash, body, encoding, fetched_at "
+            "FROM pages WHERE url = ?",
+            (url,),
+        )
+        if row is None:
+            return None
+        etag, last_modified, content_hash, body, encoding, fetched_at = row
+        if time.time() - fetched_at >= self.max_age_seconds:
+            return None
+        return _CachedPage(etag, last_modified, content_hash, zlib.decompress(body), encoding, fetched_at)
+
+    def put(
+        self,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        content_hash: str,
+        body: bytes,
+        encoding: Optional[str],
+    ) -> None:
+        self._write(
+            """
+            INSERT INTO pages (url, etag, last_modified, content_hash, body, encoding, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                content_hash = excluded.content_hash,
+                body = excluded.body,
+                encoding = excluded.encoding,
+                fetched_at = excluded.fetched_at
+            """,
+            (url, etag, last_modified, content_hash, zlib.compress(body), encoding, time.time()),
+        )
+        with self._lock:
+            self._puts += 1
+            due = self._puts % PRUNE_EVERY_PUTS == 0
+        if due:
+            self.prune()
+
+    def touch(self, url: str) -> None:
+        self._write("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def get_parsed(self, url: str, content_hash: str, parser_version: int) -> Tuple[bool, Optional[Dict]]:
+        """
+        (hit, fields) for fields parsed from exactly this content by this parser version.
+        """
+        row = self._fetchone(
+            "SELECT parsed_json FROM pages WHERE url = ? AND parsed_hash = ? AND parser_version = ?",
+            (url, content_hash, parser_version),
+        )
+        if row is None:
+            return False, None
+        return True, json.loads(row[0]) if row[0] is not None else None
+
+    def put_parsed(self, url: str, content_hash: str, parser_version: int, fields: Optional[Dict]) -> None:
+        self._write(
+            "UPDATE pages SET parsed_hash = ?, parser_version = ?, parsed_json = ? WHERE url = ?",
+            (content_hash, parser_version, json.dumps(fields) if fields is not None else None, url),
+        )
+
+    def prune(self) -> int:
+        """
+        Drop pages older than max_age_seconds, then the least recently
+        fetched beyond max_pages. Returns number of pages removed.
+        """
+        with self._lock:
+            if self._conn is None:
+                return 0
+            try:
+                removed = self._conn.execute(
+                    "DELETE FROM pages WHERE fetched_at < ?",
+                    (time.time() - self.max_age_seconds,),
+                ).rowcount
+                removed += self._conn.execute(
+                    "DELETE FROM pages WHERE url IN ("
+                    "SELECT url FROM pages ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_pages,),
+                ).rowcount
+                self._conn.commit()
+                return removed
+            except sqlite3.Error as e:
+                self._disable(e)
+                return 0
+
+    def count(self) -> int:
+        row = self._fetchone("SELECT COUNT(*) FROM pages", ())
+        return row[0] if row is not None else 0
+
+
+class _HostGate:
+    """
+    Per-host politeness: spaces request starts by 1/rate seconds and
+    caps concurrent requests. `breaker` skips a host that keeps timing
+    out or failing instead of waiting on it for every page.
+    """
+
+    def __init__(self, rate: float, concurrency: int, breaker: CircuitBreaker) -> None:
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.breaker = breaker
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def reserve(self) -> float:
+        """
+        Claim the next start slot; returns how long to wait for it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_at)
+            self._next_at = start + self.interval
+            return start - now
+
+
+class PageFetcher:
+    """
+    Shared fetch layer for practice websites:
+    - pooled keep-alive connections (one requests.Session / the batch's httpx client)
+    - per-host rate and concurrency limits
+    - conditional GET (If-None-Match / If-Modified-Since) against a PageCache
+    - response-size cap and sha256 content hash
+    - a circuit breaker per host: after `breaker_failures` transient
+      failures in a row the host is skipped (error result, no request)
+      for `breaker_open_seconds`, then probed again
+    """
+
+    def __init__(
+        self,
+        cache: Optional[PageCache] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        fresh_seconds: float = DEFAULT_FRESH_SECONDS,
+        host_concurrency: int = DEFAULT_HOST_CONCURRENCY,
+        host_rate: float = DEFAULT_HOST_RATE,
+        pool_size: int = 32,
+        timeout: float = 10,
+        breaker_failures: int = DEFAULT_BREAKER_FAILURES,
+        breaker_open_seconds: float = DEFAULT_BREAKER_OPEN_SECONDS,
+    ) -> None:
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self.host_concurrency = host_concurrency
+        self.host_rate = host_rate
+        self.timeout = timeout
+        self.breaker_failures = breaker_failures
+        self.breaker_open_seconds = breaker_open_seconds
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers["User-Agent"] = USER_AGENT
+
+        self._gates: Dict[str, _HostGate] = {}
+        self._gates_lock = threading.Lock()
+        # asyncio semaphores are bound to one loop: loop -> host -> semaphore
+        self._async_sems: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    # ---------- helpers ----------
+
+    def _gate(self, host: str) -> _HostGate:
+        with self._gates_lock:
+            gate = self._gates.get(host)
+            if gate is None:
+                breaker = CircuitBreaker(
+                    host,
+                    backend="website",
+                    failure_threshold=self.breaker_failures,
+                    open_seconds=self.breaker_open_seconds,
+                    max_open_seconds=8 * self.breaker_open_seconds,
+                )
+                gate = _HostGate(self.host_rate, self.host_concurrency, breaker)
+                self._gates[host] = gate
+            return gate
+
+    def _async_semaphore(self, host: str) -> asyncio.Semaphore:
+        per_loop = self._async_sems.setdefault(asyncio.get_running_loop(), {})
+        sem = per_loop.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(self.host_concurrency)
+            per_loop[host] = sem
+        return sem
+
+    def _fresh(self, url: str) -> Tuple[Optional[_CachedPage], Optional[FetchResult]]:
+        """
+        Look the URL up in the cache. Returns (cached_page, result) where
+        result is set if the cached copy is fresh enough to skip the network.
+        """
+        if self.cache is None:
+            return None, None
+        cached = self.cache.get(url)
+        if cached is not None and time.time() - cached.fetched_at < self.fresh_seconds:
+            return cached, self._from_cached(url, 200, cached)
+        return cached, None
+
+    def _conditional_headers(self, cached: Optional[_CachedPage]) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def _from_cached(self, url: str, status_code: int, cached: _CachedPage) -> FetchResult:
+        return FetchResult(
+            url=url,
+            status_code=status_code,
+            text=cached.body.decode(cached.encoding or "utf-8", errors="replace"),
+            content_hash=cached.content_hash,
+            from_cache=True,
+        )
+
+    def _finish(
+        self,
+        url: str,
+        status_code: int,
+        headers,
+        body: bytes,
+        encoding: Optional[str],
+        truncated: bool,
+        cached: Optional[_CachedPage],
+    ) -> FetchResult:
+        if status_code == 304 and cached is not None:
+            self.cache.touch(url)
+            return self._from_cached(url, 304, cached)
+
+        content_hash = hashlib.sha256(body).hexdigest()
+        if self.cache is not None:
+            # no validators for a cut-off body: a 304 would keep serving
+            # the truncated copy; without them the page is fetched in full
+            # again once it is no longer fresh
+            self.cache.put(
+                url,
+                None if truncated else headers.get("ETag"),
+                None if truncated else headers.get("Last-Modified"),
+                content_hash,
+                body,
+                encoding,
+            )
+        return FetchResult(
+            url=url,
+            status_code=status_code,
+            text=body.decode(encoding or "utf-8", errors="replace"),
+            content_hash=content_hash,
+            from_cache=False,
+            truncated=truncated,
+        )
+
+    # ---------- public API ----------
+
+    def fetch(self, url: str) -> FetchResult:
+        cached, fresh = self._fresh(url)
+        if fresh is not None:
+            return fresh
+
+        host = urlsplit(url).netloc.lower()
+        gate = self._gate(host)
+        if not gate.breaker.allow():
+            return _circuit_open(url, host)
+        with gate.semaphore:
+            delay = gate.reserve()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                with ExternalCall("website"), self._session.get(
+                    url,
+                    headers=self._conditional_headers(cached),
+                    timeout=self.timeout,
+                    stream=True,
+                ) as resp:
+                    if resp.status_code != 304:
+                        resp.raise_for_status()
+                    body, truncated = bytearray(), False
+                    for chunk in resp.iter_content(chunk_size=64 * 1024):
+                        body.extend(chunk)
+                        if len(body) > self.max_bytes:
+                            truncated = True
+                            break
+                    result = self._finish(
+                        url, resp.status_code, resp.headers,
+                        bytes(body[: self.max_bytes]), resp.encoding, truncated, cached,
+                    )
+            except Exception as e:
+                gate.breaker.record(e)
+                return FetchResult(url, 0, None, None, False, error=str(e))
+        gate.breaker.record_success()
+        return result
+
+    async def afetch(
+        self,
+        url: str,
+        client: Optional["httpx.AsyncClient"] = None,
+        limit: Optional[asyncio.Semaphore] = None,
+    ) -> FetchResult:
+        """
+        Async version of fetch() on a pooled httpx.AsyncClient. Page
+        cache reads / writes run in a worker thread, off the event loop.
+
+        `limit` is the caller's cap on concurrent fetches across hosts. It
+        is taken only for the request itself: cache hits, and waiting for
+        this host's next start slot, don't hold it.
+        """
+        if client is None or httpx is None:
+            if limit is None:
+                return await asyncio.to_thread(self.fetch, url)
+            async with limit:
+                return await asyncio.to_thread(self.fetch, url)
+
+        if self.cache is not None:
+            cached, fresh = await asyncio.to_thread(self._fresh, url)
+        else:
+            cached, fresh = None, None
+        if fresh is not None:
+            return fresh
+
+        host = urlsplit(url).netloc.lower()
+        gate = self._gate(host)
+        if not gate.breaker.allow():
+            return _circuit_open(url, host)
+        try:
+            async with self._async_semaphore(host):
+                delay = gate.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if limit is None:
+                    with ExternalCall("website"):
+                        result = await self._astream(url, client, cached)
+                else:
+                    async with limit:
+                        with ExternalCall("website"):
+                            result = await self._astream(url, client, cached)
+        except asyncio.CancelledError:
+            gate.breaker.record_cancelled()
+            raise
+        except Exception as e:
+            gate.breaker.record(e)
+            return FetchResult(url, 0, None, None, False, error=str(e))
+        gate.breaker.record_success()
+        return result
+
+    def breaker_stats(self) -> Dict:
+        """
+        Hosts seen, and the state of every host whose circuit is not closed.
+        """
+        with self._gates_lock:
+            gates = dict(self._gates)
+        not_closed = {
+            host: gate.breaker.stats()
+            for host, gate in gates.items()
+            if gate.breaker.state != CircuitBreaker.CLOSED
+        }
+        return {
+            "hosts": len(gates),
+            "rejected": sum(g.breaker.stats()["rejected"] for g in gates.values()),
+            "not_closed": not_closed,
+        }
+
+    async def _astream(
+        self,
+        url: str,
+        client: "httpx.AsyncClient",
+        cached: Optional[_CachedPage],
+    ) -> FetchResult:
+        async with client.stream(
+            "GET",
+            url,
+            headers={"User-Agent": USER_AGENT, **self._conditional_headers(cached)},
+            timeout=self.timeout,
+        ) as resp:
+            if resp.status_code != 304:
+                resp.raise_for_status()
+            body, truncated = bytearray(), False
+            async for chunk in resp.aiter_bytes():
+                body.extend(chunk)
+                if len(body) > self.max_bytes:
+                    truncated = True
+                    break
+            args = (
+                url, resp.status_code, resp.headers,
+                bytes(body[: self.max_bytes]), resp.encoding, truncated, cached,
+            )
+        if self.cache is not None:
+            return await asyncio.to_thread(self._finish, *args)
+        return self._finish(*args)
+
+
+def _circuit_open(url: str, host: str) -> FetchResult:
+    return FetchResult(url, 0, None, None, False, error=f"{host} circuit open; skipped")
@@ -0,0 +1,225 @@
+# pdf_ingest.py
+"""
+Disk-spooled, concurrent PDF / ZIP ingestion for DocumentExtractionAgent.
+
+- spool_upload: copy an upload to a temp file in chunks (never one big
+  bytes object).
+- pdf_members: list the PDFs in a spooled upload; ZIP members are read
+  one at a time, only when their extraction starts.
+- PdfIngestor: extracts PDFs on a thread pool under an AdaptiveLimiter,
+  so Gemini 429s / 5xx shrink concurrency and are retried with backoff.
+  Results come out per PDF as soon as each one is done.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from models import ProviderInput
+from resilience import AdaptiveLimiter, RetryPolicy, SourceUnavailable
+
+# Upload bytes copied per read while spooling
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+# Worker threads for PDF extraction (upper bound for the adaptive limit)
+EXTRACT_CONCURRENCY = int(os.getenv("FLOW1_PDF_EXTRACT_CONCURRENCY", "4"))
+
+gemini_limiter = AdaptiveLimiter(
+    "gemini",
+    initial=int(os.getenv("GEMINI_CONCURRENCY_INITIAL", str(EXTRACT_CONCURRENCY))),
+    minimum=1,
+    maximum=EXTRACT_CONCURRENCY,
+    # a multi-page PDF legitimately takes tens of seconds
+    latency_target=float(os.getenv("GEMINI_LATENCY_TARGET_SECONDS", "90")),
+    cooldown=5.0,
+)
+
+gemini_retry_policy = RetryPolicy(
+    attempts=int(os.getenv("GEMINI_RETRY_ATTEMPTS", "4")),
+    base_delay=float(os.getenv("GEMINI_RETRY_BASE_SECONDS", "2")),
+    max_delay=float(os.getenv("GEMINI_RETRY_MAX_SECONDS", "30")),
+    deadline=float(os.getenv("GEMINI_RETRY_DEADLINE_SECONDS", "180")),
+)
+
+
+class UnsupportedUpload(ValueError):
+    """
+    The upload is not a PDF, not a readable ZIP, or a ZIP without PDFs.
+    """
+
+
+def spool_upload(fileobj, directory: Optional[str] = None, suffix: str = "") -> str:
+    """
+    Copy a file-like upload to a new temp file and return its path.
+    The caller deletes it when done.
+    """
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(fileobj, out, SPOOL_CHUNK_BYTES)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def pdf_members(path: str, filename: str) -> List[str]:
+    """
+    Names of the PDFs to extract from a spooled upload: the ZIP members
+    ending in .pdf, or [filename] for a single PDF. Only the ZIP's
+    central directory is read here.
+    """
+    filename = filename.lower()
+    if filename.endswith(".pdf"):
+        return [filename]
+    if not filename.endswith(".zip"):
+        raise UnsupportedUpload("Unsupported file type. Upload a PDF or a ZIP containing PDFs.")
+    try:
+        with zipfile.ZipFile(path) as z:
+            names = [
+                info.filename for info in z.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(".pdf")
+            ]
+    except zipfile.BadZipFile:
+        raise UnsupportedUpload("Invalid ZIP file uploaded.")
+    if not names:
+        raise UnsupportedUpload("ZIP file does not contain any PDF documents.")
+    return names
+
+
+class PdfIngestor:
+    """
+    Runs DocumentExtractionAgent over every PDF in a spooled upload.
+
+    - At most `concurrency` PDFs are read into memory at once. `limiter`
+      bounds the Gemini calls in flight (a long PDF makes one call per
+      page range) and narrows further while Gemini is throttling.
+    - A PDF whose extraction fails (after retries) yields no providers;
+      the other PDFs carry on.
+    """
+
+    def __init__(
+        self,
+        extractor,
+        concurrency: int = EXTRACT_CONCURRENCY,
+        limiter: Optional[AdaptiveLimiter] = gemini_limiter,
+        retry_policy: RetryPolicy = gemini_retry_policy,
+    ) -> None:
+        self.extractor = extractor
+        self.concurrency = max(1, concurrency)
+        self.limiter = limiter
+        self.retry_policy = retry_policy
+
+    def _extract_one(self, path: str, archive: Optional[zipfile.ZipFile], member: str) -> List[ProviderInput]:
+        try:
+            if archive is not None:
+                pdf_bytes = archive.read(member)
+            else:
+                with open(path, "rb") as f:
+                    pdf_bytes = f.read()
+            # limiter slots and retries are per Gemini call (page range)
+            return self.extractor.extract_providers_or_raise(
+                pdf_bytes, limiter=self.limiter, retry_policy=self.retry_policy
+            )
+        except SourceUnavailable as e:
+            print(f"[PDF INGEST UNAVAILABLE] {member}: {e}")
+        except Exception as e:
+            print(f"[PDF INGEST ERROR] {member}: {e}")
+        return []
+
+    def iter_extracted(
+        self, path: str, filename: str, members: Optional[List[str]] = None
+    ) -> Iterator[Tuple[int, str, List[ProviderInput]]]:
+        """
+        Yield (member_index, member_name, providers) as each PDF finishes,
+        in completion order.
+        """
+        if members is None:
+            members = pdf_members(path, filename)
+        queue = iter(enumerate(members))
+        # ZipFile serializes reads of its file handle, so one archive can be
+        # shared by all workers; members are decompressed only when picked up
+        archive = zipfile.ZipFile(path) if filename.lower().endswith(".zip") else None
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="pdf-extract")
+        pending = {}
+
+        def refill() -> None:
+            while len(pending) < self.concurrency:
+                try:
+                    idx, member = next(queue)
+                except StopIteration:
+                    return
+                pending[pool.submit(self._extract_one, path, archive, member)] = (idx, member)
+
+        try:
+            refill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    idx, member = pending.pop(fut)
+                    yield idx, member, fut.result()
+                refill()
+        finally:
+            for fut in pending:
+                fut.cancel()
+            pool.shutdown(wait=True)
+            if archive is not None:
+                archive.close()
+
+    def extract_all(self, path: str, filename: str) -> List[ProviderInput]:
+        """
+        All providers of the upload, in member order.
+        """
+        members = pdf_members(path, filename)
+        per_member: List[List[ProviderInput]] = [[] for _ in members]
+        for idx, _, providers in self.iter_extracted(path, filename, members):
+            per_member[idx] = providers
+        return [p for providers in per_member for p in providers]
+
+    async def aiter_extracted(
+        self, path: str, filename: str, members: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[int, str, List[ProviderInput]]]:
+        """
+        iter_extracted for the event loop: extraction runs on the pool's
+        threads and each finished PDF is handed over without blocking.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        stop = threading.Event()
+
+        def hand_over(item) -> None:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # the loop is gone (consumer abandoned the upload)
+                stop.set()
+
+        def produce() -> None:
+            try:
+                for item in self.iter_extracted(path, filename, members):
+                    if stop.is_set():
+                        return
+                    hand_over(item)
+                hand_over(done)
+            except Exception as e:
+                hand_over(e)
+
+        threading.Thread(target=produce, name="pdf-ingest", daemon=True).start()
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # an abandoned run stops after the PDFs already in flight
+            stop.set()
@@ -0,0 +1,116 @@
+# records.py
+"""
+Internal, unvalidated record types for the per-provider hot path
+(DataValidationAgent -> QualityAssuranceAgent -> DirectoryManagementAgent
+-> LLMExplanationAgent).
+
+They have the same attribute names as the Pydantic models in models.py,
+so agent code reads either one, but building them costs one tuple /
+slotted object instead of a validated model (and, for
+DataValidationResult, a copy of the NPI record dict). The Pydantic
+models are built once, at the boundary, by to_model(): one
+pydantic-core call reading the record's attributes, which is also
+cheaper than model_construct() (pure Python) for the nested report.
+
+Batches that are only serialized (API responses, jobs, batch files)
+keep ReportRecords until then: report_json() builds the model just to
+encode it, so it is never retained.
+"""
+from typing import Dict, List, NamedTuple, Optional, Union
+
+from pydantic import TypeAdapter
+
+from models import (
+    DataValidationResult,
+    FieldWithConfidence,
+    ProviderInput,
+    ProviderOutput,
+    ProviderReport,
+)
+
+_VALIDATION_RESULT = TypeAdapter(DataValidationResult)
+_FIELD = TypeAdapter(FieldWithConfidence)
+_OUTPUT = TypeAdapter(ProviderOutput)
+_REPORT = TypeAdapter(ProviderReport)
+
+
+class ValidationRecord(NamedTuple):
+    provider_input: ProviderInput
+    npi_raw: Optional[Dict] = None
+    website_data: Optional[Dict[str, str]] = None
+    npi_lookup_status: Optional[str] = None
+    npi_candidates: Optional[List[Dict]] = None
+
+    def to_model(self) -> DataValidationResult:
+        return _VALIDATION_RESULT.validate_python(self, from_attributes=True)
+
+
+class FieldRecord(NamedTuple):
+    value: str
+    confidence: float
+    note: Optional[str] = None
+
+    def to_model(self) -> FieldWithConfidence:
+        return _FIELD.validate_python(self, from_attributes=True)
+
+
+class OutputRecord(NamedTuple):
+    name: FieldRecord
+    npi: FieldRecord
+    mobile_no: FieldRecord
+    address: FieldRecord
+    speciality: FieldRecord
+
+    def to_model(self) -> ProviderOutput:
+        return _OUTPUT.validate_python(self, from_attributes=True)
+
+
+class ReportRecord:
+    """
+    ProviderReport without validation; llm_explanation is filled in
+    after summarizing, so this one is a (slotted) mutable object.
+    """
+
+    __slots__ = (
+        "provider_input", "provider_output", "status", "reasons",
+        "priority_score", "priority_level", "llm_explanation",
+    )
+
+    def __init__(
+        self,
+        provider_input: ProviderInput,
+        provider_output: OutputRecord,
+        status: str,
+        reasons: List[str],
+        priority_score: float,
+        priority_level: str,
+        llm_explanation: Optional[str] = None,
+    ) -> None:
+        self.provider_input = provider_input
+        self.provider_output = provider_output
+        self.status = status
+        self.reasons = reasons
+        self.priority_score = priority_score
+        self.priority_level = priority_level
+        self.llm_explanation = llm_explanation
+
+    def to_model(self) -> ProviderReport:
+        return _REPORT.validate_python(self, from_attributes=True)
+
+
+# What the orchestrator yields with as_records=True: a ReportRecord, or a
+# ProviderReport reused by an incremental run
+AnyReport = Union[ProviderReport, ReportRecord]
+
+
+def as_report_model(report: AnyReport) -> ProviderReport:
+    if isinstance(report, ProviderReport):
+        return report
+    return report.to_model()
+
+
+def report_json(report: AnyReport) -> str:
+    """
+    report.model_dump_json() for either kind of report.
+    """
+    return as_report_model(report).model_dump_json()
@@ -0,0 +1,171 @@
+# request_coalescer.py
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+# Finished results kept per coalescer for repeats later in the batch
+# (least recently used dropped first). Errors are never kept: only
+# callers waiting on the failed call see them.
+MAX_RESULTS = int(os.getenv("FLOW1_COALESCER_MAX_RESULTS", "2048"))
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Any = None
+
+
+class _CoalescerStats:
+    def __init__(self, max_results: int = MAX_RESULTS) -> None:
+        self._requests: Dict[str, int] = {}
+        self._executed: Dict[str, int] = {}
+        self._max_results = max(0, max_results)
+        self._results: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+
+    def _recall(self, call_key: Tuple[str, str]) -> Tuple[bool, Any]:
+        if call_key not in self._results:
+            return False, None
+        self._results.move_to_end(call_key)
+        return True, self._results[call_key]
+
+    def _keep(self, call_key: Tuple[str, str], result: Any) -> None:
+        if self._max_results == 0:
+            return
+        self._results[call_key] = result
+        self._results.move_to_end(call_key)
+        while len(self._results) > self._max_results:
+            self._results.popitem(last=False)
+
+    def _count_request(self, namespace: str, executed: bool) -> None:
+        self._requests[namespace] = self._requests.get(namespace, 0) + 1
+        if executed:
+            self._executed[namespace] = self._executed.get(namespace, 0) + 1
+
+    def _stats(self) -> Dict[str, Dict[str, int]]:
+        report: Dict[str, Dict[str, int]] = {}
+        for namespace, requests in self._requests.items():
+            calls = self._executed.get(namespace, 0)
+            report[namespace] = {
+                "requests": requests,
+                "calls": calls,
+                "saved": requests - calls,
+            }
+        return report
+
+
+class RequestCoalescer(_CoalescerStats):
+    """
+    Batch-scoped "single-flight" de-duplication of external calls.
+
+    - The first task asking for (namespace, key) performs the call.
+    - Tasks asking for the same key while it is in flight wait for it.
+    - Tasks asking later in the same batch get the stored result, while
+      it is among the last `max_results` ones; a failed call is not
+      stored, so the next request tries again.
+
+    Create one per batch so results never outlive the batch
+    (long-term reuse is the job of the NPI cache).
+    """
+
+    def __init__(self, max_results: int = MAX_RESULTS) -> None:
+        super().__init__(max_results)
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, str], _Call] = {}   # in flight only
+
+    def do(self, namespace: str, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Return fn() for this key, running fn once for all concurrent
+        and (while its result is kept) later requests. Exceptions raised
+        by fn are re-raised to every task waiting on that call.
+        """
+        call_key = (namespace, key)
+
+        with self._lock:
+            hit, result = self._recall(call_key)
+            if hit:
+                self._count_request(namespace, executed=False)
+                return result
+            call = self._calls.get(call_key)
+            owner = call is None
+            if owner:
+                call = _Call()
+                self._calls[call_key] = call
+            self._count_request(namespace, executed=owner)
+
+        if owner:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[call_key]
+                    if call.error is None:
+                        self._keep(call_key, call.result)
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Per-namespace counters:
+        - requests: lookups asked for by rows
+        - calls: external calls actually made
+        - saved: requests answered without a new call
+        """
+        with self._lock:
+            return self._stats()
+
+
+class AsyncRequestCoalescer(_CoalescerStats):
+    """
+    asyncio flavour of RequestCoalescer for Flow1Orchestrator.arun_batch.
+    All callers must share one event loop.
+    """
+
+    def __init__(self, max_results: int = MAX_RESULTS) -> None:
+        super().__init__(max_results)
+        self._tasks: Dict[Tuple[str, str], "asyncio.Task"] = {}   # in flight only
+
+    async def do(
+        self, namespace: str, key: str, fn: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Await fn() for this key, running it once for all concurrent and
+        (while its result is kept) later requests.
+        """
+        call_key = (namespace, key)
+        hit, result = self._recall(call_key)
+        if hit:
+            self._count_request(namespace, executed=False)
+            return result
+        task = self._tasks.get(call_key)
+        owner = task is None
+        if owner:
+            task = asyncio.ensure_future(fn())
+            self._tasks[call_key] = task
+            task.add_done_callback(lambda t: self._finished(call_key, t))
+        self._count_request(namespace, executed=owner)
+
+        # shield: one cancelled row must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _finished(self, call_key: Tuple[str, str], task: "asyncio.Task") -> None:
+        del self._tasks[call_key]
+        if not task.cancelled() and task.exception() is None:
+            self._keep(call_key, task.result())
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Same counters as RequestCoalescer.stats().
+        """
+        return self._stats()
@@ -0,0 +1,871 @@
+# resilience.py
+"""
+Backpressure and retries for external services (NPI Registry first).
+
+- AdaptiveLimiter: AIMD concurrency limit shared by threads and the event
+  loop. The limit grows while calls are fast and healthy and is cut on
+  429 / 5xx / timeouts / slow answers.
+- RetryPolicy: jittered exponential backoff bounded by a total deadline.
+  Retry-After delays the retried request; a 503 with Retry-After (the
+  service is down for everyone) also pauses the whole limiter.
+- CircuitBreaker: after repeated transient failures, stop calling the
+  backend for a while (calls fail fast with SourceUnavailable), then let
+  one probe through to see whether it has recovered.
+- Hedge: when a call is slower than the backend's recent p95, send a
+  second attempt and keep whichever answers first (within a budget).
+- call_with_retries / acall_with_retries: run one call under the
+  limiter, retry policy and (optionally) a circuit breaker.
+- SourceUnavailable: raised when a transient failure outlives its
+  retries (or the circuit is open), so callers can tell "the registry
+  is down" from "not found".
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from metrics import CIRCUIT_EVENTS, CIRCUITS_OPEN, CONCURRENCY_LIMIT, HEDGED_CALLS, RETRIES
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: throttling and server-side trouble
+TRANSIENT_STATUSES = frozenset((408, 425, 429, 500, 502, 503, 504))
+
+# Exception class names (requests / httpx) for dropped or stalled connections
+_TRANSIENT_ERROR_NAMES = ("Timeout", "Connect", "RemoteProtocol", "ReadError", "ChunkedEncoding")
+
+
+class SourceUnavailable(Exception):
+    """
+    An external source could not answer (throttled, down, timing out)
+    within the retry deadline. Not the same as "no such record".
+    """
+
+
+# ---------- error classification ----------
+
+def _status_of(error: BaseException) -> Optional[int]:
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        # google-api-core / urllib errors carry the HTTP status as `.code`
+        code = getattr(error, "code", None)
+        if isinstance(code, int):
+            return code
+    return status
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    True for failures a retry may fix: timeouts, connection errors and
+    TRANSIENT_STATUSES (requests or httpx exceptions).
+    """
+    status = _status_of(error)
+    if status is not None:
+        return status in TRANSIENT_STATUSES
+    name = type(error).__name__
+    return (
+        any(part in name for part in _TRANSIENT_ERROR_NAMES)
+        or isinstance(error, (ConnectionError, TimeoutError))
+    )
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    The Retry-After header of a failed response (delta-seconds or
+    HTTP-date), or None.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    value = headers.get("Retry-After") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _reason(error: BaseException) -> str:
+    status = _status_of(error)
+    if status is not None:
+        return str(status)
+    return "timeout" if "Timeout" in type(error).__name__ else "connection"
+
+
+# ---------- adaptive limiter ----------
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one backend.
+
+    - Every healthy call (faster than `latency_target`) adds 1/limit, so
+      the limit grows by about one per round of `limit` calls.
+    - An overload signal (throttling, 5xx, timeout, slow call) multiplies
+      the limit by `backoff`, at most once per `cooldown` seconds so one
+      burst of failures does not collapse it to the minimum.
+    - pause(seconds) holds back new calls (503 + Retry-After).
+
+    Use `with limiter.slot():` from threads and
+    `async with limiter.aslot():` on an event loop; both share one count.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = 8,
+        minimum: int = 1,
+        maximum: int = 100,
+        latency_target: float = 2.0,
+        backoff: float = 0.5,
+        cooldown: float = 1.0,
+    ) -> None:
+        self.name = name
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._limit = float(min(max(initial, self.minimum), self.maximum))
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._stats: Dict[str, int] = {"calls": 0, "increases": 0, "decreases": 0, "pauses": 0}
+        self._gauge = CONCURRENCY_LIMIT.labels(name)
+        self._gauge.set(int(self._limit))
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    # ---------- acquire / release ----------
+
+    def _wait_needed(self) -> Optional[float]:
+        """
+        None when a call may start now, else seconds to wait (0 = until
+        a slot is released). Caller holds the lock.
+        """
+        paused = self._paused_until - time.monotonic()
+        if paused > 0:
+            return paused
+        if self._in_flight < int(self._limit):
+            return None
+        return 0.0
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait = self._wait_needed()
+                if wait is None:
+                    break
+                self._cond.wait(timeout=wait or None)
+            self._in_flight += 1
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                wait = self._wait_needed()
+                if wait is None:
+                    self._in_flight += 1
+                    return
+                waiter = None
+                if not wait:
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+            if waiter is None:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # our wake-up may have been meant to start a call: pass it on
+                self._wake()
+                raise
+
+    def try_acquire(self) -> bool:
+        """
+        Take a slot only if one is free right now (no waiting).
+        """
+        with self._lock:
+            if self._wait_needed() is not None:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        with self._lock:
+            self._cond.notify_all()
+            free = int(self._limit) - self._in_flight
+            while free > 0 and self._async_waiters:
+                loop, waiter = self._async_waiters.popleft()
+                if waiter.cancelled():
+                    continue
+                loop.call_soon_threadsafe(_resolve, waiter)
+                free -= 1
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        await self.aacquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    # ---------- feedback ----------
+
+    def record(self, latency: float, overloaded: bool) -> None:
+        """
+        Feed back one finished call. `overloaded`: the backend throttled,
+        failed or timed out (slow calls count as overloaded too).
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._stats["calls"] += 1
+            if overloaded or latency > self.latency_target:
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self._limit = max(float(self.minimum), self._limit * self.backoff)
+                    self._stats["decreases"] += 1
+            elif self._limit < self.maximum:
+                before = int(self._limit)
+                self._limit = min(float(self.maximum), self._limit + 1.0 / self._limit)
+                if int(self._limit) > before:
+                    self._stats["increases"] += 1
+            limit = int(self._limit)
+        self._gauge.set(limit)
+        self._wake()
+
+    def pause(self, seconds: float) -> None:
+        """
+        Start no new calls for `seconds` (e.g. the server's Retry-After).
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._stats["pauses"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+                **self._stats,
+            }
+
+
+def _resolve(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+# ---------- circuit breaker ----------
+
+class CircuitBreaker:
+    """
+    Fail fast while a backend is down.
+
+    - closed: calls go through; `failure_threshold` transient failures in
+      a row open the circuit.
+    - open: calls are rejected (allow() is False / before_call() raises
+      SourceUnavailable) for `open_seconds`.
+    - half_open: up to `probes` calls go through; a success closes the
+      circuit, a failure re-opens it for twice as long (up to
+      `max_open_seconds`).
+
+    Every allowed call must end in record_success(), record_failure()
+    or record_cancelled(). Non-transient errors (404, bad request) count
+    as successes: the backend answered.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        backend: Optional[str] = None,
+        failure_threshold: int = 5,
+        open_seconds: float = 30.0,
+        max_open_seconds: float = 300.0,
+        probes: int = 1,
+    ) -> None:
+        self.name = name
+        self.backend = backend or name
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max(open_seconds, max_open_seconds)
+        self.probes = max(1, probes)
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        self._current_open_seconds = open_seconds
+        self._probes_in_flight = 0
+        self._stats: Dict[str, int] = {"opened": 0, "closed": 0, "rejected": 0, "probes": 0}
+        self._open_gauge = CIRCUITS_OPEN.labels(self.backend)
+        self._events = {
+            event: CIRCUIT_EVENTS.labels(self.backend, event)
+            for event in ("opened", "closed", "rejected", "probe")
+        }
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        May a call start now? (Counts as a probe in half-open state.)
+        """
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() < self._open_until:
+                    return self._reject()
+                self._state = self.HALF_OPEN
+                self._probes_in_flight = 0
+            if self._state == self.HALF_OPEN:
+                if self._probes_in_flight >= self.probes:
+                    return self._reject()
+                self._probes_in_flight += 1
+                self._stats["probes"] += 1
+                self._events["probe"].inc()
+            return True
+
+    def _reject(self) -> bool:
+        self._stats["rejected"] += 1
+        self._events["rejected"].inc()
+        return False
+
+    def before_call(self) -> None:
+        """
+        allow(), raising SourceUnavailable when the circuit is open.
+        """
+        if not self.allow():
+            raise SourceUnavailable(f"{self.name} circuit open; failing fast")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self._state == self.CLOSED:
+                return
+            self._state = self.CLOSED
+            self._current_open_seconds = self.open_seconds
+            self._stats["closed"] += 1
+        self._events["closed"].inc()
+        self._open_gauge.dec()
+        print(f"[CIRCUIT] {self.name} closed: backend answering again")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                self._current_open_seconds = min(self.max_open_seconds, self._current_open_seconds * 2)
+                self._open_until = time.monotonic() + self._current_open_seconds
+                self._state = self.OPEN
+                return
+            if self._state != self.CLOSED or self._failures < self.failure_threshold:
+                return
+            self._state = self.OPEN
+            self._open_until = time.monotonic() + self._current_open_seconds
+            self._stats["opened"] += 1
+            failures = self._failures
+        self._events["opened"].inc()
+        self._open_gauge.inc()
+        print(
+            f"[CIRCUIT] {self.name} open after {failures} failures in a row; "
+            f"failing fast for {self._current_open_seconds:.0f}s"
+        )
+
+    def record_cancelled(self) -> None:
+        """
+        An allowed call ended without an answer either way.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record(self, error: Optional[BaseException]) -> None:
+        """
+        record_success / record_failure for a call that raised `error` (or None).
+        """
+        if error is not None and is_transient(error):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "open_for": round(max(0.0, self._open_until - time.monotonic()), 3)
+                if self._state == self.OPEN else 0.0,
+                **self._stats,
+            }
+
+
+# ---------- hedged requests ----------
+
+class Hedge:
+    """
+    Hedged calls for one backend: if an attempt has not answered after
+    `quantile` of the backend's recent latencies (p95 by default), a
+    second identical attempt is sent and the first answer wins.
+
+    - The delay comes from the last `window` successful calls
+      (`initial_delay` until `min_samples` are seen), clamped to
+      [min_delay, max_delay].
+    - Hedges are budgeted (token bucket): about `budget` extra calls per
+      call, with bursts of up to `burst`, so a slow backend does not get
+      twice the load.
+    - With `limiter`, a hedge takes its own slot (the primary runs in the
+      caller's) and is only sent when one is free right now.
+    - The delay counts from when the primary attempt starts running.
+    - call() runs attempts on a private thread pool (the losing attempt
+      finishes in the background, and the hedge's slot is held until
+      both attempts are done); acall() cancels the loser.
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        quantile: float = 0.95,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.05,
+        max_delay: float = 5.0,
+        window: int = 512,
+        min_samples: int = 20,
+        budget: float = 0.1,
+        burst: float = 10.0,
+        max_workers: int = 128,
+        enabled: bool = True,
+        limiter: Optional[AdaptiveLimiter] = None,
+    ) -> None:
+        self.backend = backend
+        self.quantile = quantile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max(min_delay, max_delay)
+        self.min_samples = max(1, min_samples)
+        self.budget = budget
+        self.burst = max(1.0, burst)
+        self.max_workers = max_workers
+        self.enabled = enabled
+        self.limiter = limiter
+
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=max(self.min_samples, window))
+        self._delay = initial_delay
+        self._since_update = 0
+        self._tokens = self.burst
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._stats: Dict[str, int] = {
+            "calls": 0, "hedged": 0, "hedge_wins": 0, "denied": 0, "no_slot": 0,
+        }
+        self._sent = HEDGED_CALLS.labels(backend, "sent")
+        self._won = HEDGED_CALLS.labels(backend, "won")
+        self._denied = HEDGED_CALLS.labels(backend, "denied")
+        self._no_slot = HEDGED_CALLS.labels(backend, "no_slot")
+
+    # ---------- delay / budget ----------
+
+    def delay(self) -> float:
+        return self._delay
+
+    def _observe(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            self._since_update += 1
+            # re-sorting the window on every call is wasted work
+            if len(self._latencies) < self.min_samples or self._since_update < 16:
+                return
+            self._since_update = 0
+            ordered = sorted(self._latencies)
+            value = ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+            self._delay = min(self.max_delay, max(self.min_delay, value))
+
+    def _start_call(self) -> None:
+        with self._lock:
+            self._stats["calls"] += 1
+            self._tokens = min(self.burst, self._tokens + self.budget)
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self._stats["hedged"] += 1
+                sent = True
+            else:
+                self._stats["denied"] += 1
+                sent = False
+        (self._sent if sent else self._denied).inc()
+        return sent
+
+    def _reserve_hedge(self) -> bool:
+        """
+        A limiter slot (when there is a limiter) and a budget token for
+        one hedge, or False with nothing taken.
+        """
+        if self.limiter is not None and not self.limiter.try_acquire():
+            with self._lock:
+                self._stats["no_slot"] += 1
+            self._no_slot.inc()
+            return False
+        if not self._take_token():
+            if self.limiter is not None:
+                self.limiter.release()
+            return False
+        return True
+
+    def _hedge_won(self) -> None:
+        with self._lock:
+            self._stats["hedge_wins"] += 1
+        self._won.inc()
+
+    # ---------- threads ----------
+
+    def _timed(self, fn: Callable[[], T], running: Optional[threading.Event] = None) -> T:
+        if running is not None:
+            running.set()
+        started = time.monotonic()
+        result = fn()
+        self._observe(time.monotonic() - started)
+        return result
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=f"hedge-{self.backend}"
+                    )
+        return self._pool
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """
+        fn(), hedged. Errors are raised only if every attempt failed
+        (the first error wins).
+        """
+        if not self.enabled:
+            return fn()
+        self._start_call()
+        pool = self._executor()
+        running = threading.Event()
+        primary = pool.submit(self._timed, fn, running)
+        # time spent queued for a pool thread is not backend latency
+        running.wait()
+        done, _ = wait([primary], timeout=self.delay())
+        if done or not self._reserve_hedge():
+            return primary.result()
+
+        hedge = pool.submit(self._timed, fn)
+        if self.limiter is not None:
+            _release_when_all_done([primary, hedge], self.limiter)
+        return _first_answer([primary, hedge], hedge, self._hedge_won)
+
+    # ---------- asyncio ----------
+
+    async def _atimed(
+        self, fn: Callable[[], Awaitable[T]], running: Optional[asyncio.Event] = None
+    ) -> T:
+        if running is not None:
+            running.set()
+        started = time.monotonic()
+        result = await fn()
+        self._observe(time.monotonic() - started)
+        return result
+
+    async def acall(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Async version of call(); `fn` returns a new awaitable per attempt
+        and the losing attempt is cancelled.
+        """
+        if not self.enabled:
+            return await fn()
+        self._start_call()
+        running = asyncio.Event()
+        tasks = [asyncio.ensure_future(self._atimed(fn, running))]
+        try:
+            await running.wait()
+            done, _ = await asyncio.wait(tasks, timeout=self.delay())
+            if done or not self._reserve_hedge():
+                return await tasks[0]
+
+            hedge = asyncio.ensure_future(self._atimed(fn))
+            if self.limiter is not None:
+                # also runs for a hedge cancelled before it started
+                hedge.add_done_callback(lambda _: self.limiter.release())
+            tasks.append(hedge)
+            pending = set(tasks)
+            first_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in tasks:
+                    if task not in done:
+                        continue
+                    error = task.exception()
+                    if error is None:
+                        if task is tasks[1]:
+                            self._hedge_won()
+                        return task.result()
+                    first_error = first_error or error
+            raise first_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "delay_seconds": round(self._delay, 4),
+                "samples": len(self._latencies),
+                "budget_tokens": round(self._tokens, 2),
+                **self._stats,
+            }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+def _release_when_all_done(futures: List[Future], limiter: AdaptiveLimiter) -> None:
+    # the loser keeps calling the backend after the winner has answered
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            limiter.release()
+
+    for future in futures:
+        future.add_done_callback(done)
+
+
+def _first_answer(futures: List[Future], hedge: Future, on_hedge_won: Callable[[], None]):
+    pending = set(futures)
+    first_error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in futures:
+            if future not in done:
+                continue
+            error = future.exception()
+            if error is None:
+                if future is hedge:
+                    on_hedge_won()
+                return future.result()
+            first_error = first_error or error
+    raise first_error
+
+
+# ---------- retries ----------
+
+class RetryPolicy:
+    """
+    Up to `attempts` tries with full-jitter exponential backoff
+    (random delay in [0, base * 2^n], capped at `max_delay`), all within
+    `deadline` seconds of the first try. A server's Retry-After is used
+    instead of the backoff when it is longer.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 4,
+        base_delay: float = 0.25,
+        max_delay: float = 8.0,
+        deadline: float = 20.0,
+    ) -> None:
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            return max(backoff, retry_after)
+        return backoff
+
+
+def _after_failure(
+    error: Exception,
+    attempt: int,
+    started: float,
+    policy: RetryPolicy,
+    limiter: Optional[AdaptiveLimiter],
+    backend: str,
+) -> float:
+    """
+    Delay before the next try; raises when `error` is final.
+    """
+    if not is_transient(error):
+        raise error
+    retry_after = retry_after_seconds(error)
+    if retry_after is not None and limiter is not None and _status_of(error) == 503:
+        limiter.pause(retry_after)
+
+    delay = policy.delay(attempt, retry_after)
+    out_of_time = time.monotonic() + delay - started > policy.deadline
+    if attempt + 1 >= policy.attempts or out_of_time:
+        raise SourceUnavailable(
+            f"{backend} unavailable after {attempt + 1} attempt(s): {error}"
+        ) from error
+    RETRIES.labels(backend, _reason(error)).inc()
+    return delay
+
+
+def call_with_retries(
+    fn: Callable[[], T],
+    backend: str,
+    policy: RetryPolicy,
+    limiter: Optional[AdaptiveLimiter] = None,
+    breaker: Optional[CircuitBreaker] = None,
+) -> T:
+    """
+    fn() under `limiter`, retried on transient errors per `policy`.
+    Non-transient errors are raised as-is; transient ones that outlive
+    the policy become SourceUnavailable. With `breaker`, every try is
+    reported to it and an open circuit raises SourceUnavailable at once.
+    """
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        if breaker is not None:
+            breaker.before_call()
+        if limiter is not None:
+            limiter.acquire()
+        call_started = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            if limiter is not None:
+                limiter.release()
+                limiter.record(time.monotonic() - call_started, overloaded=is_transient(e))
+            if breaker is not None:
+                breaker.record(e)
+            delay = _after_failure(e, attempt, started, policy, limiter, backend)
+        else:
+            if limiter is not None:
+                limiter.release()
+                limiter.record(time.monotonic() - call_started, overloaded=False)
+            if breaker is not None:
+                breaker.record_success()
+            return result
+        time.sleep(delay)
+        attempt += 1
+
+
+async def acall_with_retries(
+    fn: Callable[[], Awaitable[T]],
+    backend: str,
+    policy: RetryPolicy,
+    limiter: Optional[AdaptiveLimiter] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    slot: Optional[asyncio.Semaphore] = None,
+) -> T:
+    """
+    Async version of call_with_retries (`fn` returns a new awaitable per try).
+
+    `slot` is the caller's own cap (e.g. a batch's per-backend semaphore):
+    it is held for each try and released during the backoff sleeps, so
+    rows that are waiting to retry don't block rows that could run.
+    """
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            return await _aattempt(fn, slot, limiter, breaker)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            delay = _after_failure(e, attempt, started, policy, limiter, backend)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def _aattempt(
+    fn: Callable[[], Awaitable[T]],
+    slot: Optional[asyncio.Semaphore],
+    limiter: Optional[AdaptiveLimiter],
+    breaker: Optional[CircuitBreaker],
+) -> T:
+    """
+    One try of acall_with_retries, reported to `limiter` and `breaker`.
+    """
+    try:
+        if slot is not None:
+            await slot.acquire()
+    except asyncio.CancelledError:
+        if breaker is not None:
+            breaker.record_cancelled()
+        raise
+    try:
+        if limiter is not None:
+            try:
+                await limiter.aacquire()
+            except asyncio.CancelledError:
+                if breaker is not None:
+                    breaker.record_cancelled()
+                raise
+        call_started = time.monotonic()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            if limiter is not None:
+                limiter.release()
+            if breaker is not None:
+                breaker.record_cancelled()
+            raise
+        except Exception as e:
+            if limiter is not None:
+                limiter.release()
+                limiter.record(time.monotonic() - call_started, overloaded=is_transient(e))
+            if breaker is not None:
+                breaker.record(e)
+            raise
+        if limiter is not None:
+            limiter.release()
+            limiter.record(time.monotonic() - call_started, overloaded=False)
+        if breaker is not None:
+            breaker.record_success()
+        return result
+    finally:
+        if slot is not None:
+            slot.release()
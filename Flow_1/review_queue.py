@@ -0,0 +1,341 @@
+# review_queue.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from records import AnyReport, report_json
+
+# Report statuses that put a row in the queue. needs_review rows wait for a
+# reviewer; source_unavailable rows (priority 0) wait for a re-run.
+QUEUED_STATUSES = ("needs_review", "source_unavailable")
+
+STATES = ("open", "claimed", "resolved")
+
+# How long a claimed item stays with its reviewer before it is handed out again
+DEFAULT_LEASE_SECONDS = float(os.getenv("FLOW1_REVIEW_LEASE_SECONDS", "900"))
+
+_COLUMNS = (
+    "id, npi, name, status, priority_score, priority_level, member_impact, "
+    "state, claimed_by, claim_expires_at, source, updated_at, report_json"
+)
+
+
+def item_key(report: AnyReport) -> str:
+    """
+    Queue identity of a report: its NPI plus the exact input row, so a
+    re-run of the same row updates its item instead of adding another.
+    """
+    row = report.provider_input
+    digest = hashlib.blake2b(row.model_dump_json().encode("utf-8"), digest_size=16).hexdigest()
+    return f"{row.npi}:{digest}"
+
+
+def _encode_cursor(score: float, item_id: int) -> str:
+    return f"{score!r}:{item_id}"
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    score, _, item_id = cursor.rpartition(":")
+    return float(score), int(item_id)
+
+
+class ReviewQueue:
+    """
+    Persistent manual-review queue (SQLite), ordered by priority_score.
+
+    - add_reports() upserts finished reports as batches arrive; nothing is
+      re-sorted, the (state, ..., priority_score) indexes keep the order.
+    - top() / page() read the open items with optional filters on
+      priority_level, status and member_impact (keyset paging: cursors
+      stay valid while items are added or claimed).
+    - claim_next() hands the highest-priority open item to one reviewer
+      for a lease; expired leases go back to "open".
+    """
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS review_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item_key TEXT NOT NULL UNIQUE,
+                npi TEXT NOT NULL,
+                name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                priority_score REAL NOT NULL,
+                priority_level TEXT NOT NULL,
+                member_impact INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'open',
+                claimed_by TEXT,
+                claim_expires_at REAL,
+                source TEXT,
+                report_json TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS review_by_priority
+                ON review_items (state, priority_score DESC, id);
+            CREATE INDEX IF NOT EXISTS review_by_level
+                ON review_items (state, priority_level, priority_score DESC, id);
+            CREATE INDEX IF NOT EXISTS review_by_status
+                ON review_items (state, status, priority_score DESC, id);
+            CREATE INDEX IF NOT EXISTS review_by_impact
+                ON review_items (state, member_impact, priority_score DESC, id);
+            """
+        )
+        self._conn.commit()
+
+    # ---------- writes ----------
+
+    def add_reports(self, reports: Iterable[AnyReport], source: Optional[str] = None) -> int:
+        """
+        Upsert a batch of finished reports. Rows in QUEUED_STATUSES are
+        (re)opened with their new score (claimed items stay claimed, and
+        resolved items stay resolved unless their report changed); an
+        open item whose row now validates cleanly is resolved.
+        Returns the number of queued rows.
+        """
+        now = time.time()
+        queued = []
+        cleared = []
+        for report in reports:
+            key = item_key(report)
+            if report.status in QUEUED_STATUSES:
+                queued.append((
+                    key,
+                    report.provider_input.npi,
+                    report.provider_input.name,
+                    report.status,
+                    report.priority_score,
+                    report.priority_level,
+                    report.provider_input.member_impact,
+                    source,
+                    report_json(report),
+                    now,
+                    now,
+                ))
+            else:
+                cleared.append((now, key))
+        if not queued and not cleared:
+            return 0
+
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO review_items (
+                    item_key, npi, name, status, priority_score, priority_level,
+                    member_impact, source, report_json, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(item_key) DO UPDATE SET
+                    status = excluded.status,
+                    priority_score = excluded.priority_score,
+                    priority_level = excluded.priority_level,
+                    source = COALESCE(excluded.source, review_items.source),
+                    report_json = excluded.report_json,
+                    updated_at = excluded.updated_at,
+                    state = CASE
+                        WHEN review_items.state = 'claimed' THEN 'claimed'
+                        -- a re-run of an unchanged row keeps the reviewer's resolution
+                        WHEN review_items.state = 'resolved'
+                            AND review_items.report_json = excluded.report_json THEN 'resolved'
+                        ELSE 'open'
+                    END
+                """,
+                queued,
+            )
+            self._conn.executemany(
+                "UPDATE review_items SET state = 'resolved', claimed_by = NULL, "
+                "claim_expires_at = NULL, updated_at = ? "
+                "WHERE item_key = ? AND state = 'open'",
+                cleared,
+            )
+            self._conn.commit()
+        return len(queued)
+
+    def claim_next(
+        self,
+        reviewer: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        priority_level: Optional[str] = None,
+        status: Optional[str] = None,
+        min_member_impact: Optional[int] = None,
+    ) -> Optional[Dict]:
+        """
+        Claim the highest-priority open item matching the filters for
+        `reviewer`, or None when nothing is left.
+        """
+        now = time.time()
+        where, params = self._filters("open", priority_level, status, min_member_impact)
+        with self._lock:
+            self._expire_claims(now)
+            row = self._conn.execute(
+                f"""
+                UPDATE review_items
+                SET state = 'claimed', claimed_by = ?, claim_expires_at = ?, updated_at = ?
+                WHERE id = (
+                    SELECT id FROM review_items WHERE {where}
+                    ORDER BY priority_score DESC, id LIMIT 1
+                )
+                RETURNING {_COLUMNS}
+                """,
+                [reviewer, now + lease_seconds, now, *params],
+            ).fetchone()
+            self._conn.commit()
+        return self._item(row) if row is not None else None
+
+    def resolve(self, item_id: int, reviewer: Optional[str] = None) -> bool:
+        """
+        Mark an item reviewed. With `reviewer`, only that reviewer's claim
+        can be resolved.
+        """
+        return self._finish(item_id, "resolved", reviewer)
+
+    def release(self, item_id: int, reviewer: Optional[str] = None) -> bool:
+        """
+        Give a claimed item back to the queue unreviewed.
+        """
+        return self._finish(item_id, "open", reviewer)
+
+    def _finish(self, item_id: int, state: str, reviewer: Optional[str]) -> bool:
+        sql = (
+            "UPDATE review_items SET state = ?, claimed_by = NULL, claim_expires_at = NULL, "
+            "updated_at = ? WHERE id = ? AND state != 'resolved'"
+        )
+        params: List = [state, time.time(), item_id]
+        if reviewer is not None:
+            sql += " AND claimed_by = ?"
+            params.append(reviewer)
+        with self._lock:
+            changed = self._conn.execute(sql, params).rowcount
+            self._conn.commit()
+        return changed > 0
+
+    def _expire_claims(self, now: float) -> None:
+        # caller holds the lock
+        self._conn.execute(
+            "UPDATE review_items SET state = 'open', claimed_by = NULL, claim_expires_at = NULL "
+            "WHERE state = 'claimed' AND claim_expires_at < ?",
+            (now,),
+        )
+
+    # ---------- reads ----------
+
+    def _filters(
+        self,
+        state: str,
+        priority_level: Optional[str],
+        status: Optional[str],
+        min_member_impact: Optional[int],
+    ) -> Tuple[str, List]:
+        clauses = ["state = ?"]
+        params: List = [state]
+        if priority_level:
+            clauses.append("priority_level = ?")
+            params.append(priority_level.upper())
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if min_member_impact is not None:
+            clauses.append("member_impact >= ?")
+            params.append(min_member_impact)
+        return " AND ".join(clauses), params
+
+    def page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        state: str = "open",
+        priority_level: Optional[str] = None,
+        status: Optional[str] = None,
+        min_member_impact: Optional[int] = None,
+    ) -> Dict:
+        """
+        One page of items by priority (highest first) plus `next_cursor`
+        (None on the last page).
+        """
+        where, params = self._filters(state, priority_level, status, min_member_impact)
+        if cursor:
+            score, last_id = _decode_cursor(cursor)
+            where += " AND (priority_score < ? OR (priority_score = ? AND id > ?))"
+            params += [score, score, last_id]
+        with self._lock:
+            if state == "open":
+                self._expire_claims(time.time())
+                # don't leave a read holding the database's write lock
+                self._conn.commit()
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM review_items WHERE {where} "
+                "ORDER BY priority_score DESC, id LIMIT ?",
+                [*params, limit + 1],
+            ).fetchall()
+        items = [self._item(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = _encode_cursor(last["priority_score"], last["id"])
+        return {"items": items, "next_cursor": next_cursor}
+
+    def top(self, k: int = 10, **filters) -> List[Dict]:
+        """
+        The k highest-priority open items (same filters as page()).
+        """
+        return self.page(limit=k, **filters)["items"]
+
+    def get(self, item_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM review_items WHERE id = ?", (item_id,)
+            ).fetchone()
+        return self._item(row) if row is not None else None
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Item counts by state, and open items by priority level.
+        """
+        with self._lock:
+            by_state = self._conn.execute(
+                "SELECT state, COUNT(*) FROM review_items GROUP BY state"
+            ).fetchall()
+            by_level = self._conn.execute(
+                "SELECT priority_level, COUNT(*) FROM review_items "
+                "WHERE state = 'open' GROUP BY priority_level"
+            ).fetchall()
+        return {
+            "by_state": {state: 0 for state in STATES} | dict(by_state),
+            "open_by_priority_level": dict(by_level),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM review_items")
+            self._conn.commit()
+
+    @staticmethod
+    def _item(row: Tuple) -> Dict:
+        (item_id, npi, name, status, score, level, impact,
+         state, claimed_by, claim_expires_at, source, updated_at, report_json) = row
+        return {
+            "id": item_id,
+            "npi": npi,
+            "name": name,
+            "status": status,
+            "priority_score": score,
+            "priority_level": level,
+            "member_impact": impact,
+            "state": state,
+            "claimed_by": claimed_by,
+            "claim_expires_at": claim_expires_at,
+            "source": source,
+            "updated_at": updated_at,
+            "report": json.loads(report_json),
+        }
@@ -0,0 +1,162 @@
+# serialization.py
+"""
+Response encoding for the batch endpoints.
+
+- Every report is encoded once (pydantic-core, straight to bytes); the
+  review queue re-uses those bytes, or with `compact` lists only indices
+  into `reports` instead of repeating each needs-review report.
+- omit_unchanged drops an output field's `value` when it equals the
+  input's value (the client already has it) and leaves out null notes.
+- FastJSONResponse: orjson when installed, json otherwise.
+- Bodies are gzip / zstd compressed when the client accepts it.
+"""
+import gzip
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+from models import ProviderReport
+from records import AnyReport, as_report_model
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FIELDS = ("name", "npi", "mobile_no", "address", "speciality")
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv("FLOW1_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+_REPORT = TypeAdapter(ProviderReport)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Compact JSON bytes (orjson when available).
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with `dumps` (Pydantic models allowed).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _lean_report(report: AnyReport) -> Dict:
+    data = as_report_model(report).model_dump(exclude_none=True)
+    given = data["provider_input"]
+    output = data["provider_output"]
+    for name in FIELDS:
+        if output[name]["value"] == given[name]:
+            del output[name]["value"]
+    return data
+
+
+def encode_reports(reports: Sequence[AnyReport], omit_unchanged: bool = False) -> List[bytes]:
+    """
+    One JSON fragment per report (ReportRecords are turned into models
+    here, on the way out).
+    """
+    if omit_unchanged:
+        return [dumps(_lean_report(r)) for r in reports]
+    return [_REPORT.dump_json(as_report_model(r)) for r in reports]
+
+
+def encode_batch_body(
+    reports: Sequence[AnyReport],
+    review_indices: Sequence[int],
+    extra: Optional[Dict[str, Any]] = None,
+    compact: bool = False,
+    omit_unchanged: bool = False,
+) -> bytes:
+    """
+    {"reports": [...], "review_queue": [...], **extra} as JSON bytes.
+
+    `review_indices` are positions in `reports`, highest priority first.
+    compact=False repeats those reports in review_queue (the original
+    response shape, re-using the encoded bytes); compact=True sends
+    [{"index", "npi", "priority_score", "priority_level"}] instead.
+    """
+    fragments = encode_reports(reports, omit_unchanged)
+    if compact:
+        queue = dumps([
+            {
+                "index": i,
+                "npi": reports[i].provider_input.npi,
+                "priority_score": reports[i].priority_score,
+                "priority_level": reports[i].priority_level,
+            }
+            for i in review_indices
+        ])
+    else:
+        queue = b"[" + b",".join(fragments[i] for i in review_indices) + b"]"
+
+    parts = [b'{"reports":[', b",".join(fragments), b'],"review_queue":', queue]
+    for key, value in (extra or {}).items():
+        parts += [b",", dumps(key), b":", dumps(value)]
+    parts.append(b"}")
+    return b"".join(parts)
+
+
+def _accepted(accept_encoding: Optional[str]) -> List[str]:
+    codings = []
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        codings.append(coding.strip().lower())
+    return codings
+
+
+def compress(body: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """
+    (body, content_encoding or None): zstd when the client accepts it and
+    zstandard is installed, else gzip when accepted, else unchanged.
+    """
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    accepted = _accepted(accept_encoding)
+    if "zstd" in accepted and zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body), "zstd"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
+
+
+def json_bytes_response(body: bytes, accept_encoding: Optional[str] = None) -> Response:
+    """
+    A pre-encoded JSON body, compressed per Accept-Encoding.
+    """
+    body, encoding = compress(body, accept_encoding)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
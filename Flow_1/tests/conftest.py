@@ -0,0 +1,80 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# Flow_1 modules are imported top-level (as main.py does)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import FieldWithConfidence, ProviderInput, ProviderOutput, ProviderReport  # noqa: E402
+
+FIELDS = ("name", "npi", "mobile_no", "address", "speciality")
+
+
+def _priority_level(status: str, score: float) -> str:
+    # same bands as DirectoryManagementAgent.summarize_record
+    if status != "needs_review":
+        return "NONE"
+    return "HIGH" if score >= 7 else "MEDIUM" if score >= 4 else "LOW"
+
+
+@pytest.fixture
+def make_provider():
+    """
+    make_provider(i=0, **fields) -> roster row i (NPI 1000000000 + i),
+    with any column overridden.
+    """
+    def make(i: int = 0, **fields) -> ProviderInput:
+        row = {
+            "name": f"Provider {i}",
+            "npi": f"{1000000000 + i}",
+            "mobile_no": "512-555-0100",
+            "address": "1 Main St, Austin, TX 78701",
+            "speciality": "Cardiology",
+        }
+        row.update(fields)
+        return ProviderInput(**row)
+    return make
+
+
+@pytest.fixture
+def make_providers(make_provider):
+    """
+    make_providers(n) -> rows 0..n-1, one NPI each.
+    """
+    def make(n: int):
+        return [make_provider(i) for i in range(n)]
+    return make
+
+
+@pytest.fixture
+def make_report():
+    """
+    make_report(provider, status="confirmed", ...) -> ProviderReport whose
+    output echoes the input. needs_review reports default to a phone
+    mismatch at MEDIUM priority.
+    """
+    def make(
+        provider: ProviderInput,
+        status: str = "confirmed",
+        priority_score: float = None,
+        reasons=None,
+    ) -> ProviderReport:
+        review = status == "needs_review"
+        if priority_score is None:
+            priority_score = 5.0 if review else 0.0
+        confidence = 0.55 if review else 0.95
+        output = ProviderOutput(**{
+            name: FieldWithConfidence(value=getattr(provider, name), confidence=confidence)
+            for name in FIELDS
+        })
+        return ProviderReport(
+            provider_input=provider,
+            provider_output=output,
+            status=status,
+            reasons=list(reasons) if reasons is not None else (["phone mismatch"] if review else []),
+            priority_score=priority_score,
+            priority_level=_priority_level(status, priority_score),
+        )
+    return make
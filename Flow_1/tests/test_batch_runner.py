@@ -0,0 +1,92 @@
+# tests/test_batch_runner.py
+import csv
+import json
+
+from batch_runner import Checkpoint, run_file
+from data_loader import REQUIRED_COLUMNS as FIELDS
+
+ROWS = 20
+
+
+def _write_roster(path, providers) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for provider in providers:
+            writer.writerow([getattr(provider, name) for name in FIELDS])
+
+
+class _Crash(Exception):
+    pass
+
+
+class _PairSwappingOrchestrator:
+    """
+    iter_batch stand-in, no network: finishes rows in swapped pairs
+    (1, 0, 3, 2, ...) so some rows complete ahead of the committed offset.
+    With `crash_after`, the process "dies" after that many reports:
+    checkpoints stop being written and the run aborts.
+    """
+
+    def __init__(self, make_report, crash_after=None, on_crash=None) -> None:
+        self.make_report = make_report
+        self.crash_after = crash_after
+        self.on_crash = on_crash
+        self.seen = []
+
+    def iter_batch(self, providers, max_workers=None, on_error=None, as_records=False):
+        providers = list(providers)
+        order = []
+        for pos in range(0, len(providers), 2):
+            order += [pos + 1, pos] if pos + 1 < len(providers) else [pos]
+        for n, pos in enumerate(order):
+            if n == self.crash_after:
+                self.on_crash()
+                raise _Crash()
+            self.seen.append(providers[pos].npi)
+            yield pos, self.make_report(providers[pos])
+
+
+def _indices(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["index"] for line in f]
+
+
+def test_resume_after_crash_writes_each_row_once(tmp_path, monkeypatch, make_providers, make_report):
+    roster = tmp_path / "roster.csv"
+    out = tmp_path / "reports.jsonl"
+    _write_roster(roster, make_providers(ROWS))
+
+    # a hard crash (kill -9) after 7 reports: the last checkpoint was
+    # taken after 6, so the output holds one line the checkpoint doesn't cover
+    saving = {"on": True}
+    real_save = Checkpoint.save
+    monkeypatch.setattr(Checkpoint, "save", lambda cp: real_save(cp) if saving["on"] else None)
+    crashing = _PairSwappingOrchestrator(make_report, crash_after=7, on_crash=lambda: saving.update(on=False))
+    try:
+        run_file(str(roster), str(out), orchestrator=crashing, checkpoint_every_rows=3)
+    except _Crash:
+        pass
+    assert len(_indices(out)) == 7
+    cp = Checkpoint.load(str(out) + ".checkpoint.json")
+    assert (cp.committed_offset, cp.rows_done) == (6, 6)
+
+    saving["on"] = True
+    resumed = _PairSwappingOrchestrator(make_report)
+    cp = run_file(str(roster), str(out), orchestrator=resumed, checkpoint_every_rows=3)
+
+    assert len(resumed.seen) == ROWS - 6        # only rows past the checkpoint re-run
+    assert sorted(_indices(out)) == list(range(ROWS))
+    assert (cp.committed_offset, cp.rows_done, cp.done_above) == (ROWS, ROWS, set())
+
+
+def test_finished_run_is_not_repeated(tmp_path, make_providers, make_report):
+    roster = tmp_path / "roster.csv"
+    out = tmp_path / "reports.jsonl"
+    _write_roster(roster, make_providers(ROWS))
+    run_file(str(roster), str(out), orchestrator=_PairSwappingOrchestrator(make_report))
+
+    again = _PairSwappingOrchestrator(make_report)
+    run_file(str(roster), str(out), orchestrator=again)
+    assert again.seen == []
+    assert sorted(_indices(out)) == list(range(ROWS))
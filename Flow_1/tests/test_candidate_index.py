@@ -0,0 +1,19 @@
+# tests/test_candidate_index.py
+import pytest
+
+from candidate_index import parse_state_zip
+
+
+@pytest.mark.parametrize("address, expected", [
+    ("1 Main St, Austin, TX 78701", ("TX", "78701")),
+    ("1 Main St, Austin, TX, 78701-1234", ("TX", "78701")),
+    ("500 Elm Ave, Springfield IL", ("IL", None)),
+    ("PO Box 7, Denver, CO", ("CO", None)),
+    ("12 Elm Ct, Apt 4", (None, None)),
+    ("Calle de la Paz", (None, None)),
+    ("Suite in the mall", (None, None)),
+    ("9 Pine Ct, Portland, or 97201", (None, "97201")),
+    ("", (None, None)),
+])
+def test_parse_state_zip_takes_only_real_state_positions(address, expected):
+    assert parse_state_zip(address) == expected
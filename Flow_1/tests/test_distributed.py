@@ -0,0 +1,56 @@
+# tests/test_distributed.py
+import time
+
+from distributed import WorkQueue, process_shard
+
+
+class _RecordingOrchestrator:
+    """
+    iter_batch stand-in: reports every row it is given, no network.
+    """
+
+    def __init__(self, make_report) -> None:
+        self.make_report = make_report
+        self.seen = []
+
+    def iter_batch(self, providers, max_workers=None, on_error=None, as_records=False):
+        for pos, provider in enumerate(providers):
+            self.seen.append(provider.npi)
+            yield pos, self.make_report(provider)
+
+
+def test_expired_lease_is_taken_over(tmp_path, make_providers):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite3"))
+    run_id = queue.enqueue(make_providers(3), shards=1)
+
+    assert queue.lease("w1", lease_seconds=0.05) == (run_id, 0)
+    assert queue.lease("w2") is None            # still held by w1
+    time.sleep(0.1)
+
+    assert queue.lease("w2") == (run_id, 0)
+    assert not queue.heartbeat(run_id, 0, "w1")
+    assert not queue.complete(run_id, 0, "w1")
+    assert queue.progress(run_id)["shards_retried"] == 1
+
+
+def test_released_shard_skips_committed_rows(tmp_path, make_providers, make_report):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite3"))
+    providers = make_providers(5)
+    run_id = queue.enqueue(providers, shards=1)
+
+    # w1 commits two rows, then dies without completing the shard
+    queue.lease("w1", lease_seconds=0.05)
+    queue.commit_results(run_id, 0, "w1", [
+        (0, make_report(providers[0]).model_dump_json(), None),
+        (1, make_report(providers[1]).model_dump_json(), None),
+    ])
+    time.sleep(0.1)
+
+    assert queue.lease("w2") == (run_id, 0)
+    orchestrator = _RecordingOrchestrator(make_report)
+    stats = process_shard(queue, orchestrator, run_id, 0, "w2")
+
+    assert orchestrator.seen == [p.npi for p in providers[2:]]
+    assert stats == {"rows": 3, "failed": 0}
+    assert [idx for idx, _, _ in queue.iter_results(run_id)] == [0, 1, 2, 3, 4]
+    assert queue.open_shards() == 0
@@ -0,0 +1,79 @@
+# tests/test_document_extraction.py
+import io
+import json
+import threading
+
+from pypdf import PdfWriter
+
+from agents.document_extraction_agent import DocumentExtractionAgent
+from resilience import RetryPolicy
+
+
+class _Answer:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class _QuotaExceeded(Exception):
+    code = 429                  # as google-api-core errors carry it
+
+
+class _StubModel:
+    """
+    generate_content stand-in: answers every call with `rows`, after
+    failing the first `fail_first` calls with a 429.
+    """
+
+    def __init__(self, rows, fail_first: int = 0) -> None:
+        self.text = json.dumps(rows)
+        self.fail_first = fail_first
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, parts):
+        with self._lock:
+            self.calls += 1
+            if self.calls <= self.fail_first:
+                raise _QuotaExceeded("429 quota exceeded")
+        return _Answer(self.text)
+
+
+def _pdf(pages: int) -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def _row(provider) -> dict:
+    return {**provider.model_dump(), "member_impact": 3}
+
+
+def test_rows_differing_in_one_field_are_all_kept(make_provider):
+    office = make_provider(mobile_no="512-555-0100")
+    rows = [_row(office), _row(make_provider(mobile_no="512-555-0200")), _row(make_provider(speciality="Oncology"))]
+    agent = DocumentExtractionAgent(model=_StubModel(rows))
+
+    providers = agent.extract_providers_or_raise(_pdf(1))
+    assert [p.model_dump() for p in providers] == rows
+
+
+def test_page_ranges_are_concatenated_in_order(make_provider):
+    model = _StubModel([_row(make_provider())])
+    agent = DocumentExtractionAgent(model=model, pages_per_chunk=2)
+
+    providers = agent.extract_providers_or_raise(_pdf(5))
+    assert model.calls == 3                     # pages 1-2, 3-4, 5
+    assert len(providers) == 3
+
+
+def test_quota_errors_are_retried_per_call(make_provider):
+    model = _StubModel([_row(make_provider())], fail_first=1)
+    agent = DocumentExtractionAgent(model=model)
+
+    providers = agent.extract_providers_or_raise(
+        _pdf(1), retry_policy=RetryPolicy(attempts=3, base_delay=0.01)
+    )
+    assert model.calls == 2 and len(providers) == 1
@@ -0,0 +1,67 @@
+# tests/test_fingerprint_store.py
+from fingerprint_store import Fingerprint, FingerprintStore, IncrementalRun
+
+
+def _fingerprint(provider) -> Fingerprint:
+    return Fingerprint.of_sources(provider, {"number": provider.npi}, None)
+
+
+def _run(store: FingerprintStore, providers, make_report, full_roster: bool = False) -> IncrementalRun:
+    run = IncrementalRun(store, full_roster=full_roster)
+    for provider in providers:
+        fingerprint = _fingerprint(provider)
+        if run.reuse(provider, fingerprint) is None:
+            run.record(provider, fingerprint, make_report(provider, "needs_review"))
+    run.flush()
+    return run
+
+
+def test_full_roster_run_replaces_changed_rows_and_keeps_shared_npis(tmp_path, make_provider, make_report):
+    store = FingerprintStore(str(tmp_path / "fp.sqlite3"))
+    office = make_provider(mobile_no="512-555-0100")
+    clinic = make_provider(mobile_no="512-555-0200")    # same NPI, second location
+    other = make_provider(1)
+    _run(store, [office, clinic, other], make_report, full_roster=True)
+    assert store.count() == 3
+
+    moved = make_provider(mobile_no="512-555-0199")
+    run = _run(store, [moved, clinic, other], make_report, full_roster=True)
+    assert run.stats() == {"skipped": 2, "recomputed": 1, "total": 3}
+    assert store.count() == 3                           # office replaced by moved
+    assert store.lookup(office.npi, _fingerprint(office)) is None
+
+    reopened = FingerprintStore(str(tmp_path / "fp.sqlite3"), memory_rows=0)
+    assert reopened.lookup(office.npi, _fingerprint(office)) is None
+    assert reopened.lookup(moved.npi, _fingerprint(moved)) is not None
+    assert reopened.lookup(clinic.npi, _fingerprint(clinic)) is not None
+    assert reopened.lookup(other.npi, _fingerprint(other)) is not None
+
+
+def test_batches_sharing_an_npi_keep_each_others_reports(tmp_path, make_provider, make_report):
+    store = FingerprintStore(str(tmp_path / "fp.sqlite3"))
+    feed_a = [make_provider(address="1 Main St, Austin, TX 78701"), make_provider(1)]
+    feed_b = [make_provider(address="9 Oak Ave, Dallas, TX 75201")]   # same NPI as feed_a[0]
+    _run(store, feed_a, make_report)
+    _run(store, feed_b, make_report)
+    assert store.count() == 3
+
+    assert _run(store, feed_a, make_report).stats()["skipped"] == 2
+    assert _run(store, feed_b, make_report).stats()["skipped"] == 1
+    assert store.count() == 3
+
+
+def test_lookups_return_independent_copies(tmp_path, make_provider, make_report):
+    store = FingerprintStore(str(tmp_path / "fp.sqlite3"))
+    provider = make_provider()
+    fingerprint = _fingerprint(provider)
+    store.save_many([(provider.npi, fingerprint, make_report(provider, "needs_review"))])
+
+    first = store.lookup(provider.npi, fingerprint)
+    first.llm_explanation = "edited by a later stage"
+    first.reasons.append("extra")
+    first.provider_input.name = "Someone Else"
+
+    second = store.lookup(provider.npi, fingerprint)
+    assert second.llm_explanation is None
+    assert second.reasons == ["phone mismatch"]
+    assert second.provider_input.name == "Provider 0"
@@ -0,0 +1,52 @@
+# tests/test_hybrid_pipeline.py
+import threading
+
+from hybrid_pipeline import HybridExecutor
+
+
+class _OfflineValidator:
+    """
+    dv_agent stand-in: every NPI is unknown, there are no practice sites,
+    and the candidate index (if any) offers one fixed registry record.
+    """
+    practice_websites = {}
+
+    def __init__(self, candidates=None) -> None:
+        self.candidates = candidates
+
+    def lookup_npi(self, npi, coalescer=None):
+        return None, "not_found"
+
+    def npi_candidates(self, provider, npi_status):
+        return self.candidates
+
+
+class _Orchestrator:
+    def __init__(self, candidates=None) -> None:
+        self.dv_agent = _OfflineValidator(candidates)
+
+
+def test_max_in_flight_below_chunk_rows_still_finishes(make_providers):
+    executor = HybridExecutor(io_workers=2, parse_workers=0, score_workers=0, chunk_rows=50)
+    results = []
+    worker = threading.Thread(
+        target=lambda: results.extend(
+            executor.iter_batch(_Orchestrator(), make_providers(23), max_in_flight=5)
+        ),
+        daemon=True,
+    )
+    worker.start()
+    worker.join(timeout=30)
+
+    assert not worker.is_alive()
+    assert sorted(idx for idx, _ in results) == list(range(23))
+
+
+def test_process_path_passes_npi_candidates_to_scoring(make_providers):
+    candidates = [{"npi": "1999999999", "score": 0.93, "name": "Provider 0", "address": "1 Main St"}]
+    executor = HybridExecutor(io_workers=2, parse_workers=0, score_workers=0, chunk_rows=4)
+    reports = [r for _, r in executor.iter_batch(_Orchestrator(candidates), make_providers(3))]
+
+    assert len(reports) == 3
+    for report in reports:
+        assert "closest registry match NPI 1999999999 (score 0.93)" in report.provider_output.npi.note
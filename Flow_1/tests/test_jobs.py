@@ -0,0 +1,63 @@
+# tests/test_jobs.py
+import threading
+import time
+
+from jobs import JobManager, JobStore
+
+
+class _WindowedOrchestrator:
+    """
+    iter_batch stand-in, no network: pulls rows `window` at a time and
+    records the job's reported in_flight just before each report.
+    Rows listed in `failing` go to on_error instead.
+    """
+
+    def __init__(self, make_report, window=3, failing=()) -> None:
+        self.make_report = make_report
+        self.window = window
+        self.failing = set(failing)
+        self.manager = None
+        self.job_id = None
+        self.go = threading.Event()
+        self.in_flight = []
+
+    def iter_batch(self, providers, max_workers=None, on_error=None, as_records=False):
+        self.go.wait(5)
+        rows = enumerate(providers)
+        while True:
+            taken = [row for _, row in zip(range(self.window), rows)]
+            if not taken:
+                return
+            for pos, provider in taken:
+                if pos in self.failing:
+                    on_error(pos, provider, RuntimeError("registry down"))
+                    continue
+                self.in_flight.append(self.manager.status(self.job_id)["in_flight"])
+                yield pos, self.make_report(provider)
+
+
+def _wait_finished(manager, job_id):
+    deadline = time.monotonic() + 5
+    while manager.status(job_id)["status"] in ("queued", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return manager.status(job_id)
+
+
+def test_in_flight_counts_submitted_rows_not_yet_finished(tmp_path, make_providers, make_report):
+    orchestrator = _WindowedOrchestrator(make_report, window=3, failing={1})
+    manager = JobManager(
+        orchestrator,
+        JobStore(str(tmp_path / "jobs.sqlite3")),
+        upload_dir=str(tmp_path / "uploads"),
+        workers_per_job=8,
+    )
+    orchestrator.manager = manager
+    orchestrator.job_id = manager.submit(make_providers(5))
+    orchestrator.go.set()
+
+    status = _wait_finished(manager, orchestrator.job_id)
+    manager.shutdown()
+
+    assert orchestrator.in_flight == [3, 1, 2, 1]
+    assert (status["status"], status["done"], status["failed"], status["in_flight"]) == ("completed", 4, 1, 0)
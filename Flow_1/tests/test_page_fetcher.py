@@ -0,0 +1,42 @@
+# tests/test_page_fetcher.py
+import sqlite3
+import time
+
+from page_fetcher import PageCache
+
+
+def _put(cache: PageCache, url: str) -> None:
+    cache.put(url, None, None, "hash-" + url, b"<html>" + url.encode() + b"</html>", "utf-8")
+
+
+def test_old_and_surplus_pages_are_pruned(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite3"), max_age_seconds=0.2, max_pages=2)
+    for url in ("a", "b", "c"):
+        _put(cache, url)
+    assert cache.prune() == 1
+    assert cache.get("a") is None and cache.get("c").body == b"<html>c</html>"
+
+    time.sleep(0.25)
+    assert cache.get("c") is None                   # too old to serve
+    assert cache.prune() == 2 and cache.count() == 0
+
+
+def test_unusable_file_turns_the_cache_off(tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    cache = PageCache(str(blocker / "pages.sqlite3"))
+    _put(cache, "a")
+    assert cache.get("a") is None and cache.get_parsed("a", "hash-a", 1) == (False, None)
+
+
+def test_query_errors_turn_the_cache_off(tmp_path):
+    path = str(tmp_path / "pages.sqlite3")
+    cache = PageCache(path)
+    _put(cache, "a")
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP TABLE pages")
+
+    assert cache.get("a") is None
+    _put(cache, "b")
+    cache.touch("b")
+    assert cache.get("b") is None and cache.prune() == 0
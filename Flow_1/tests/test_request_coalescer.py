@@ -0,0 +1,87 @@
+# tests/test_request_coalescer.py
+import asyncio
+import threading
+
+import pytest
+
+from request_coalescer import AsyncRequestCoalescer, RequestCoalescer
+from resilience import SourceUnavailable
+
+
+def test_concurrent_requests_share_one_call():
+    coalescer = RequestCoalescer()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def lookup():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"number": "1000000000"}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(coalescer.do("npi", "1000000000", lookup)))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    started.wait(5)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1 and len(results) == 4
+    assert coalescer.stats()["npi"] == {"requests": 4, "calls": 1, "saved": 3}
+
+
+def test_errors_are_not_replayed_to_later_requests():
+    coalescer = RequestCoalescer()
+    answers = iter([SourceUnavailable("registry down"), {"number": "1000000000"}])
+
+    def lookup():
+        answer = next(answers)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    with pytest.raises(SourceUnavailable):
+        coalescer.do("npi", "1000000000", lookup)
+    assert coalescer.do("npi", "1000000000", lookup) == {"number": "1000000000"}
+    assert coalescer.do("npi", "1000000000", lookup) == {"number": "1000000000"}
+    assert coalescer.stats()["npi"]["calls"] == 2
+
+
+def test_kept_results_are_bounded():
+    coalescer = RequestCoalescer(max_results=2)
+    for key in ("a", "b", "c"):
+        coalescer.do("page", key, lambda: key)
+    assert coalescer.do("page", "c", lambda: "again") == "c"
+    assert coalescer.do("page", "a", lambda: "again") == "again"   # evicted
+    assert len(coalescer._results) == 2 and not coalescer._calls
+
+
+def test_async_coalescer_forgets_failures_and_bounds_results():
+    async def run():
+        coalescer = AsyncRequestCoalescer(max_results=1)
+        calls = []
+
+        async def failing():
+            calls.append("fail")
+            raise SourceUnavailable("registry down")
+
+        async def lookup():
+            calls.append("ok")
+            await asyncio.sleep(0)
+            return "record"
+
+        with pytest.raises(SourceUnavailable):
+            await coalescer.do("npi", "1", failing)
+        results = await asyncio.gather(*(coalescer.do("npi", "1", lookup) for _ in range(3)))
+        assert results == ["record"] * 3
+        assert await coalescer.do("npi", "1", lookup) == "record"
+        await coalescer.do("npi", "2", lookup)
+        assert calls == ["fail", "ok", "ok"]
+        assert list(coalescer._results) == [("npi", "2")] and not coalescer._tasks
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+# tests/test_review_queue.py
+import sqlite3
+import time
+
+import pytest
+
+from review_queue import ReviewQueue
+
+
+@pytest.fixture
+def review_report(make_provider, make_report):
+    def make(score: float = 5.0, reason: str = "phone mismatch"):
+        return make_report(make_provider(), "needs_review", priority_score=score, reasons=[reason])
+    return make
+
+
+def test_claim_resolve_then_unchanged_rerun_stays_resolved(tmp_path, review_report):
+    queue = ReviewQueue(str(tmp_path / "queue.sqlite3"))
+    queue.add_reports([review_report()])
+
+    item = queue.claim_next("alice")
+    assert item is not None and item["state"] == "claimed"
+    assert queue.resolve(item["id"], reviewer="alice")
+
+    # nightly re-run of the same row with the same findings
+    queue.add_reports([review_report()])
+    assert queue.get(item["id"])["state"] == "resolved"
+    assert queue.top() == []
+
+
+def test_rerun_with_changed_report_reopens_resolved_item(tmp_path, review_report):
+    queue = ReviewQueue(str(tmp_path / "queue.sqlite3"))
+    queue.add_reports([review_report()])
+    item = queue.claim_next("alice")
+    queue.resolve(item["id"])
+
+    queue.add_reports([review_report(score=9.0, reason="address mismatch")])
+    reopened = queue.get(item["id"])
+    assert reopened["state"] == "open"
+    assert reopened["priority_score"] == 9.0
+
+
+def test_rerun_keeps_claim(tmp_path, review_report):
+    queue = ReviewQueue(str(tmp_path / "queue.sqlite3"))
+    queue.add_reports([review_report()])
+    item = queue.claim_next("alice")
+
+    queue.add_reports([review_report(score=7.0)])
+    assert queue.get(item["id"])["state"] == "claimed"
+    assert queue.get(item["id"])["claimed_by"] == "alice"
+
+
+def test_expired_claim_is_handed_out_again(tmp_path, review_report):
+    queue = ReviewQueue(str(tmp_path / "queue.sqlite3"))
+    queue.add_reports([review_report()])
+    first = queue.claim_next("alice", lease_seconds=0.01)
+    time.sleep(0.05)
+
+    assert [i["id"] for i in queue.top()] == [first["id"]]
+    second = queue.claim_next("bob")
+    assert second["id"] == first["id"] and second["claimed_by"] == "bob"
+    assert not queue.resolve(first["id"], reviewer="alice")
+
+
+def test_reads_do_not_hold_the_write_lock(tmp_path, review_report):
+    path = str(tmp_path / "queue.sqlite3")
+    queue = ReviewQueue(path)
+    queue.add_reports([review_report()])
+    queue.claim_next("alice", lease_seconds=0.01)
+    time.sleep(0.05)
+
+    queue.page()   # expires the claim
+    other = sqlite3.connect(path, timeout=0.1)
+    other.execute("UPDATE review_items SET source = 'other-writer'")
+    other.commit()
+    other.close()
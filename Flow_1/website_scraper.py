@@ -1,9 +1,52 @@
 # website_scraper.py
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import os
 import re
 
-import requests
-from bs4 import BeautifulSoup
+from lxml import etree
+
+from async_http import httpx
+from page_fetcher import (
+    PageCache,
+    PageFetcher,
+    FetchResult,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_FRESH_SECONDS,
+    DEFAULT_HOST_CONCURRENCY,
+    DEFAULT_HOST_RATE,
+    DEFAULT_BREAKER_FAILURES,
+    DEFAULT_BREAKER_OPEN_SECONDS,
+    DEFAULT_PAGE_MAX_AGE_SECONDS,
+    DEFAULT_PAGE_MAX_PAGES,
+)
+
+# Bump when extract_practice_fields changes so cached parses are redone.
+PARSER_VERSION = 2
+
+# Page cache shared by every caller in this process.
+# Set PAGE_CACHE_PATH="" to disable it (every scrape then hits the network);
+# if the file can't be used the cache disables itself the same way.
+PAGE_CACHE_PATH = os.getenv(
+    "PAGE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "page_cache.sqlite3"),
+)
+
+page_fetcher = PageFetcher(
+    cache=PageCache(
+        PAGE_CACHE_PATH,
+        max_age_seconds=float(os.getenv("PAGE_CACHE_MAX_AGE_SECONDS", DEFAULT_PAGE_MAX_AGE_SECONDS)),
+        max_pages=int(os.getenv("PAGE_CACHE_MAX_PAGES", DEFAULT_PAGE_MAX_PAGES)),
+    ) if PAGE_CACHE_PATH else None,
+    max_bytes=int(os.getenv("SCRAPER_MAX_BYTES", DEFAULT_MAX_BYTES)),
+    fresh_seconds=float(os.getenv("SCRAPER_FRESH_SECONDS", DEFAULT_FRESH_SECONDS)),
+    host_concurrency=int(os.getenv("SCRAPER_HOST_CONCURRENCY", DEFAULT_HOST_CONCURRENCY)),
+    host_rate=float(os.getenv("SCRAPER_HOST_RATE", DEFAULT_HOST_RATE)),
+    breaker_failures=int(os.getenv("SCRAPER_BREAKER_FAILURES", DEFAULT_BREAKER_FAILURES)),
+    breaker_open_seconds=float(
+        os.getenv("SCRAPER_BREAKER_OPEN_SECONDS", DEFAULT_BREAKER_OPEN_SECONDS)
+    ),
+)
 
 
 def scrape_practice_site(url: str) -> Optional[Dict[str, str]]:
@@ -16,46 +59,250 @@ def scrape_practice_site(url: str) -> Optional[Dict[str, str]]:
       - "speciality"
     or None if nothing usable was found.
     """
+    return _fields_from_fetch(page_fetcher.fetch(url))
+
+
+def fetch_practice_page(url: str) -> FetchResult:
+    """
+    Fetch step of scrape_practice_site on its own (parse the result with
+    cached_practice_fields / extract_practice_fields / store_practice_fields).
+    """
+    return page_fetcher.fetch(url)
+
+
+async def ascrape_practice_site(
+    url: str,
+    client: Optional["httpx.AsyncClient"] = None,
+    limit: Optional[asyncio.Semaphore] = None,
+) -> Optional[Dict[str, str]]:
+    """
+    Async version of scrape_practice_site.
+
+    - `client`: pooled httpx.AsyncClient (see async_http.new_async_client)
+    - `limit`: semaphore capping concurrent fetches for this backend
+      (page_fetcher applies per-host limits first and holds `limit`
+      only while the request is in flight)
+    - parsing (lxml) and the parse cache run in a worker thread
+    """
+    result = await page_fetcher.afetch(url, client=client, limit=limit)
+    return await asyncio.to_thread(_fields_from_fetch, result)
+
+
+def _fields_from_fetch(result: FetchResult) -> Optional[Dict[str, str]]:
+    """
+    Parse a fetched page, re-using the stored parse when the page
+    content (sha256) has not changed since it was last parsed.
+    """
+    hit, fields = cached_practice_fields(result)
+    if hit:
+        return fields
+
+    fields = extract_practice_fields(result.text)
+    store_practice_fields(result, fields)
+    return fields
+
+
+def cached_practice_fields(result: FetchResult) -> Tuple[bool, Optional[Dict[str, str]]]:
+    """
+    (True, fields) when `result` needs no parsing: the fetch failed
+    (fields None) or this exact content was parsed before.
+    (False, None) when result.text still has to go through
+    extract_practice_fields (see hybrid_pipeline, which parses elsewhere).
+    """
+    if result.text is None:
+        print(f"[SCRAPER] Failed to fetch {result.url}: {result.error}")
+        return True, None
+
+    if result.truncated:
+        print(f"[SCRAPER] {result.url} exceeded {page_fetcher.max_bytes} bytes; parsing the first part only")
+
+    cache = page_fetcher.cache
+    if cache is not None:
+        hit, fields = cache.get_parsed(result.url, result.content_hash, PARSER_VERSION)
+        if hit:
+            return True, fields
+    return False, None
+
+
+def store_practice_fields(result: FetchResult, fields: Optional[Dict[str, str]]) -> None:
+    cache = page_fetcher.cache
+    if cache is not None:
+        cache.put_parsed(result.url, result.content_hash, PARSER_VERSION, fields)
+
+
+# ---------- field extraction ----------
+
+SPECIALITIES = (
+    "cardiology", "dermatology", "neurology", "pediatrics",
+    "family medicine", "internal medicine", "orthopedics",
+    "ophthalmology", "endocrinology", "gastroenterology",
+)
+
+# All compiled once at import.
+# One alternation finds "some speciality is here"; the list order above
+# still decides which one wins when a page mentions several.
+_SPECIALITY_RE = re.compile("|".join(re.escape(s) for s in SPECIALITIES))
+_PHONE_RE = re.compile(r'\+?\d[\d\-\s\(\)]{7,}')
+# "Street"/"Avenue"/"Drive" contain "St"/"Ave"/"Dr", so this matches exactly
+# the lines the old keyword list did.
+_ADDRESS_RE = re.compile(r"St|Ave|Road|Rd|Blvd|Dr")
+
+# Strings inside these tags are not page text (BeautifulSoup's get_text()
+# skips them too); whitespace is kept verbatim inside the preserve tags.
+_SKIP_TEXT_TAGS = frozenset(("script", "style", "template", "rt", "rp"))
+_PRESERVE_WHITESPACE_TAGS = frozenset(("pre", "textarea"))
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+# Feed size for the streaming parser; extraction can stop between chunks.
+_FEED_CHUNK = 16 * 1024
+
+
+def _is_phone_char(c: str) -> bool:
+    return c.isdecimal() or c.isspace() or c in "-()"
+
+
+class _PracticeFieldsTarget:
+    """
+    lxml parser target: rebuilds the text nodes get_text(separator="\n")
+    would produce (same events BeautifulSoup's lxml builder sees) and runs
+    the matchers on each node as it completes, without building a tree.
+    """
+
+    def __init__(self) -> None:
+        self.best_rank = len(SPECIALITIES)
+        self.phone: Optional[str] = None
+        self.address: Optional[str] = None
+        self.done = False
+
+        self._data: List[str] = []
+        self._skip_depth = 0
+        self._preserve_depth = 0
+        # Text not yet ruled out as the start of a phone number. Nodes are
+        # joined with "\n" (a phone char), so numbers can span nodes.
+        self._phone_tail: Optional[str] = None
+
+    # ---------- parser events ----------
+
+    def start(self, tag, attrib) -> None:
+        self._flush()
+        if tag in _SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+        if tag in _PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth += 1
+
+    def end(self, tag) -> None:
+        self._flush()
+        if tag in _SKIP_TEXT_TAGS:
+            self._skip_depth -= 1
+        if tag in _PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth -= 1
+
+    def data(self, data: str) -> None:
+        self._data.append(data)
+
+    def comment(self, text) -> None:
+        self._flush()
+
+    def pi(self, target, data=None) -> None:
+        self._flush()
+
+    def doctype(self, *args) -> None:
+        self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        if self.phone is None and self._phone_tail:
+            m = _PHONE_RE.search(self._phone_tail)
+            if m is not None:
+                self.phone = m.group(0).strip()
+
+    # ---------- matching ----------
+
+    def _flush(self) -> None:
+        if not self._data:
+            return
+        node = "".join(self._data)
+        self._data = []
+
+        if not self._preserve_depth and not node.strip(_ASCII_SPACES):
+            node = "\n" if "\n" in node else " "
+
+        if self._skip_depth or self.done:
+            return
+
+        # speciality
+        if self.best_rank > 0:
+            node_lower = node.lower()
+            if _SPECIALITY_RE.search(node_lower):
+                for rank in range(self.best_rank):
+                    if SPECIALITIES[rank] in node_lower:
+                        self.best_rank = rank
+                        break
+
+        # phone
+        if self.phone is None:
+            tail = node if self._phone_tail is None else self._phone_tail + "\n" + node
+            m = _PHONE_RE.search(tail)
+            if m is not None and m.end() < len(tail):
+                self.phone = m.group(0).strip()
+            elif m is not None:
+                # may still grow with the next node
+                tail = tail[m.start():]
+            else:
+                i = len(tail)
+                while i > 0 and _is_phone_char(tail[i - 1]):
+                    i -= 1
+                if i > 0 and tail[i - 1] == "+":
+                    i -= 1
+                tail = tail[i:]
+            self._phone_tail = tail
+
+        # address
+        if self.address is None and _ADDRESS_RE.search(node):
+            for line in node.splitlines():
+                if _ADDRESS_RE.search(line):
+                    cleaned = line.strip()
+                    if len(cleaned) > 10:
+                        self.address = cleaned
+                        break
+
+        if self.best_rank == 0 and self.phone is not None and self.address is not None:
+            self.done = True
+
+
+def extract_practice_fields(html: str) -> Optional[Dict[str, str]]:
+    """
+    Pull phone / address / speciality out of a practice page's HTML.
+
+    Streams the page through lxml's event parser (no BeautifulSoup tree)
+    and stops feeding it once every field is settled. Results match the
+    original get_text()-based heuristics:
+    - speciality: first entry of SPECIALITIES mentioned anywhere
+    - phone: first run matching _PHONE_RE in the joined text
+    - address: first line with a street keyword and > 10 chars
+    """
+    target = _PracticeFieldsTarget()
+    parser = etree.HTMLParser(target=target, recover=True)
+
     try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-    except Exception as e:
-        print(f"[SCRAPER] Failed to fetch {url}: {e}")
-        return None
-
-    soup = BeautifulSoup(resp.text, "lxml")
-    text = soup.get_text(separator="\n")
-    text_lower = text.lower()
-
-    # speciality guess
-    speciality = None
-    for spec in [
-        "cardiology", "dermatology", "neurology", "pediatrics",
-        "family medicine", "internal medicine", "orthopedics",
-        "ophthalmology", "endocrinology", "gastroenterology",
-    ]:
-        if spec in text_lower:
-            speciality = spec.title()
-            break
-
-    # phone guess
-    phone_match = re.search(r'\+?\d[\d\-\s\(\)]{7,}', text)
-    phone = phone_match.group(0).strip() if phone_match else None
-
-    # address guess: first line that looks address-ish
-    address = None
-    for line in text.splitlines():
-        if any(tag in line for tag in ["Street", "St", "Ave", "Avenue", "Road", "Rd", "Blvd", "Drive", "Dr"]):
-            cleaned = line.strip()
-            if len(cleaned) > 10:
-                address = cleaned
+        for pos in range(0, max(len(html), 1), _FEED_CHUNK):
+            parser.feed(html[pos:pos + _FEED_CHUNK])
+            if target.done:
                 break
+        parser.close()
+    except (etree.ParserError, etree.XMLSyntaxError, UnicodeError) as e:
+        print(f"[SCRAPER] Could not parse page: {e}")
+
+    speciality = (
+        SPECIALITIES[target.best_rank].title()
+        if target.best_rank < len(SPECIALITIES) else None
+    )
 
     result: Dict[str, str] = {}
-    if phone:
-        result["phone"] = phone
-    if address:
-        result["address"] = address
+    if target.phone:
+        result["phone"] = target.phone
+    if target.address:
+        result["address"] = target.address
     if speciality:
         result["speciality"] = speciality
 